@@ -1,22 +1,27 @@
 
-from fastapi import FastAPI, APIRouter, HTTPException
+import json
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 
 
 from core.config import settings
 from core.app_logging import configure_logging
-from services.groq_service import groq_service
-from services.open_ai_service import openai_service
+from core.call_ledger import CallLedger, start_ledger
+from core.executor import run_blocking
+from core.audio_upload import read_audio_upload
+from core.lazy_service import LazyService
+from core.client_registry import client_registry
+from core.metrics import ERRORS, metrics_payload
 from schemas.routes.text_query import TextQuerySchema
 from schemas.routes.audio_query import AudioQuerySchema
-from services.langgraph_service import LanggraphService
-from services.deepL_service import Deepl_Service
 
 
 configure_logging()
 import logging
 
-application = FastAPI()
-
 
 qdrant_configs = {
     "quran": {
@@ -41,8 +46,80 @@ qdrant_configs = {
     }
 }
 
-langgraph_service = LanggraphService(qdrant_configs)
-deepl_services = Deepl_Service()
+
+
+# Services are built on first use or by the startup warm-up, not at import time - importing
+# application (uvicorn, frontend.py) stays fast, and the heavy imports come with the factories
+def build_langgraph_service():
+    from services.langgraph_service import LanggraphService
+    return LanggraphService(qdrant_configs)
+
+
+def build_deepl_service():
+    from services.deepL_service import deepl_service
+    return deepl_service
+
+
+def build_groq_service():
+    from services.groq_service import groq_service
+    return groq_service
+
+
+langgraph_service = LazyService("langgraph_service", build_langgraph_service)
+deepl_services = LazyService("deepl_service", build_deepl_service)
+groq_service = LazyService("groq_service", build_groq_service)
+
+warmup_state = {"done": False, "error": None, "attempts": 0}
+
+
+
+async def warm_up():
+    """
+    Build every service, pre-connect to the upstreams and load the reranker; /readyz turns ready
+    once done. A failed attempt (model download, an upstream down) is retried with exponential backoff.
+    """
+    delay = settings.WARMUP_RETRY_SECONDS
+    while True:
+        warmup_state["attempts"] += 1
+        try:
+            for service in (deepl_services, groq_service, langgraph_service):
+                await service.aget()
+
+            # Open the upstream connections (TCP + TLS) before traffic arrives
+            await client_registry.apreconnect()
+            await run_blocking(client_registry.preconnect)
+            await langgraph_service.get().qdrant_service.apreconnect()
+
+            await run_blocking(langgraph_service.get().qdrant_service.warm_up)
+            warmup_state["done"] = True
+            warmup_state["error"] = None
+            build_seconds = {service.name: service.build_seconds for service in (deepl_services, groq_service, langgraph_service)}
+            logging.info(f"Warm-up complete after {warmup_state['attempts']} attempt(s), build seconds: {build_seconds}")
+            return
+
+        except Exception as e:
+            warmup_state["error"] = str(e)
+            logging.error(f"Warm-up attempt {warmup_state['attempts']} failed: {e}, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.WARMUP_RETRY_MAX_SECONDS)
+
+
+def services_built() -> bool:
+    """Every service built and the reranker loaded - by the warm-up or on demand by requests"""
+    if not all(service.ready for service in (deepl_services, groq_service, langgraph_service)):
+        return False
+    return langgraph_service.get().qdrant_service.reranker_loaded
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup_task = asyncio.create_task(warm_up()) if settings.WARMUP_ON_STARTUP else None
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+
+
+application = FastAPI(lifespan=lifespan)
 
 
 
@@ -51,6 +128,69 @@ async def main():
     return {"Version": settings.VERSION}
 
 
+@application.get("/healthz")
+async def healthz():
+    """Liveness - the process is up and serving"""
+    return {"status": "success", "message": "alive"}
+
+
+@application.get("/readyz")
+async def readyz():
+    """Readiness - 503 until the services are built and the reranker loaded, then 200"""
+    services = {service.name: service.ready for service in (deepl_services, groq_service, langgraph_service)}
+    # Without the warm-up, services are built by the first requests, so there is nothing to wait for.
+    # A warm-up still retrying does not hold readiness back once requests have built everything
+    ready = warmup_state["done"] or not settings.WARMUP_ON_STARTUP or services_built()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "success" if ready else "error",
+            "message": {"ready": ready, "services": services, "warmup_error": warmup_state["error"], "warmup_attempts": warmup_state["attempts"]}
+        }
+    )
+
+
+@application.get("/metrics")
+async def metrics():
+    """Prometheus metrics - graph node and upstream latency histograms, classification, translation and error counters"""
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)
+
+
+
+
+
+async def detect_and_translate_query(query: str) -> dict:
+    """Language detection / query translation on the async or sync path depending on ASYNC_MODE"""
+    if settings.ASYNC_MODE:
+        return await (await deepl_services.aget()).adetect_and_translate_query(query)
+    return deepl_services.get().detect_and_translate_query(query)
+
+
+async def run_langgraph_query(processed_query: str, detected_lang: str) -> str:
+    """Run the RAG graph with graph.ainvoke (ASYNC_MODE) or graph.invoke"""
+    if settings.ASYNC_MODE:
+        return await (await langgraph_service.aget()).aquery(processed_query, detected_lang)
+    return langgraph_service.get().query(processed_query, detected_lang)
+
+
+async def translate_answer(llm_response: str, detected_lang: str) -> str:
+    """DeepL pass on the answer - the final prompt only answers natively in EN and RU"""
+    if detected_lang.upper() in ("EN", "RU"):
+        return llm_response
+    if settings.ASYNC_MODE:
+        return await (await deepl_services.aget()).atranslate_response(llm_response, detected_lang)
+    return deepl_services.get().translate_response(llm_response, detected_lang)
+
+
+def close_ledger(ledger: CallLedger, response: dict) -> dict:
+    """Check the request's external calls against CALL_BUDGETS and attach the ledger in debug mode"""
+    ledger.check(settings.CALL_BUDGETS, settings.CALL_BUDGET_STRICT)
+    if settings.CALL_LEDGER_DEBUG:
+        response["ledger"] = ledger.summary()
+    return response
+
+
 
 
 
@@ -59,9 +199,10 @@ async def process_text_query(request: TextQuerySchema):
     """Process user text query and return Islamic chatbot response"""
     user_input = request.query.strip()
     logging.info(f"Received user query: {user_input}")
+    ledger = start_ledger("/text_query")
 
     try:
-        translation_result = deepl_services.detect_and_translate_query(user_input)
+        translation_result = await detect_and_translate_query(user_input)
         logging.info(f"Translation result: {translation_result}")
         
         if translation_result.get("status") != "success":
@@ -76,20 +217,20 @@ async def process_text_query(request: TextQuerySchema):
         logging.info(f"Detected language inside application.py : {detected_lang}")
         
         #query to llm
-        llm_response = langgraph_service.query(processed_query, detected_lang)
+        llm_response = await run_langgraph_query(processed_query, detected_lang)
         
         if not llm_response:
             logging.error("LLM response generation failed.")
             raise HTTPException(status_code=500, detail="Failed to generate LLM response.")
         
-        return {
+        return close_ledger(ledger, {
             "status": "success",
-            "message": llm_response }
+            "message": llm_response })
 
 
 
     except Exception as e:
-    
+        ERRORS.labels("/text_query").inc()
         return {
             "status": "error",
             "message": f"Error processing query: {str(e)}"
@@ -99,58 +240,133 @@ async def process_text_query(request: TextQuerySchema):
 
 
 
+@application.post('/text_query/stream')
+async def stream_text_query(request: TextQuerySchema):
+    """Process user text query and stream the response as Server-Sent Events"""
+    return StreamingResponse(
+        text_query_events(request.query.strip()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def text_query_events(user_input: str):
+    """SSE stream for /text_query/stream, using the same status/message envelope as /text_query"""
+    logging.info(f"Received streaming user query: {user_input}")
+    ledger = start_ledger("/text_query/stream")
+
+    try:
+        translation_result = await detect_and_translate_query(user_input)
+
+        if translation_result.get("status") != "success":
+            logging.error("Language detection or translation failed.")
+            yield sse_event("error", {"status": "error", "message": "Language detection or translation failed."})
+            return
+
+        processed_query = translation_result["processed_query"]
+        detected_lang = translation_result["detected_language"]
+        yield sse_event("progress", {"status": "success", "message": {"stage": "language_detected", "language": detected_lang}})
+
+        async for event, payload in (await langgraph_service.aget()).astream_query(processed_query, detected_lang):
+            yield sse_event(event, payload)
+
+        summary = close_ledger(ledger, {"status": "success"})
+        if "ledger" in summary:
+            yield sse_event("ledger", {"status": "success", "message": summary["ledger"]})
+
+    except Exception as e:
+        ERRORS.labels("/text_query/stream").inc()
+        yield sse_event("error", {"status": "error", "message": f"Error processing query: {str(e)}"})
+
+
+
+
+
 @application.post('/audio_query')
 async def process_audio_query(request: AudioQuerySchema):
-    """Process user audio query and return Islamic chatbot response"""    
+    """Process user audio query (a file on the server) and return Islamic chatbot response"""    
+
+    ledger = start_ledger("/audio_query")
 
     try:
         file_path = request.file_path
 
-        transcription_response = groq_service.transcribe_auto(file_path)
-        if transcription_response["status"] == "error":
-            return transcription_response
+        if settings.ASYNC_MODE:
+            transcription_response = await (await groq_service.aget()).atranscribe_auto(file_path)
+        else:
+            transcription_response = groq_service.get().transcribe_auto(file_path)
 
-        query = transcription_response["message"]
-        print(f"voice to query : {query}")
-        
-        translation_result = deepl_services.detect_and_translate_query(query)
-        
-          
-        if translation_result.get("status") != "success":
-            raise HTTPException(status_code=400, detail="Language detection or translation failed.")
-        
-        
-        processed_query =  translation_result["processed_query"]
-        detected_lang =  translation_result["detected_language"]
-        
-        
-        #query to llm
-        llm_response = langgraph_service.query(processed_query, detected_lang)
-        
-        if not llm_response:
-            raise HTTPException(status_code=500, detail="Failed to generate LLM response.")
-        
-           
-        final_response = deepl_services.translate_response(llm_response, detected_lang)
+        return await answer_transcription(transcription_response, ledger)
 
+    except Exception as e:
+        ERRORS.labels("/audio_query").inc()
         return {
-            "status": "success",
-            "message": final_response }
+            "status": "error",
+            "message": f"Error processing query: {str(e)}"
+        }
+
 
+@application.post('/audio_query/upload')
+async def upload_audio_query(request: Request):
+    """
+    Process an uploaded recording - multipart/form-data (first file field) or a raw audio/* body.
+    The upload is streamed into memory and never written to disk.
+    """
+    audio_bytes, filename = await read_audio_upload(request)
+    return await process_audio_bytes(audio_bytes, filename)
 
 
+async def process_audio_bytes(audio_bytes: bytes, filename: str, endpoint: str = "/audio_query/upload") -> dict:
+    """Transcribe an in-memory recording (split at pauses when long) and answer it"""
+    ledger = start_ledger(endpoint)
+
+    try:
+        if settings.ASYNC_MODE:
+            transcription_response = await (await groq_service.aget()).atranscribe_bytes(audio_bytes, filename)
+        else:
+            transcription_response = groq_service.get().transcribe_bytes(audio_bytes, filename)
+
+        return await answer_transcription(transcription_response, ledger)
+
     except Exception as e:
-    
+        ERRORS.labels(endpoint).inc()
         return {
             "status": "error",
             "message": f"Error processing query: {str(e)}"
         }
 
-     
 
+async def answer_transcription(transcription_response: dict, ledger: CallLedger) -> dict:
+    """The part of the audio endpoints after transcription - language detection, the graph, the ledger"""
+    if transcription_response["status"] == "error":
+        return transcription_response
 
+    query = transcription_response["message"]
+    logging.info(f"voice to query : {query}")
 
+    translation_result = await detect_and_translate_query(query)
 
-        
+    if translation_result.get("status") != "success":
+        raise HTTPException(status_code=400, detail="Language detection or translation failed.")
+
+
+    processed_query =  translation_result["processed_query"]
+    detected_lang =  translation_result["detected_language"]
+
+
+    #query to llm
+    llm_response = await run_langgraph_query(processed_query, detected_lang)
+
+    if not llm_response:
+        raise HTTPException(status_code=500, detail="Failed to generate LLM response.")
+
+    # EN and RU answers come from the graph in that language; other languages still go through DeepL
+    final_response = await translate_answer(llm_response, detected_lang)
 
-    
+    return close_ledger(ledger, {
+        "status": "success",
+        "message": final_response })
@@ -0,0 +1,102 @@
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from core.config import settings
+
+
+
+class InMemoryMultipart:
+    """
+    Multipart callbacks that keep the first file part in memory. Starlette's own form parser
+    spools uploads over 1 MB to a temporary file; this one never writes to disk.
+    """
+
+    def __init__(self, max_bytes: int):
+
+        self.max_bytes = max_bytes
+        self.filename = None
+        self.data = bytearray()
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+        self._done = False
+
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+        }
+
+
+    def on_part_begin(self) -> None:
+        self._in_file = False
+
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+
+    def on_header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition" and not self._done:
+            _, options = parse_options_header(self._header_value)
+            if b"filename" in options:
+                self._in_file = True
+                self.filename = options[b"filename"].decode("utf-8", "replace")
+        self._header_field = b""
+        self._header_value = b""
+
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_file:
+            return
+        self.data += data[start:end]
+        if len(self.data) > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"Audio upload is larger than {self.max_bytes} bytes.")
+
+
+    def on_part_end(self) -> None:
+        if self._in_file:
+            self._done = True
+            self._in_file = False
+
+
+
+async def read_audio_upload(request: Request, max_bytes: int = None) -> tuple:
+    """
+    (audio bytes, filename) from a multipart/form-data upload (first file field) or a raw
+    audio body, read from the request stream straight into memory with a size cap.
+    """
+    max_bytes = max_bytes or settings.AUDIO_MAX_UPLOAD_BYTES
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+
+    if content_type == b"multipart/form-data":
+        if b"boundary" not in options:
+            raise HTTPException(status_code=400, detail="Multipart upload without a boundary.")
+        upload = InMemoryMultipart(max_bytes)
+        parser = MultipartParser(options[b"boundary"], upload.callbacks())
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+        data, filename = upload.data, upload.filename
+
+    else:
+        data = bytearray()
+        async for chunk in request.stream():
+            data += chunk
+            if len(data) > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Audio upload is larger than {max_bytes} bytes.")
+        subtype = content_type.decode().split("/")[-1] if content_type.startswith(b"audio/") else "wav"
+        filename = request.headers.get("x-filename") or f"recording.{subtype}"
+
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty audio upload.")
+    return bytes(data), filename or "recording.wav"
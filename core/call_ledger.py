@@ -0,0 +1,135 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from core.metrics import observe_upstream
+from schemas.data_classes.external_call import ExternalCall
+
+logger = logging.getLogger(__name__)
+
+
+_current_ledger: ContextVar[Optional["CallLedger"]] = ContextVar("call_ledger", default=None)
+
+
+
+class CallBudgetExceeded(Exception):
+    """Raised in strict mode when a request makes more external calls than its budget allows"""
+
+
+
+class CallLedger:
+    """
+    Every external call (OpenAI, DeepL, Qdrant, Tavily, Groq) made while serving one request,
+    with latency, tokens and characters. The active ledger lives in a context variable, so it
+    follows the request through awaits, graph nodes and run_blocking.
+    """
+
+    def __init__(self, endpoint: str = ""):
+
+        self.endpoint = endpoint
+        self.calls: List[ExternalCall] = []
+        self._lock = threading.Lock()
+
+
+    def add(self, call: ExternalCall) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+
+    def counts(self) -> Dict[str, int]:
+        """Calls per service and per service.operation"""
+        counts = {}
+        with self._lock:
+            calls = list(self.calls)
+        for call in calls:
+            counts[call.service] = counts.get(call.service, 0) + 1
+            counts[call.name] = counts.get(call.name, 0) + 1
+        return counts
+
+
+    def summary(self) -> dict:
+        by_call = {}
+        with self._lock:
+            calls = list(self.calls)
+
+        for call in calls:
+            entry = by_call.setdefault(call.name, {"count": 0, "latency_ms": 0.0, "tokens": 0, "characters": 0, "errors": 0})
+            entry["count"] += 1
+            entry["latency_ms"] = round(entry["latency_ms"] + call.latency_ms, 1)
+            entry["tokens"] += call.tokens
+            entry["characters"] += call.characters
+            entry["errors"] += int(call.error is not None)
+
+        return {
+            "calls": len(calls),
+            "latency_ms": round(sum(call.latency_ms for call in calls), 1),
+            "tokens": sum(call.tokens for call in calls),
+            "characters": sum(call.characters for call in calls),
+            "by_call": by_call
+        }
+
+
+    def violations(self, budgets: Dict[str, int]) -> List[str]:
+        """Budgets are keyed by service ("deepl") or service.operation ("openai.generate_response")"""
+        counts = self.counts()
+        return [
+            f"{name}: {counts[name]} calls > budget {limit}"
+            for name, limit in budgets.items()
+            if counts.get(name, 0) > limit
+        ]
+
+
+    def check(self, budgets: Dict[str, int], strict: bool = False) -> List[str]:
+        """Log the ledger and any exceeded budget; in strict mode an exceeded budget raises"""
+        violations = self.violations(budgets)
+        summary = self.summary()
+        logger.info(f"Call ledger {self.endpoint}: {summary['calls']} calls, {summary['latency_ms']} ms, {self.counts()}")
+
+        if violations:
+            message = f"Call budget exceeded for {self.endpoint}: {'; '.join(violations)}"
+            if strict:
+                raise CallBudgetExceeded(message)
+            logger.warning(message)
+        return violations
+
+
+
+def start_ledger(endpoint: str = "") -> CallLedger:
+    """Open a ledger for the current request"""
+    ledger = CallLedger(endpoint)
+    _current_ledger.set(ledger)
+    return ledger
+
+
+def detach_ledger() -> None:
+    """Stop recording into the request ledger from this context (e.g. background shadow work)"""
+    _current_ledger.set(None)
+
+
+def current_ledger() -> Optional[CallLedger]:
+    return _current_ledger.get()
+
+
+@contextmanager
+def track_call(service: str, operation: str, characters: int = 0):
+    """
+    Time one external call, record it in the request ledger, if any, and in the upstream metrics.
+    The yielded ExternalCall can be updated with tokens/characters once the response is in.
+    """
+    ledger = _current_ledger.get()
+    call = ExternalCall(service, operation, characters=characters)
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        call.error = str(e)[:200]
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        call.latency_ms = round(elapsed * 1000, 1)
+        observe_upstream(service, operation, elapsed, error=call.error is not None)
+        if ledger is not None:
+            ledger.add(call)
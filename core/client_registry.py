@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import threading
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+
+class LoopLocalTransport(httpx.AsyncBaseTransport):
+    """
+    httpx async transport holding one connection pool per event loop. Pooled connections are
+    bound to the loop that opened them, and frontend.py runs the app under a fresh
+    asyncio.run() per Streamlit rerun - a single pool would hand out sockets of a closed loop.
+    """
+
+    def __init__(self, **transport_options):
+
+        self._options = transport_options
+        self._pools = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+
+    def pool(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                # Drop pools of loops that closed but are not collected yet
+                for closed in [other for other in self._pools if other.is_closed()]:
+                    del self._pools[closed]
+                pool = self._pools[loop] = httpx.AsyncHTTPTransport(**self._options)
+            return pool
+
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.pool().handle_async_request(request)
+
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.pop(loop, None)
+        if pool is not None:
+            await pool.aclose()
+
+
+
+class LoopLocal:
+    """
+    Proxy building one instance of an async SDK client (e.g. AsyncQdrantClient) per event loop,
+    resolved on attribute access - which happens inside the coroutine making the call.
+    """
+
+    def __init__(self, factory):
+
+        self._factory = factory
+        self._instances = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+
+    def instance(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            instance = self._instances.get(loop)
+            if instance is None:
+                instance = self._instances[loop] = self._factory()
+            return instance
+
+
+    def __getattr__(self, name: str):
+        return getattr(self.instance(), name)
+
+
+
+class ClientRegistry:
+    """
+    Process-wide HTTP connection pools for the upstream SDKs.
+
+    OpenAI (raw, chat and embeddings clients), Groq and the Tavily search client share one
+    httpx.Client and one httpx.AsyncClient - keep-alive, HTTP/2 where the server offers it,
+    and a socket cap per worker. The async client keeps a pool per event loop. Qdrant clients
+    build their own httpx pools from limits(). Services register the origins
+    they talk to, and the warm-up pre-connects to each one so the first request skips the
+    TCP/TLS handshake.
+    """
+
+    def __init__(self):
+
+        self.origins = set()
+        self._http_client = None
+        self._async_http_client = None
+        self._lock = threading.Lock()
+
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_SECONDS
+        )
+
+
+    def http2(self) -> bool:
+        if not settings.HTTP2_ENABLED:
+            return False
+        try:
+            import h2  # noqa: F401 - httpx needs it for HTTP/2
+            return True
+        except ImportError:
+            logger.warning("HTTP2_ENABLED but the h2 package is missing, using HTTP/1.1")
+            return False
+
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+    def http_client(self) -> httpx.Client:
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(limits=self.limits(), http2=self.http2(), timeout=self._timeout(), follow_redirects=True)
+            return self._http_client
+
+
+    def async_http_client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._async_http_client is None:
+                self._async_http_client = httpx.AsyncClient(
+                    transport=LoopLocalTransport(limits=self.limits(), http2=self.http2()),
+                    timeout=self._timeout(),
+                    follow_redirects=True
+                )
+            return self._async_http_client
+
+
+    def register(self, url) -> None:
+        """Remember an upstream origin reached through the shared pools, for pre-connecting"""
+        parts = urlsplit(str(url))
+        if parts.scheme and parts.netloc:
+            self.origins.add(f"{parts.scheme}://{parts.netloc}")
+
+
+    def preconnect(self) -> None:
+        """Open a pooled connection to every registered origin on the sync pool"""
+        client = self.http_client()
+        for origin in sorted(self.origins):
+            try:
+                client.head(origin, timeout=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+            except Exception as e:
+                logger.warning(f"Pre-connect to {origin} failed: {e}")
+
+
+    async def apreconnect(self) -> None:
+        """preconnect() for the async pool; warms the pool of the running loop, so it must be the one serving requests"""
+        client = self.async_http_client()
+
+        async def head(origin: str) -> bool:
+            try:
+                await client.head(origin, timeout=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+                return True
+            except Exception as e:
+                logger.warning(f"Async pre-connect to {origin} failed: {e}")
+                return False
+
+        connected = await asyncio.gather(*(head(origin) for origin in sorted(self.origins)))
+        logger.info(f"Async pre-connect: {sum(connected)}/{len(connected)} upstream origins connected")
+
+
+
+client_registry = ClientRegistry()
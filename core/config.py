@@ -14,6 +14,88 @@ class Settings(BaseSettings):
     TAFSEER_COLLECTION_NAME: str = "tafseer_collection"
     ISLAMIC_INFO_COLLECTION_NAME: str = "general_islamic_info"
 
+    WARMUP_ON_STARTUP: bool = True               # build services and load the reranker in the background; /readyz waits for it
+    WARMUP_RETRY_SECONDS: float = 5.0            # first backoff after a failed warm-up, doubled per attempt
+    WARMUP_RETRY_MAX_SECONDS: float = 300.0
+    ASYNC_MODE: bool = True                      # use async clients / graph.ainvoke on the request path
+    BLOCKING_EXECUTOR_WORKERS: int = 16          # bounded pool for sync-only SDKs (DeepL, Tavily, reranker)
+    PARALLEL_RETRIEVAL: bool = True              # fan out to all required_sources at once instead of one by one
+    QDRANT_BATCH_SEARCH: bool = True             # one batched query per collection, all sources reranked together
+    QDRANT_PREFER_GRPC: bool = False             # gRPC transport (port 6334) instead of REST
+
+    HTTP_MAX_CONNECTIONS: int = 100              # sockets per worker in each shared upstream pool
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_SECONDS: float = 90.0
+    HTTP2_ENABLED: bool = True                   # OpenAI and Groq over HTTP/2 (needs h2); Qdrant REST too
+    HTTP_TIMEOUT_SECONDS: float = 120.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+
+    HYBRID_RETRIEVAL: bool = True                # fuse dense results with a local BM25 index (scripts.build_sparse_index)
+    HYBRID_SOURCES: list[str] = ["hadith", "general_islamic_info"]
+    HYBRID_RRF_K: int = 60
+    HYBRID_CANDIDATE_FACTOR: float = 1.5         # fused candidates passed to the reranker, as a multiple of the source limit
+
+    REQUEST_COALESCING: bool = True              # identical in-flight queries (normalized text + language) share one run
+
+    CACHE_DIR: str = "cache"
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 50000
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95           # cosine similarity needed to reuse a cached answer
+    SEMANTIC_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 10000
+
+    LOCAL_QUERY_CLASSIFIER: bool = True              # kNN over logged LLM classifications, LLM only when unsure
+    QUERY_CLASSIFIER_CONFIDENCE: float = 0.8
+    QUERY_CLASSIFIER_K: int = 10
+    QUERY_CLASSIFIER_MIN_EXAMPLES: int = 200         # LLM-only until this many classifications are logged
+    QUERY_CLASSIFIER_MAX_EXAMPLES: int = 50000
+    QUERY_CLASSIFIER_SHADOW_RATE: float = 0.05       # share of local predictions double-checked by the LLM
+
+    LOCAL_LANGUAGE_DETECTION: bool = True            # script ratio + trigram model, LLM only for ambiguous input
+    LANGUAGE_DETECTION_CONFIDENCE: float = 0.8
+
+    TRANSLATION_CACHE_ENABLED: bool = True
+    TRANSLATION_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    TRANSLATION_CONCURRENCY: int = 8                 # concurrent DeepL batch calls per worker
+
+    AUDIO_MAX_UPLOAD_BYTES: int = 50 * 1024 * 1024   # cap on an upload held in memory
+    AUDIO_CHUNK_SECONDS: float = 60.0                # longer recordings are split at pauses and transcribed in parallel
+    AUDIO_SILENCE_THRESHOLD_DB: float = -40.0        # dBFS below which a 30 ms window counts as a pause
+    AUDIO_PREPROCESSING: bool = True                 # WAV: downmix to mono, resample to 16 kHz, trim leading / trailing silence
+    AUDIO_TRIM_PADDING_MS: int = 200                 # kept around the detected speech
+    AUDIO_ENCODING: str = "wav"                      # "wav", "flac" or "opus" (the last two need soundfile)
+    TRANSCRIPTION_CONCURRENCY: int = 4               # concurrent chunk transcriptions per recording
+    TRANSCRIPTION_CACHE_ENABLED: bool = True         # transcripts keyed by (audio bytes hash, Whisper model)
+    TRANSCRIPTION_CACHE_MAX_ENTRIES: int = 100000
+    TRANSCRIPTION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    CONTEXT_TOKEN_BUDGET: int = 6000                 # prompt context cap for the final response, 0 disables
+    CONTEXT_MAX_ITEM_TOKENS: int = 1500              # longest single document / web result
+    CONTEXT_MIN_ITEM_TOKENS: int = 64                # drop items rather than keep smaller fragments
+
+    CALL_LEDGER_DEBUG: bool = False                  # attach each request's external-call ledger to its response
+    CALL_BUDGET_STRICT: bool = False                 # fail requests over budget instead of logging a warning
+    CALL_BUDGETS: dict[str, int] = {                 # max calls per request, by "service" or "service.operation"
+        "openai.classify": 1,
+        "openai.is_english": 1,
+        "openai.generate_response": 1,
+        "openai.embed_query": 1,
+        "deepl": 5,                                  # query, 3 passage batches (web, hadith, general), answer outside EN/RU
+        "tavily": 1,
+        "groq": 10,                                  # one transcription per audio chunk
+        "qdrant": 8,
+    }
+
+    RERANKER_BACKEND: str = "torch"                  # "torch" (sentence-transformers fp32) or "onnx" (ONNX Runtime)
+    RERANKER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANKER_THREADS: int = 0                        # 0 keeps the runtime default
+    RERANKER_MAX_LENGTH: int = 512
+    RERANKER_ONNX_DIR: str = "models/onnx"
+    RERANKER_ONNX_QUANTIZE: bool = True              # dynamic int8 weights
+    RERANK_CACHE_ENABLED: bool = True                # cache scores per (query, point id, reranker model)
+    RERANK_CACHE_MAX_ENTRIES: int = 200000
+
     DEEPL_API_KEY: str
     GROQ_API_KEY: str
     TAVILY_API_KEY: str
@@ -35,10 +117,3 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
-print(f'openai api key is {settings.OPENAI_API_KEY}')
-print(f'DEEPL api key is {settings.DEEPL_API_KEY}')
-
-import os
-
-key = os.getenv("OPENAI_API_KEY")
-print("Key from os.environ:", key)
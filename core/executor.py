@@ -0,0 +1,34 @@
+import asyncio
+import contextvars
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import settings
+
+
+# Bounded pool shared by every sync-only SDK call made from the async request path
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_EXECUTOR_WORKERS,
+    thread_name_prefix="blocking-io"
+)
+
+# Separate pool for the concurrent DeepL batches of one request - context assembly itself
+# runs on blocking_executor, so fanning out onto the same pool could starve it
+translation_executor = ThreadPoolExecutor(
+    max_workers=settings.TRANSLATION_CONCURRENCY,
+    thread_name_prefix="translation"
+)
+
+# Chunks of one long recording are transcribed side by side on their own pool, for the same reason
+transcription_executor = ThreadPoolExecutor(
+    max_workers=settings.TRANSCRIPTION_CONCURRENCY,
+    thread_name_prefix="transcription"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable on the bounded executor without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    # run_in_executor does not carry context variables (e.g. the request call ledger) over to the thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(blocking_executor, partial(context.run, func, *args, **kwargs))
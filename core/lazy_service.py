@@ -0,0 +1,46 @@
+import time
+import logging
+import threading
+
+from core.executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+
+class LazyService:
+    """
+    A service built on first use, or by the startup warm-up, instead of at import time.
+    The factory does its own imports, so heavy modules (langchain, torch) load with it.
+    """
+
+    def __init__(self, name: str, factory):
+
+        self.name = name
+        self.build_seconds = None
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    self._instance = self._factory()
+                    self.build_seconds = round(time.perf_counter() - started, 2)
+                    logger.info(f"Built {self.name} in {self.build_seconds}s")
+        return self._instance
+
+
+    async def aget(self):
+        """get() that builds on the bounded executor, so a first request does not stall the event loop"""
+        if self._instance is not None:
+            return self._instance
+        return await run_blocking(self.get)
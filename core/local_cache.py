@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+
+def hash_key(*parts: Any) -> str:
+    """Stable sha256 key from any number of parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            digest.update(part)
+        else:
+            digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Case and whitespace insensitive form of a query, used for cache keys"""
+    return " ".join(text.lower().split())
+
+
+
+class LocalCache:
+    """
+    Small persistent key/value cache on a local SQLite file.
+
+    Values are JSON serialised. Entries are evicted least-recently-used once
+    max_entries or max_bytes is exceeded, and expire after ttl_seconds when set.
+    Hit/miss counters are kept in memory for the life of the process. on_evict, when set,
+    is called with the keys removed by eviction or expiry, so in-memory mirrors can drop them.
+    The entry count and byte total are read once on open and kept up to date in memory, so a
+    write does not scan the table - they assume this process is the only writer of the file.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 on_evict: Optional[Callable[[List[str]], None]] = None):
+
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (created)")
+        self._conn.commit()
+
+        self._entries, self._bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None, refreshing its LRU position"""
+        with self._lock:
+            row = self._conn.execute("SELECT value, created, size FROM entries WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+
+            expired = row is not None and self._expired(row[1], now)
+            if row is None or expired:
+                if expired:
+                    self._remove({key: row[2]})
+                    self._conn.commit()
+                self.misses += 1
+            else:
+                self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+
+        if expired:
+            self._notify([key])
+        return None if row is None or expired else json.loads(row[0])
+
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value and evict the least recently used entries past the bounds"""
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+
+        with self._lock:
+            self._write([(key, payload, len(payload), now, now)])
+            evicted = self._evict()
+            self._conn.commit()
+        self._notify(evicted)
+
+
+    def get_many(self, keys) -> dict:
+        """Return {key: value} for the cached keys among keys, refreshing their LRU position"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created FROM entries WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, value, created in rows:
+                    if not self._expired(created, now):
+                        found[key] = value
+
+            if found:
+                self._conn.executemany("UPDATE entries SET accessed = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return {key: json.loads(value) for key, value in found.items()}
+
+
+    def set_many(self, values: dict) -> None:
+        """Store several values in one transaction"""
+        if not values:
+            return
+
+        now = time.time()
+        rows = []
+        for key, value in values.items():
+            payload = json.dumps(value, ensure_ascii=False)
+            rows.append((key, payload, len(payload), now, now))
+
+        with self._lock:
+            self._write(rows)
+            evicted = self._evict()
+            self._conn.commit()
+        self._notify(evicted)
+
+
+    def items(self):
+        """Iterate over (key, value) for every live entry, most recently used first"""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value, created FROM entries ORDER BY accessed DESC").fetchall()
+
+        now = time.time()
+        for key, value, created in rows:
+            if not self._expired(created, now):
+                yield key, json.loads(value)
+
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(self._sizes([key]))
+            self._conn.commit()
+
+
+    def stats(self) -> dict:
+        """Entry count, stored bytes and hit/miss counters"""
+        with self._lock:
+            entries, size = self._entries, self._bytes
+
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+
+    def _notify(self, keys: List[str]) -> None:
+        if keys and self.on_evict is not None:
+            try:
+                self.on_evict(keys)
+            except Exception as e:
+                logger.warning(f"Eviction callback of {self.path} failed: {e}")
+
+
+    def _sizes(self, keys: List[str]) -> dict:
+        """{key: stored size} of the keys present. Caller holds the lock"""
+        sizes = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            sizes.update(self._conn.execute(f"SELECT key, size FROM entries WHERE key IN ({placeholders})", chunk).fetchall())
+        return sizes
+
+
+    def _write(self, rows: list) -> None:
+        """Insert or replace (key, value, size, created, accessed) rows. Caller holds the lock"""
+        replaced = self._sizes([row[0] for row in rows])
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        self._entries += len(rows) - len(replaced)
+        self._bytes += sum(row[2] for row in rows) - sum(replaced.values())
+
+
+    def _remove(self, sizes: dict) -> None:
+        """Delete the keys of {key: size}. Caller holds the lock"""
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in sizes])
+        self._entries -= len(sizes)
+        self._bytes -= sum(sizes.values())
+
+
+    def _evict(self) -> List[str]:
+        """Apply the TTL and size bounds; returns the evicted keys. Caller holds the lock"""
+        evicted = []
+
+        if self.ttl_seconds is not None:
+            cutoff = time.time() - self.ttl_seconds
+            expired = dict(self._conn.execute("SELECT key, size FROM entries WHERE created < ?", (cutoff,)).fetchall())
+            self._remove(expired)
+            evicted += list(expired)
+
+        if self._entries > self.max_entries:
+            oldest = dict(self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed ASC LIMIT ?", (self._entries - self.max_entries,)
+            ).fetchall())
+            self._remove(oldest)
+            evicted += list(oldest)
+
+        if self.max_bytes is not None:
+            while self._bytes > self.max_bytes:
+                row = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC LIMIT 1").fetchone()
+                if row is None:
+                    break
+                self._remove({row[0]: row[1]})
+                evicted.append(row[0])
+                logger.debug(f"Evicted cache entry {row[0]} from {self.path}")
+
+        return evicted
@@ -0,0 +1,173 @@
+import os
+import time
+import inspect
+from functools import wraps
+from contextlib import contextmanager
+from typing import Callable, Iterable, Union
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+# From cache hits (ms) up to slow LLM generations and Whisper transcriptions (tens of seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0)
+
+
+NODE_LATENCY = Histogram(
+    "chatbot_graph_node_seconds",
+    "Latency of LangGraph nodes",
+    ["node"],
+    buckets=LATENCY_BUCKETS
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "chatbot_upstream_seconds",
+    "Latency of upstream calls (OpenAI, Qdrant, DeepL, Tavily, Groq) and the local reranker",
+    ["service", "operation"],
+    buckets=LATENCY_BUCKETS
+)
+
+CLASSIFICATIONS = Counter(
+    "chatbot_query_classifications_total",
+    "Query source classifications by method (local, llm, fallback)",
+    ["method"]
+)
+
+CLASSIFIED_SOURCES = Counter(
+    "chatbot_classified_sources_total",
+    "Sources selected by query classification",
+    ["source"]
+)
+
+SHADOW_CLASSIFICATIONS = Counter(
+    "chatbot_shadow_classifications_total",
+    "Local classifications double-checked by the LLM",
+    ["agreed"]
+)
+
+TRANSLATION_BATCHES = Counter(
+    "chatbot_translation_batches_total",
+    "DeepL passage batches sent",
+    ["target_lang"]
+)
+
+TRANSLATION_PASSAGES = Counter(
+    "chatbot_translation_passages_total",
+    "Passages to translate by outcome (cached, translated, failed)",
+    ["outcome"]
+)
+
+TRANSCRIPTIONS = Counter(
+    "chatbot_transcriptions_total",
+    "Recordings to transcribe by outcome (cached, transcribed, failed)",
+    ["outcome"]
+)
+
+AUDIO_BYTES = Counter(
+    "chatbot_audio_bytes_total",
+    "Audio bytes received from clients and uploaded for transcription after pre-processing",
+    ["stage"]
+)
+
+AUDIO_BYTES_SAVED = Histogram(
+    "chatbot_audio_bytes_saved",
+    "Bytes per recording removed by pre-processing (resampling, silence trimming, encoding)",
+    buckets=(0, 16e3, 64e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6, 32e6)
+)
+
+SINGLE_FLIGHT = Counter(
+    "chatbot_single_flight_total",
+    "Pipeline executions by outcome - executed, or coalesced into an identical in-flight one",
+    ["flight", "outcome"]
+)
+
+ERRORS = Counter(
+    "chatbot_errors_total",
+    "Errors by component - graph node, upstream call (service.operation) or endpoint",
+    ["component"]
+)
+
+
+
+def observe_upstream(service: str, operation: str, seconds: float, error: bool = False) -> None:
+    UPSTREAM_LATENCY.labels(service, operation).observe(seconds)
+    if error:
+        ERRORS.labels(f"{service}.{operation}").inc()
+
+
+@contextmanager
+def time_upstream(service: str, operation: str):
+    """Time a call that is not an external request (e.g. the reranker), so it stays out of the call ledger"""
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        observe_upstream(service, operation, time.perf_counter() - started, error)
+
+
+def record_classification(method: str, sources: Iterable) -> None:
+    CLASSIFICATIONS.labels(method).inc()
+    for source in sources:
+        CLASSIFIED_SOURCES.labels(getattr(source, "value", source)).inc()
+
+
+
+def timed_node(node: Union[str, Callable], func: Callable) -> Callable:
+    """
+    Wrap a graph node (sync or async) to record its latency and exceptions. node is the label,
+    or a callable deriving it from the node input (e.g. the source of a fan-out branch).
+    """
+    def label(node_input) -> str:
+        return node(node_input) if callable(node) else node
+
+    def finish(node_input, started: float, failed: bool) -> None:
+        name = label(node_input)
+        NODE_LATENCY.labels(name).observe(time.perf_counter() - started)
+        if failed:
+            ERRORS.labels(name).inc()
+
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def timed(node_input):
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = await func(node_input)
+                failed = False
+                return result
+            finally:
+                finish(node_input, started, failed)
+    else:
+        @wraps(func)
+        def timed(node_input):
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = func(node_input)
+                failed = False
+                return result
+            finally:
+                finish(node_input, started, failed)
+
+    return timed
+
+
+
+def metrics_payload() -> tuple:
+    """(body, content type) for /metrics; aggregates all workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+from core.metrics import SINGLE_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the work, callers arriving
+    while it is in flight wait for it and get the same result (or exception). Nothing is kept
+    once the call finishes - repeats after that are the semantic cache's job.
+    """
+
+    def __init__(self, name: str):
+
+        self.name = name
+        self._calls = {}   # key -> Future, for threads
+        self._tasks = {}   # (event loop, key) -> asyncio.Task
+        self._lock = threading.Lock()
+
+
+    def do(self, key: str, func, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            self._record("coalesced", key)
+            return future.result()
+
+        self._record("executed", key)
+        try:
+            result = func(*args)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+    async def ado(self, key: str, func, *args):
+        """Async do(); func is a coroutine function. The work runs as its own task, so a cancelled caller does not cancel it for the others"""
+        task_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(task_key)
+
+        if task is None:
+            self._record("executed", key)
+            task = asyncio.ensure_future(func(*args))
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda done: self._tasks.pop(task_key, None) if self._tasks.get(task_key) is done else None)
+        else:
+            self._record("coalesced", key)
+
+        return await asyncio.shield(task)
+
+
+    def _record(self, outcome: str, key: str) -> None:
+        SINGLE_FLIGHT.labels(self.name, outcome).inc()
+        if outcome == "coalesced":
+            logger.info(f"{self.name}: joined in-flight execution {key[:12]}")
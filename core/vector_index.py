@@ -0,0 +1,90 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+
+class VectorIndex:
+    """
+    Keyed rows of float32 vectors (plus optional per-row extras, e.g. label vectors) for
+    brute-force similarity scans. The matrix is preallocated and doubled when full, so an
+    insert is amortised O(1); a removal moves the last row into the gap. Not thread-safe -
+    callers hold their own lock, and must not keep views across writes.
+    """
+
+    def __init__(self, extra_width: int = 0, initial_capacity: int = 64):
+
+        self.extra_width = extra_width
+        self.keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._capacity = initial_capacity
+        self._vectors: Optional[np.ndarray] = None
+        self._extras = np.zeros((initial_capacity, extra_width), dtype=np.float32)
+
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+
+    def vectors(self) -> np.ndarray:
+        if self._vectors is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._vectors[: len(self.keys)]
+
+
+    def extras(self) -> np.ndarray:
+        return self._extras[: len(self.keys)]
+
+
+    def add(self, key: str, vector: np.ndarray, extra: np.ndarray = None) -> None:
+        """Insert a row, or overwrite it when the key is already indexed"""
+        row = self._rows.get(key)
+        if row is None:
+            if self._vectors is None:
+                self._vectors = np.zeros((self._capacity, len(vector)), dtype=np.float32)
+            elif len(self.keys) == self._capacity:
+                self._grow()
+            row = len(self.keys)
+            self.keys.append(key)
+            self._rows[key] = row
+
+        self._vectors[row] = vector
+        if extra is not None:
+            self._extras[row] = extra
+
+
+    def set_extra(self, key: str, extra: np.ndarray) -> bool:
+        row = self._rows.get(key)
+        if row is None:
+            return False
+        self._extras[row] = extra
+        return True
+
+
+    def remove(self, key: str) -> bool:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+
+        last = len(self.keys) - 1
+        if row != last:
+            moved = self.keys[last]
+            self.keys[row] = moved
+            self._rows[moved] = row
+            self._vectors[row] = self._vectors[last]
+            self._extras[row] = self._extras[last]
+        self.keys.pop()
+        return True
+
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        vectors = np.zeros((self._capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[: len(self.keys)] = self._vectors
+        extras = np.zeros((self._capacity, self.extra_width), dtype=np.float32)
+        extras[: len(self.keys)] = self._extras
+        self._vectors, self._extras = vectors, extras
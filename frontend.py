@@ -1,13 +1,10 @@
-import os
 import asyncio
-from datetime import datetime
 
 import streamlit as st
 from audio_recorder_streamlit import audio_recorder
 
 from schemas.routes.text_query import TextQuerySchema
-from schemas.routes.audio_query import AudioQuerySchema 
-from application import process_text_query, process_audio_query
+from application import process_text_query, process_audio_bytes
 
 
 hide_streamlit_style = """
@@ -204,34 +201,10 @@ async def send_query(query):
         return f"Connection error: {str(e)}"
 
 
-#helper funtion to save audio.wav
-def save_audio_as_wav(audio_bytes: bytes, dir_path: str = "recordings") -> str | None:
-
-    try:
-        # Ensure the directory exists
-        os.makedirs(dir_path, exist_ok=True)
-
-        timestamp   = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename    = f"audio_recording_{timestamp}.wav"
-        file_path   = os.path.join(dir_path, filename)
-
-        with open(file_path, "wb") as f:
-            f.write(audio_bytes)
-
-        # return file_path
-        return file_path
-    
-    except Exception as e:
-        st.error(f"❌ Couldn’t save audio: {e}")
-        return None
-
-
-async def send_voice(file_path):
-    """Send audio file to FastAPI backend"""
+async def send_voice(audio_bytes):
+    """Send the recorded audio to the FastAPI backend in memory - nothing is written to disk"""
     try:
-        data = AudioQuerySchema(file_path=file_path)
-        
-        response = await process_audio_query(data)
+        response = await process_audio_bytes(audio_bytes, "recording.wav")
         
         return response['message']
 
@@ -274,12 +247,10 @@ async def main():
 
     if audio_bytes:
         with st.spinner("Processing voice input..."):
-            path = save_audio_as_wav(audio_bytes)
-            if path:
-                response = await send_voice(path)
-                st.success("✅ Voice input processed!")
-                st.markdown("#### Voice Response:")
-                st.markdown(response)
+            response = await send_voice(audio_bytes)
+            st.success("✅ Voice input processed!")
+            st.markdown("#### Voice Response:")
+            st.markdown(response)
 
     if st.button("🗑 Clear", help="Clear the input field"):
         st.session_state.user_input = ""
@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+
+@dataclass
+class ExternalCall:
+    service: str                   # "openai", "deepl", "qdrant", "tavily" or "groq"
+    operation: str                 # e.g. "generate_response", "translate", "query_batch"
+    latency_ms: float = 0.0
+    tokens: int = 0                # LLM tokens when the provider reports them
+    characters: int = 0            # characters sent (DeepL, embeddings) or received (transcription)
+    error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.service}.{self.operation}"
@@ -1,20 +1,37 @@
 
 from dataclasses import dataclass, field
-from typing import List, Optional, Set, Dict, Any
+from typing import Annotated, List, Optional, Set, Dict, Any
 
 from schemas.data_classes.content_type import ContentType
 
 
 
+def merge_retrieved_documents(current: Dict[str, List[Dict[str, Any]]], update: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Reducer so parallel retrieval branches can each write their own source key"""
+    return {**current, **update}
+
+
+def merge_completed_sources(current: Set[ContentType], update: Set[ContentType]) -> Set[ContentType]:
+    """Reducer unioning the sources finished by parallel retrieval branches"""
+    return current | update
+
+
+def keep_first_error(current: Optional[str], update: Optional[str]) -> Optional[str]:
+    """Reducer keeping the first error reported by any branch"""
+    return current or update
+
+
+
 @dataclass
 class LangraphState:
     user_query: str
     base_prompt: str
     final_response: str = ""
     current_source_index: int = 0
-    error_message: Optional[str] = None
+    error_message: Annotated[Optional[str], keep_first_error] = None
     web_search_results: List[Dict] = field(default_factory=list)
-    completed_sources: Set[ContentType] = field(default_factory=set)
+    completed_sources: Annotated[Set[ContentType], merge_completed_sources] = field(default_factory=set)
     required_sources: List[ContentType] = field(default_factory=list)
-    retrieved_documents: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    retrieved_documents: Annotated[Dict[str, List[Dict[str, Any]]], merge_retrieved_documents] = field(default_factory=dict)
     detected_language: Optional[str] = None  # <-- add this field
+    query_embedding: Optional[List[float]] = None  # computed once per request, shared by every collection
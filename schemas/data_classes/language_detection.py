@@ -0,0 +1,15 @@
+
+from dataclasses import dataclass
+
+
+
+@dataclass
+class LanguageDetection:
+    language: str          # "EN", "RU", "UK" or "UNKNOWN"
+    confidence: float      # 0..1
+    path: str              # how the decision was reached, for the logs
+    cyrillic_ratio: float = 0.0
+
+    @property
+    def is_english(self) -> bool:
+        return self.language == "EN"
@@ -0,0 +1,11 @@
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+
+
+@dataclass
+class SourcePrediction:
+    required_sources: List[str]    # ContentType values, most likely first
+    confidence: float              # 0..1, how unanimous the neighbours are on every label
+    similarity: float              # cosine similarity of the nearest logged query
+    label_scores: Dict[str, float] = field(default_factory=dict)
@@ -0,0 +1,119 @@
+"""
+Compare reranker backends against the current PyTorch fp32 path: latency per rerank call and
+ranking agreement (top-k overlap and Spearman correlation of the scores).
+
+Usage:
+    python -m scripts.benchmark_reranker
+    python -m scripts.benchmark_reranker --candidates onnx:cross-encoder/ms-marco-MiniLM-L-6-v2 \\
+        onnx:cross-encoder/ms-marco-TinyBERT-L-2-v2 --threads 4 --pairs-file pairs.json
+
+--pairs-file is a JSON list of {"query": str, "documents": [str, ...]} objects, e.g. dumped from
+retrieved_documents; without it a small built-in sample is used.
+"""
+
+import json
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+from services.reranker_service import build_reranker
+
+
+SAMPLE_QUERIES = [
+    {
+        "query": "What does Islam say about patience during hardship?",
+        "documents": [
+            "O you who have believed, seek help through patience and prayer. Indeed, Allah is with the patient.",
+            "And We will surely test you with something of fear and hunger and a loss of wealth and lives and fruits, but give good tidings to the patient.",
+            "The Prophet said: How wonderful is the affair of the believer, for his affairs are all good. If something good happens to him he is thankful, and if something bad happens to him he is patient.",
+            "Zakat is obligatory on gold and silver once the nisab is reached and a lunar year has passed.",
+            "The pilgrimage to Mecca is obligatory once in a lifetime for every adult Muslim who is able.",
+            "Sabr is of three kinds: patience in obeying Allah, patience in avoiding sins, and patience with the decree of Allah. " * 8,
+            "Fasting in Ramadan was prescribed in the second year after the Hijrah.",
+            "Whoever remains patient, Allah will make him patient. Nobody can be given a blessing better and greater than patience.",
+        ]
+    },
+    {
+        "query": "How many times a day do Muslims pray?",
+        "documents": [
+            "The five daily prayers are Fajr, Dhuhr, Asr, Maghrib and Isha.",
+            "Establish prayer at the decline of the sun until the darkness of the night and the Quran of dawn.",
+            "The Night Journey is when the five daily prayers were made obligatory upon the Prophet's community.",
+            "Charity does not decrease wealth.",
+            "The companions narrated that the Prophet would pray two units before Fajr and never left them. " * 10,
+            "Abu Bakr was the first caliph after the death of the Prophet.",
+        ]
+    },
+]
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def spearman(a, b) -> float:
+    ranks_a = np.argsort(np.argsort(a))
+    ranks_b = np.argsort(np.argsort(b))
+    if len(a) < 2:
+        return 1.0
+    return float(np.corrcoef(ranks_a, ranks_b)[0, 1])
+
+
+def run(reranker, samples, iterations: int):
+    """Scores for every sample plus per-call latencies in milliseconds"""
+    scores = [reranker.predict([(sample["query"], doc) for doc in sample["documents"]]) for sample in samples]  # warm-up
+    latencies = []
+    for _ in range(iterations):
+        for sample in samples:
+            pairs = [(sample["query"], doc) for doc in sample["documents"]]
+            started = time.perf_counter()
+            reranker.predict(pairs)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return scores, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reranker backends against the PyTorch baseline")
+    parser.add_argument("--baseline", default="torch:cross-encoder/ms-marco-MiniLM-L-6-v2", help="backend:model")
+    parser.add_argument("--candidates", nargs="+", default=["onnx:cross-encoder/ms-marco-MiniLM-L-6-v2"], help="backend:model ...")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--pairs-file")
+    args = parser.parse_args()
+
+    samples = SAMPLE_QUERIES
+    if args.pairs_file:
+        with open(args.pairs_file, encoding="utf-8") as f:
+            samples = json.load(f)
+
+    def load(spec):
+        backend, model_name = spec.split(":", 1)
+        return build_reranker(backend=backend, model_name=model_name, threads=args.threads)
+
+    baseline_scores, baseline_latencies = run(load(args.baseline), samples, args.iterations)
+
+    print(f"{'reranker':<60} {'p50 ms':>8} {'p95 ms':>8} {'top-k overlap':>14} {'spearman':>9}")
+    print(f"{args.baseline:<60} {percentile(baseline_latencies, 50):>8.1f} {percentile(baseline_latencies, 95):>8.1f} {1.0:>14.2f} {1.0:>9.3f}")
+
+    for spec in args.candidates:
+        scores, latencies = run(load(spec), samples, args.iterations)
+
+        overlaps, correlations = [], []
+        for expected, actual in zip(baseline_scores, scores):
+            k = min(args.top_k, len(expected))
+            top_expected = set(np.argsort(expected)[::-1][:k])
+            top_actual = set(np.argsort(actual)[::-1][:k])
+            overlaps.append(len(top_expected & top_actual) / k)
+            correlations.append(spearman(expected, actual))
+
+        print(
+            f"{spec:<60} {percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} "
+            f"{statistics.mean(overlaps):>14.2f} {statistics.mean(correlations):>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
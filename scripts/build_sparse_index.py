@@ -0,0 +1,88 @@
+"""
+Offline job: build the local BM25 indexes used by hybrid retrieval (HYBRID_RETRIEVAL) from the
+payloads of the Hadith and General Islamic Info collections.
+
+Usage:
+    python -m scripts.build_sparse_index --collections hadith general_islamic_info
+
+page_content and the string metadata fields (narrator, book, reference, ...) are indexed under the
+Qdrant point id. Re-run after upserting points; the service loads the indexes at startup.
+"""
+
+import os
+import argparse
+import logging
+
+from qdrant_client import QdrantClient
+
+from core.config import settings
+from core.app_logging import configure_logging
+from services.sparse_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
+
+COLLECTIONS = {
+    "hadith": (settings.HADITH_QDRANT_URL, settings.HADITH_QDRANT_API_KEY, settings.HADITH_COLLECTION_NAME),
+    "general_islamic_info": (settings.GENERAL_ISLAMIC_INFO_URL, settings.GENERAL_ISLAMIC_INFO_KEY, settings.ISLAMIC_INFO_COLLECTION_NAME),
+}
+
+# Translations would mix Russian terms into the English index
+SKIPPED_METADATA_FIELDS = {"ru_translation"}
+
+
+
+def indexed_text(payload: dict) -> str:
+    metadata = payload.get("metadata") or {}
+    fields = [
+        str(value) for key, value in metadata.items()
+        if key not in SKIPPED_METADATA_FIELDS and isinstance(value, (str, int))
+    ]
+    return " ".join([payload.get("page_content", "")] + fields)
+
+
+def scroll_documents(client: QdrantClient, collection_name: str, batch_size: int):
+    """Yield (point id, text) for every point of the collection"""
+    offset = None
+    scanned = 0
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False
+        )
+        for point in points:
+            yield point.id, indexed_text(point.payload or {})
+
+        scanned += len(points)
+        logger.info(f"{collection_name}: scanned {scanned} points")
+        if offset is None:
+            break
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build BM25 indexes for hybrid retrieval")
+    parser.add_argument("--collections", nargs="+", default=list(COLLECTIONS), choices=list(COLLECTIONS))
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--output-dir", default=os.path.join(settings.CACHE_DIR, "sparse"))
+    args = parser.parse_args()
+
+    configure_logging()
+    logging.getLogger().addHandler(logging.StreamHandler())
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    for content_type in args.collections:
+        url, api_key, collection_name = COLLECTIONS[content_type]
+        client = QdrantClient(url=url, api_key=api_key)
+
+        index = BM25Index.build(scroll_documents(client, collection_name, args.batch_size))
+        path = os.path.join(args.output_dir, f"{content_type}.npz")
+        index.save(path)
+        logger.info(f"{collection_name}: indexed {len(index.ids)} documents, {len(index.terms)} terms -> {path}")
+
+
+if __name__ == "__main__":
+    main()
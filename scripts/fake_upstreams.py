@@ -0,0 +1,432 @@
+"""
+Offline stand-ins for every upstream the chatbot calls - OpenAI chat and embeddings, DeepL,
+Tavily, Groq Whisper, Qdrant and the cross-encoder reranker - for scripts.load_test.
+
+The fakes replace the SDK clients inside the services, so the service code itself (caches,
+call ledger, metrics, structured output handling) still runs. Each fake sleeps for a latency
+drawn from a log-normal distribution around its profile's median and fails at its error rate.
+Qdrant is an in-memory instance loaded with synthetic collections.
+"""
+
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import numpy as np
+from qdrant_client import QdrantClient, AsyncQdrantClient, models
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from services.sparse_index import tokenize
+
+
+# (English term, Russian term, sources a question about it needs)
+TOPICS = [
+    ("patience", "терпение", ["quran", "hadith"]),
+    ("prayer", "молитва", ["quran", "hadith", "tafseer"]),
+    ("fasting", "пост", ["quran", "hadith"]),
+    ("charity", "милостыня", ["quran", "hadith", "islamic_info"]),
+    ("pilgrimage", "паломничество", ["hadith", "islamic_info"]),
+    ("mercy", "милосердие", ["quran", "tafseer"]),
+    ("knowledge", "знание", ["hadith", "islamic_info"]),
+    ("parents", "родители", ["quran", "hadith"]),
+    ("honesty", "честность", ["hadith"]),
+    ("repentance", "покаяние", ["quran", "tafseer"]),
+    ("marriage", "брак", ["hadith", "islamic_info"]),
+    ("justice", "справедливость", ["quran", "tafseer"]),
+]
+
+QUESTION_TEMPLATES = {
+    "EN": ["What does Islam say about {topic}?", "Explain the importance of {topic} in Islam", "Which verses mention {topic}?"],
+    "RU": ["Что говорит ислам о теме: {topic}?", "Объясните значение слова {topic} в исламе", "Какие аяты упоминают {topic}?"],
+}
+
+FILLER_WORDS = "the believers were told by the prophet that allah rewards those who keep to this with sincerity every day".split()
+
+EN_TO_RU = {en: ru for en, ru, _ in TOPICS}
+RU_TO_EN = {ru: en for en, ru, _ in TOPICS}
+
+EMBEDDING_DIM = 384
+
+
+
+@dataclass
+class UpstreamProfile:
+    latency_ms: float              # median latency
+    sigma: float = 0.4             # log-normal spread - 0.4 puts p99 at ~2.5x the median
+    error_rate: float = 0.0
+
+
+DEFAULT_PROFILES = {
+    "openai.chat": UpstreamProfile(1500, 0.5),
+    "openai.classify": UpstreamProfile(700, 0.4),
+    "openai.is_english": UpstreamProfile(400, 0.4),
+    "openai.embeddings": UpstreamProfile(150, 0.4),
+    "deepl": UpstreamProfile(300, 0.4),
+    "tavily": UpstreamProfile(1800, 0.5),
+    "groq": UpstreamProfile(1000, 0.4),
+    "qdrant": UpstreamProfile(40, 0.3),
+    "reranker": UpstreamProfile(80, 0.3),
+}
+
+
+
+class UpstreamError(Exception):
+    """Injected failure of a fake upstream"""
+
+
+
+class Upstreams:
+    """Latency and error sampling shared by all fakes, seeded for repeatable runs"""
+
+    def __init__(self, profiles: Optional[Dict[str, UpstreamProfile]] = None, seed: int = 0):
+
+        self.profiles = {**DEFAULT_PROFILES, **(profiles or {})}
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+
+    def _sample(self, name: str) -> float:
+        profile = self.profiles[name]
+        with self._lock:
+            delay = profile.latency_ms * self.rng.lognormvariate(0, profile.sigma) / 1000
+            failed = self.rng.random() < profile.error_rate
+        if failed:
+            raise UpstreamError(f"injected {name} failure")
+        return delay
+
+
+    def wait(self, name: str) -> None:
+        time.sleep(self._sample(name))
+
+
+    async def await_(self, name: str) -> None:
+        await asyncio.sleep(self._sample(name))
+
+
+
+def topic_of(text: str) -> Optional[tuple]:
+    words = set(tokenize(text))
+    for topic in TOPICS:
+        if topic[0] in words or tokenize(topic[1])[0] in words:
+            return topic
+    return None
+
+
+def embed_text(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Hashed bag of words, L2 normalised - texts sharing terms land close together"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokenize(text):
+        digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = 1.0
+        norm = 1.0
+    return (vector / norm).tolist()
+
+
+def sample_queries(count: int, ru_share: float, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        language = "RU" if rng.random() < ru_share else "EN"
+        en, ru, _ = rng.choice(TOPICS)
+        queries.append(rng.choice(QUESTION_TEMPLATES[language]).format(topic=ru if language == "RU" else en))
+    return queries
+
+
+
+class FakeChatModel:
+    """ChatOpenAI stand-in: invoke / ainvoke / astream and with_structured_output for classification"""
+
+    def __init__(self, upstreams: Upstreams, schema=None, answer_words: int = 120):
+
+        self.upstreams = upstreams
+        self.schema = schema
+        self.answer_words = answer_words
+
+
+    def with_structured_output(self, schema):
+        return FakeChatModel(self.upstreams, schema, self.answer_words)
+
+
+    def _respond(self, messages):
+        query = messages[-1].content
+        if self.schema is not None:
+            topic = topic_of(query)
+            sources = topic[2] if topic else ["islamic_info"]
+            return self.schema(required_sources=sources, reasoning="synthetic classification")
+
+        rng = random.Random(query)
+        words = [rng.choice(FILLER_WORDS) for _ in range(self.answer_words)]
+        content = f"Answer to: {query}\n" + " ".join(words)
+        prompt_tokens = sum(len(message.content) for message in messages) // 4
+        return AIMessage(
+            content=content,
+            usage_metadata={"input_tokens": prompt_tokens, "output_tokens": self.answer_words, "total_tokens": prompt_tokens + self.answer_words}
+        )
+
+
+    def _profile(self) -> str:
+        return "openai.classify" if self.schema is not None else "openai.chat"
+
+
+    def invoke(self, messages):
+        self.upstreams.wait(self._profile())
+        return self._respond(messages)
+
+
+    async def ainvoke(self, messages):
+        await self.upstreams.await_(self._profile())
+        return self._respond(messages)
+
+
+    async def astream(self, messages):
+        # Time to first token is a fifth of the call, the rest is spread over the tokens
+        total = self.upstreams._sample("openai.chat")
+        words = self._respond(messages).content.split(" ")
+        await asyncio.sleep(total / 5)
+        for word in words:
+            await asyncio.sleep(total * 0.8 / len(words))
+            yield AIMessageChunk(content=word + " ")
+
+
+
+class FakeOpenAIClient:
+    """openai.OpenAI / AsyncOpenAI stand-in for the chat.completions language check"""
+
+    def __init__(self, upstreams: Upstreams, asynchronous: bool = False):
+
+        self.upstreams = upstreams
+        create = self._acreate if asynchronous else self._create
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+    def _reply(self, messages) -> SimpleNamespace:
+        text = messages[-1]["content"]
+        cyrillic = sum(1 for ch in text if "Ѐ" <= ch <= "ӿ")
+        reply = "no" if cyrillic > len(text) / 4 else "yes"
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=reply))],
+            usage=SimpleNamespace(total_tokens=len(text) // 4 + 60)
+        )
+
+
+    def _create(self, model, messages, **kwargs):
+        self.upstreams.wait("openai.is_english")
+        return self._reply(messages)
+
+
+    async def _acreate(self, model, messages, **kwargs):
+        await self.upstreams.await_("openai.is_english")
+        return self._reply(messages)
+
+
+
+class FakeEmbeddings:
+    """OpenAIEmbeddings stand-in, wrapped by CachedEmbeddings like the real one"""
+
+    def __init__(self, upstreams: Upstreams, dim: int = EMBEDDING_DIM):
+
+        self.upstreams = upstreams
+        self.dim = dim
+
+
+    def embed_query(self, text: str) -> List[float]:
+        self.upstreams.wait("openai.embeddings")
+        return embed_text(text, self.dim)
+
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await self.upstreams.await_("openai.embeddings")
+        return embed_text(text, self.dim)
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.upstreams.wait("openai.embeddings")
+        return [embed_text(text, self.dim) for text in texts]
+
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await self.upstreams.await_("openai.embeddings")
+        return [embed_text(text, self.dim) for text in texts]
+
+
+
+class FakeTranslator:
+    """deepl.Translator stand-in - swaps the topic terms, prefixes everything else"""
+
+    def __init__(self, upstreams: Upstreams):
+
+        self.upstreams = upstreams
+
+
+    def _translate(self, text: str, target_lang: str) -> SimpleNamespace:
+        source_lang = "RU" if any("Ѐ" <= ch <= "ӿ" for ch in text) else "EN"
+        if target_lang.upper().startswith("EN"):
+            translated = " ".join(RU_TO_EN.get(word.strip("?.,").lower(), word) for word in text.split())
+        else:
+            translated = "[RU] " + " ".join(EN_TO_RU.get(word.strip("?.,").lower(), word) for word in text.split())
+        return SimpleNamespace(text=translated, detected_source_lang=source_lang)
+
+
+    def translate_text(self, text, target_lang: str, **kwargs):
+        self.upstreams.wait("deepl")
+        if isinstance(text, list):
+            return [self._translate(part, target_lang) for part in text]
+        return self._translate(text, target_lang)
+
+
+
+class FakeTavily:
+    """TavilyClient stand-in"""
+
+    def __init__(self, upstreams: Upstreams):
+
+        self.upstreams = upstreams
+
+
+    def search(self, query: str, max_results: int = 1, **kwargs) -> dict:
+        self.upstreams.wait("tavily")
+        rng = random.Random(query)
+        return {
+            "answer": f"Synthetic answer about {query}",
+            "results": [
+                {
+                    "title": f"Article {i} on {query}",
+                    "url": f"https://example.org/{i}",
+                    "content": " ".join(rng.choice(FILLER_WORDS) for _ in range(200)),
+                    "score": round(0.9 - i * 0.1, 2)
+                }
+                for i in range(max_results)
+            ]
+        }
+
+
+
+class FakeGroq:
+    """Groq / AsyncGroq stand-in; the transcript is looked up by the audio bytes"""
+
+    def __init__(self, upstreams: Upstreams, transcripts: Dict[str, str], asynchronous: bool = False):
+
+        self.upstreams = upstreams
+        self.transcripts = transcripts
+        create = self._acreate if asynchronous else self._create
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=create))
+
+
+    def _transcript(self, file) -> str:
+        _, audio_bytes = file
+        return self.transcripts.get(hashlib.sha256(audio_bytes).hexdigest(), "What does Islam say about patience?")
+
+
+    def _create(self, file, **kwargs) -> str:
+        self.upstreams.wait("groq")
+        return self._transcript(file)
+
+
+    async def _acreate(self, file, **kwargs) -> str:
+        await self.upstreams.await_("groq")
+        return self._transcript(file)
+
+
+
+class FakeReranker:
+    """Cross-encoder stand-in scoring query/document term overlap"""
+
+    backend = "fake"
+    model_name = "fake-lexical"
+
+    def __init__(self, upstreams: Upstreams):
+
+        self.upstreams = upstreams
+
+
+    def predict(self, pairs) -> List[float]:
+        self.upstreams.wait("reranker")
+        scores = []
+        for query, document in pairs:
+            query_terms = set(tokenize(query))
+            document_terms = set(tokenize(document))
+            scores.append(len(query_terms & document_terms) / (len(query_terms) or 1))
+        return scores
+
+
+
+class DelayedClient:
+    """Adds the profile's latency (and errors) to the listed methods of a client, sync or async"""
+
+    def __init__(self, client, upstreams: Upstreams, profile: str, methods: tuple, asynchronous: bool = False):
+
+        self._client = client
+        self._upstreams = upstreams
+        self._profile = profile
+        self._methods = set(methods)
+        self._asynchronous = asynchronous
+
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name not in self._methods:
+            return attribute
+
+        if self._asynchronous:
+            async def delayed(*args, **kwargs):
+                await self._upstreams.await_(self._profile)
+                return await attribute(*args, **kwargs)
+        else:
+            def delayed(*args, **kwargs):
+                self._upstreams.wait(self._profile)
+                return attribute(*args, **kwargs)
+        return delayed
+
+
+
+def synthetic_points(content_type: str, count: int, seed: int = 0, dim: int = EMBEDDING_DIM) -> List[models.PointStruct]:
+    """Points shaped like the production payloads of each collection"""
+    rng = random.Random(f"{seed}:{content_type}")
+    points = []
+    for i in range(count):
+        en, ru, _ = TOPICS[i % len(TOPICS)]
+        text = f"On {en}: " + " ".join(rng.choice(FILLER_WORDS) for _ in range(60))
+        metadata = {"reference": f"{content_type} {i // 10 + 1}:{i % 10 + 1}"}
+        if content_type == "quran":
+            metadata.update(ru_translation=f"О {ru}: " + text, surah_number=i // 10 + 1)
+        elif content_type == "tafseer":
+            metadata.update(As_Saadi_Tafseer=text, Ibni_kathir_quran_tafsir=text[::-1], ayah_translation=text[:80])
+        elif content_type == "hadith":
+            metadata.update(narrator="Abu Hurairah", book="Sahih al-Bukhari")
+
+        payload = {"page_content": text, "metadata": metadata}
+        if content_type == "general_islamic_info":
+            payload["content"] = text  # the fallback retrieval reads "content"
+        points.append(models.PointStruct(id=i, vector=embed_text(text, dim), payload=payload))
+    return points
+
+
+def load_qdrant(collections: Dict[str, str], points_per_collection: int, seed: int = 0, dim: int = EMBEDDING_DIM):
+    """
+    In-memory (sync, async) Qdrant clients holding a synthetic collection per content type.
+    Returns the clients and the points, e.g. to build the BM25 indexes from.
+    """
+    client = QdrantClient(location=":memory:")
+    async_client = AsyncQdrantClient(location=":memory:")
+    points = {content_type: synthetic_points(content_type, points_per_collection, seed, dim) for content_type in collections}
+
+    async def aload():
+        for content_type, collection_name in collections.items():
+            await async_client.create_collection(collection_name, vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE))
+            await async_client.upsert(collection_name, points=points[content_type])
+
+    for content_type, collection_name in collections.items():
+        client.create_collection(collection_name, vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE))
+        client.upsert(collection_name, points=points[content_type])
+    asyncio.run(aload())
+
+    return client, async_client, points
@@ -0,0 +1,270 @@
+"""
+Offline load test: drive /text_query and /audio_query at a target request rate with every
+upstream replaced by the fakes in scripts.fake_upstreams, then report throughput and
+p50/p95/p99 latency per endpoint. Needs no network and no API keys.
+
+Usage:
+    python -m scripts.load_test --rps 20 --duration 60
+    python -m scripts.load_test --rps 5 --audio-share 0.2 --profile openai.chat=3000:0.02 --metrics-out metrics.txt
+    ASYNC_MODE=false SEMANTIC_CACHE_ENABLED=false python -m scripts.load_test --rps 5
+
+Requests are sent in-process through an ASGI transport, open loop: each request starts on its
+schedule whether or not earlier ones have finished, and latency is measured from the scheduled
+start, so a saturated server shows up as growing latency rather than a lower send rate.
+--profile NAME=MEDIAN_MS[:ERROR_RATE[:SIGMA]] overrides a fake's latency distribution; the names
+are those of fake_upstreams.DEFAULT_PROFILES. Other settings come from the environment as usual.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+
+# Placeholder credentials and endpoints - set before core.config is imported, and overriding any
+# .env values, so that nothing can reach the real services
+OFFLINE_ENVIRONMENT = {
+    "OPENAI_API_KEY": "sk-offline",
+    "DEEPL_API_KEY": "offline:fx",
+    "GROQ_API_KEY": "offline",
+    "TAVILY_API_KEY": "offline",
+    "GEMINI_API_KEY": "offline",
+    "QURAN_QDRANT_URL": "http://127.0.0.1:9",
+    "HADITH_QDRANT_URL": "http://127.0.0.1:9",
+    "TAFSEER_QDRANT_URL": "http://127.0.0.1:9",
+    "GENERAL_ISLAMIC_INFO_URL": "http://127.0.0.1:9",
+    "QURAN_QDRANT_API_KEY": "offline",
+    "HADITH_QDRANT_API_KEY": "offline",
+    "TAFSEER_QDRANT_API_KEY": "offline",
+    "GENERAL_ISLAMIC_INFO_KEY": "offline",
+    "HF_HUB_OFFLINE": "1",
+}
+
+
+
+def parse_profiles(specs):
+    from scripts.fake_upstreams import DEFAULT_PROFILES, UpstreamProfile
+
+    profiles = {}
+    for spec in specs or []:
+        name, _, values = spec.partition("=")
+        if name not in DEFAULT_PROFILES:
+            raise SystemExit(f"Unknown profile {name}, expected one of {sorted(DEFAULT_PROFILES)}")
+        parts = [float(value) for value in values.split(":")]
+        default = DEFAULT_PROFILES[name]
+        profiles[name] = UpstreamProfile(
+            latency_ms=parts[0],
+            error_rate=parts[1] if len(parts) > 1 else default.error_rate,
+            sigma=parts[2] if len(parts) > 2 else default.sigma
+        )
+    return profiles
+
+
+def write_audio_files(directory: str, transcripts: list) -> dict:
+    """One small WAV file per transcript; returns {file path: transcript}"""
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for i, transcript in enumerate(transcripts):
+        samples = np.random.default_rng(i).integers(-2000, 2000, 16000, dtype=np.int16).tobytes()
+        header = b"RIFF" + (36 + len(samples)).to_bytes(4, "little") + b"WAVEfmt " + (16).to_bytes(4, "little") \
+            + (1).to_bytes(2, "little") + (1).to_bytes(2, "little") + (16000).to_bytes(4, "little") \
+            + (32000).to_bytes(4, "little") + (2).to_bytes(2, "little") + (16).to_bytes(2, "little") \
+            + b"data" + len(samples).to_bytes(4, "little")
+        path = os.path.join(directory, f"query_{i}.wav")
+        with open(path, "wb") as f:
+            f.write(header + samples)
+        files[path] = transcript
+    return files
+
+
+def setup(args):
+    """Start the app in-process with every upstream faked; returns the FastAPI application and the audio files"""
+    for key, value in OFFLINE_ENVIRONMENT.items():
+        os.environ[key] = value
+    os.environ["CACHE_DIR"] = args.cache_dir
+
+    from core.config import settings
+    from scripts import fake_upstreams
+    from services.sparse_index import BM25Index
+    from services.audio_processing import prepare_audio
+
+    upstreams = fake_upstreams.Upstreams(parse_profiles(args.profile), seed=args.seed)
+
+    collections = {
+        "quran": settings.QURAN_COLLECTION_NAME,
+        "hadith": settings.HADITH_COLLECTION_NAME,
+        "tafseer": settings.TAFSEER_COLLECTION_NAME,
+        "general_islamic_info": settings.ISLAMIC_INFO_COLLECTION_NAME,
+    }
+    client, async_client, points = fake_upstreams.load_qdrant(collections, args.points, seed=args.seed)
+
+    # The service loads the BM25 indexes at startup, so they are written before it is imported
+    sparse_dir = os.path.join(args.cache_dir, "sparse")
+    os.makedirs(sparse_dir, exist_ok=True)
+    for content_type in settings.HYBRID_SOURCES:
+        if content_type in points:
+            index = BM25Index.build((point.id, point.payload["page_content"]) for point in points[content_type])
+            index.save(os.path.join(sparse_dir, f"{content_type}.npz"))
+
+    if not args.real_reranker:
+        import services.qdrant_service
+        services.qdrant_service.build_reranker = lambda: fake_upstreams.FakeReranker(upstreams)
+
+    import application
+    from services.open_ai_service import openai_service
+
+    langgraph_service = application.langgraph_service.get()
+    groq_service = application.groq_service.get()
+
+    openai_service.llm = fake_upstreams.FakeChatModel(upstreams)
+    openai_service.client = fake_upstreams.FakeOpenAIClient(upstreams)
+    openai_service.async_client = fake_upstreams.FakeOpenAIClient(upstreams, asynchronous=True)
+    openai_service.embeddings.embeddings = fake_upstreams.FakeEmbeddings(upstreams)
+
+    langgraph_service.tavily_client = fake_upstreams.FakeTavily(upstreams)
+    application.deepl_services.get().translator = fake_upstreams.FakeTranslator(upstreams)
+
+    qdrant_service = langgraph_service.qdrant_service
+    methods = ("search", "query_batch_points", "retrieve")
+    for content_type in qdrant_service.qdrant_clients:
+        qdrant_service.qdrant_clients[content_type] = fake_upstreams.DelayedClient(client, upstreams, "qdrant", methods)
+        qdrant_service.async_qdrant_clients[content_type] = fake_upstreams.DelayedClient(async_client, upstreams, "qdrant", methods, asynchronous=True)
+
+    audio_transcripts = fake_upstreams.sample_queries(args.audio_files, args.ru_share, seed=args.seed + 1)
+    audio_files = write_audio_files(os.path.join(args.cache_dir, "audio"), audio_transcripts)
+    transcripts = {}
+    for path, transcript in audio_files.items():
+        with open(path, "rb") as f:
+            # FakeGroq sees the pre-processed upload (one chunk for these short clips), not the file
+            chunks, _ = prepare_audio(f.read())
+            transcripts[hashlib.sha256(chunks[0]).hexdigest()] = transcript
+    groq_service.client = fake_upstreams.FakeGroq(upstreams, transcripts)
+    groq_service.async_client = fake_upstreams.FakeGroq(upstreams, transcripts, asynchronous=True)
+
+    return application.application, list(audio_files)
+
+
+
+def plan_requests(args, audio_files: list) -> list:
+    """[(start offset in seconds, endpoint, JSON body)] at the target rate"""
+    from scripts.fake_upstreams import sample_queries
+
+    rng = random.Random(args.seed)
+    queries = sample_queries(args.unique_queries, args.ru_share, seed=args.seed)
+    total = int(args.rps * (args.duration + args.warmup))
+
+    plan = []
+    offset = 0.0
+    for _ in range(total):
+        if args.audio_share and rng.random() < args.audio_share:
+            plan.append((offset, "/audio_query", {"file_path": rng.choice(audio_files)}))
+        else:
+            plan.append((offset, "/text_query", {"query": rng.choice(queries)}))
+        offset += rng.expovariate(args.rps) if args.poisson else 1 / args.rps
+    return plan
+
+
+async def run_load(app, plan: list, timeout: float) -> list:
+    import httpx
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=timeout) as client:
+
+        async def send(scheduled: float, endpoint: str, body: dict):
+            ok = False
+            try:
+                response = await client.post(endpoint, json=body)
+                ok = response.status_code == 200 and response.json().get("status") == "success"
+            except Exception:
+                pass
+            results.append((scheduled - started, endpoint, time.perf_counter() - scheduled, ok))
+
+        started = time.perf_counter()
+        tasks = []
+        for offset, endpoint, body in plan:
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(started + offset, endpoint, body)))
+        await asyncio.gather(*tasks)
+
+    return results
+
+
+
+def report(results: list, warmup: float, duration: float) -> dict:
+    measured = [result for result in results if result[0] >= warmup]
+    summary = {}
+    for endpoint in sorted({result[1] for result in measured}) + ["all"]:
+        rows = [result for result in measured if endpoint in ("all", result[1])]
+        latencies = [result[2] * 1000 for result in rows if result[3]]
+        summary[endpoint] = {
+            "requests": len(rows),
+            "errors": sum(1 for result in rows if not result[3]),
+            "throughput_rps": round(len(latencies) / duration, 2),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1) if latencies else None,
+            "p95_ms": round(float(np.percentile(latencies, 95)), 1) if latencies else None,
+            "p99_ms": round(float(np.percentile(latencies, 99)), 1) if latencies else None,
+            "mean_ms": round(statistics.fmean(latencies), 1) if latencies else None,
+        }
+
+    print(f"\n{'endpoint':<14} {'requests':>8} {'errors':>7} {'ok rps':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, row in summary.items():
+        print(
+            f"{endpoint:<14} {row['requests']:>8} {row['errors']:>7} {row['throughput_rps']:>7} "
+            f"{row['p50_ms'] or '-':>9} {row['p95_ms'] or '-':>9} {row['p99_ms'] or '-':>9}"
+        )
+    return summary
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of /text_query and /audio_query")
+    parser.add_argument("--rps", type=float, default=10.0, help="target request rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of load before measuring")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times instead of a fixed interval")
+    parser.add_argument("--audio-share", type=float, default=0.0, help="fraction of requests sent to /audio_query")
+    parser.add_argument("--ru-share", type=float, default=0.3, help="fraction of Russian queries")
+    parser.add_argument("--unique-queries", type=int, default=200, help="size of the query pool requests are drawn from")
+    parser.add_argument("--audio-files", type=int, default=20)
+    parser.add_argument("--points", type=int, default=2000, help="synthetic points per collection")
+    parser.add_argument("--profile", action="append", help="NAME=MEDIAN_MS[:ERROR_RATE[:SIGMA]], repeatable")
+    parser.add_argument("--real-reranker", action="store_true", help="keep the configured cross-encoder (model must be available locally)")
+    parser.add_argument("--cache-dir", default=None, help="cache directory, a fresh temporary one by default")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json-out", help="write the summary as JSON")
+    parser.add_argument("--metrics-out", help="write the final /metrics exposition")
+    args = parser.parse_args()
+
+    args.cache_dir = args.cache_dir or tempfile.mkdtemp(prefix="load_test_")
+    app, audio_files = setup(args)
+    plan = plan_requests(args, audio_files)
+    print(f"Sending {len(plan)} requests at {args.rps} rps ({args.warmup}s warm-up), cache dir {args.cache_dir}", file=sys.stderr)
+
+    results = asyncio.run(run_load(app, plan, args.timeout))
+    summary = report(results, args.warmup, args.duration)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.metrics_out:
+        from core.metrics import metrics_payload
+        body, _ = metrics_payload()
+        with open(args.metrics_out, "wb") as f:
+            f.write(body)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Offline job: translate the page_content of the Hadith and General Islamic Info collections to
+Russian once and store it on each point as metadata.ru_translation, the same field the Quran
+collection already carries. The RU branch of the response generation then reads it directly.
+
+Usage:
+    python -m scripts.pretranslate_payloads --collections hadith general_islamic_info
+
+Progress is checkpointed per collection after every written batch, so an interrupted run
+resumes from the last scroll offset. --chars-per-second throttles DeepL usage.
+"""
+
+import os
+import json
+import time
+import argparse
+import logging
+
+import deepl
+from qdrant_client import QdrantClient, models
+
+from core.config import settings
+from core.app_logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+PRETRANSLATED_FIELD = "ru_translation"
+TARGET_LANG = "RU"
+
+COLLECTIONS = {
+    "hadith": (settings.HADITH_QDRANT_URL, settings.HADITH_QDRANT_API_KEY, settings.HADITH_COLLECTION_NAME),
+    "general_islamic_info": (settings.GENERAL_ISLAMIC_INFO_URL, settings.GENERAL_ISLAMIC_INFO_KEY, settings.ISLAMIC_INFO_COLLECTION_NAME),
+}
+
+
+
+class Checkpoint:
+    """Last scroll offset and progress counters for one collection, persisted as JSON"""
+
+    def __init__(self, checkpoint_dir: str, collection_name: str):
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.path = os.path.join(checkpoint_dir, f"{collection_name}.json")
+        self.state = {"offset": None, "translated": 0, "skipped": 0, "done": False}
+
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.state.update(json.load(f))
+
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+
+class RateLimiter:
+    """Keeps the average DeepL throughput under a characters-per-second budget"""
+
+    def __init__(self, chars_per_second: float):
+        self.chars_per_second = chars_per_second
+        self.started = time.monotonic()
+        self.sent = 0
+
+
+    def wait(self, chars: int) -> None:
+        self.sent += chars
+        if self.chars_per_second <= 0:
+            return
+        ahead = self.sent / self.chars_per_second - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+
+def pretranslate_collection(
+    client: QdrantClient,
+    translator: deepl.Translator,
+    collection_name: str,
+    checkpoint: Checkpoint,
+    rate_limiter: RateLimiter,
+    batch_size: int = 50
+) -> None:
+    """Scroll a collection from the checkpointed offset and write ru_translation for untranslated points"""
+
+    if checkpoint.state["done"]:
+        logger.info(f"{collection_name}: already completed, use --restart to run again")
+        return
+
+    offset = checkpoint.state["offset"]
+    while True:
+        points, next_offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False
+        )
+
+        pending = [
+            point for point in points
+            if point.payload.get("page_content", "").strip()
+            and not (point.payload.get("metadata") or {}).get(PRETRANSLATED_FIELD)
+        ]
+
+        if pending:
+            texts = [point.payload["page_content"] for point in pending]
+            rate_limiter.wait(sum(len(text) for text in texts))
+
+            results = translator.translate_text(texts, target_lang=TARGET_LANG)
+
+            client.batch_update_points(
+                collection_name=collection_name,
+                update_operations=[
+                    models.SetPayloadOperation(
+                        set_payload=models.SetPayload(
+                            payload={PRETRANSLATED_FIELD: result.text},
+                            points=[point.id],
+                            key="metadata"
+                        )
+                    )
+                    for point, result in zip(pending, results)
+                ]
+            )
+
+        checkpoint.state["offset"] = next_offset
+        checkpoint.state["translated"] += len(pending)
+        checkpoint.state["skipped"] += len(points) - len(pending)
+        checkpoint.state["done"] = next_offset is None
+        checkpoint.save()
+
+        logger.info(
+            f"{collection_name}: translated {checkpoint.state['translated']}, "
+            f"skipped {checkpoint.state['skipped']}, next offset {next_offset}"
+        )
+
+        if next_offset is None:
+            break
+        offset = next_offset
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-translate Hadith/General payloads to Russian")
+    parser.add_argument("--collections", nargs="+", default=list(COLLECTIONS), choices=list(COLLECTIONS))
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--chars-per-second", type=float, default=20000, help="0 disables throttling")
+    parser.add_argument("--checkpoint-dir", default=os.path.join(settings.CACHE_DIR, "pretranslation"))
+    parser.add_argument("--restart", action="store_true", help="ignore existing checkpoints")
+    args = parser.parse_args()
+
+    configure_logging()
+    logging.getLogger().addHandler(logging.StreamHandler())
+
+    translator = deepl.Translator(auth_key=settings.DEEPL_API_KEY)
+    rate_limiter = RateLimiter(args.chars_per_second)
+
+    for content_type in args.collections:
+        url, api_key, collection_name = COLLECTIONS[content_type]
+        checkpoint = Checkpoint(args.checkpoint_dir, collection_name)
+        if args.restart:
+            checkpoint.state = {"offset": None, "translated": 0, "skipped": 0, "done": False}
+
+        pretranslate_collection(
+            QdrantClient(url=url, api_key=api_key),
+            translator,
+            collection_name,
+            checkpoint,
+            rate_limiter,
+            batch_size=args.batch_size
+        )
+
+
+if __name__ == "__main__":
+    main()
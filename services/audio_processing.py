@@ -0,0 +1,187 @@
+import io
+import wave
+import logging
+from math import gcd
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from core.config import settings
+from core.metrics import AUDIO_BYTES, AUDIO_BYTES_SAVED
+
+logger = logging.getLogger(__name__)
+
+
+# Analysis window for voice activity and the silence search
+WINDOW_SECONDS = 0.03
+
+# What Whisper works at internally - anything above is upload weight only
+TARGET_SAMPLE_RATE = 16000
+
+SAMPLE_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+# soundfile format / subtype and the extension Groq recognises
+ENCODINGS = {
+    "flac": ("FLAC", "PCM_16", "flac"),
+    "opus": ("OGG", "OPUS", "ogg"),
+}
+
+
+
+def decode_wav(audio_bytes: bytes):
+    """(mono float32 samples in [-1, 1], sample rate), or None for anything that is not PCM WAV"""
+    try:
+        with wave.open(io.BytesIO(audio_bytes), "rb") as reader:
+            params = reader.getparams()
+            raw = reader.readframes(params.nframes)
+    except (wave.Error, EOFError):
+        return None
+
+    dtype = SAMPLE_DTYPES.get(params.sampwidth)
+    if dtype is None or params.nchannels < 1:
+        return None
+
+    frames = np.frombuffer(raw, dtype=dtype)
+    frames = frames[: len(frames) - len(frames) % params.nchannels].reshape(-1, params.nchannels)
+    samples = frames.astype(np.float32).mean(axis=1)   # downmix
+    if params.sampwidth == 1:
+        samples -= 128.0                                # 8-bit WAV is unsigned
+    return samples / float(2 ** (8 * params.sampwidth - 1)), params.framerate
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    if rate == target_rate:
+        return samples
+    divisor = gcd(rate, target_rate)
+    return resample_poly(samples, target_rate // divisor, rate // divisor).astype(np.float32)
+
+
+def window_levels(samples: np.ndarray, window: int) -> np.ndarray:
+    """RMS level in dBFS of each analysis window"""
+    count = len(samples) // window
+    rms = np.sqrt(np.mean(samples[: count * window].reshape(count, window) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def trim_silence(samples: np.ndarray, rate: int) -> np.ndarray:
+    """
+    Energy VAD: drop leading and trailing windows quieter than AUDIO_SILENCE_THRESHOLD_DB,
+    keeping AUDIO_TRIM_PADDING_MS around the speech. A recording with no voiced window is kept whole.
+    """
+    window = max(1, int(rate * WINDOW_SECONDS))
+    voiced = np.flatnonzero(window_levels(samples, window) >= settings.AUDIO_SILENCE_THRESHOLD_DB)
+    if not len(voiced):
+        return samples
+
+    padding = int(rate * settings.AUDIO_TRIM_PADDING_MS / 1000)
+    start = max(0, voiced[0] * window - padding)
+    end = min(len(samples), (voiced[-1] + 1) * window + padding)
+    return samples[start:end]
+
+
+def split_points(levels: np.ndarray, max_windows: int, threshold_db: float) -> list:
+    """
+    Window indexes to cut at so no chunk is longer than max_windows. Each cut goes on the
+    latest silent window of the second half of the span (fewest chunks, no cut mid-word),
+    or on its quietest window when the speaker never pauses.
+    """
+    cuts = []
+    start = 0
+    while len(levels) - start > max_windows:
+        span = levels[start + max_windows // 2: start + max_windows]
+        silent = np.flatnonzero(span < threshold_db)
+        offset = silent[-1] if len(silent) else int(np.argmin(span))
+        start = start + max_windows // 2 + offset
+        cuts.append(start)
+    return cuts
+
+
+def split_on_silence(samples: np.ndarray, rate: int, max_seconds: float) -> list:
+    """Sample ranges of at most max_seconds each, cut at pauses, in order"""
+    if len(samples) <= max_seconds * rate:
+        return [samples]
+
+    window = max(1, int(rate * WINDOW_SECONDS))
+    levels = window_levels(samples, window)
+    cuts = [cut * window for cut in split_points(levels, int(max_seconds / WINDOW_SECONDS), settings.AUDIO_SILENCE_THRESHOLD_DB)]
+    return [samples[start:end] for start, end in zip([0] + cuts, cuts + [len(samples)]) if end > start]
+
+
+
+def audio_encoding() -> str:
+    """AUDIO_ENCODING if it can be produced here, else "wav" - FLAC and Opus need the soundfile package"""
+    encoding = settings.AUDIO_ENCODING.lower()
+    if encoding == "wav":
+        return encoding
+    if encoding not in ENCODINGS:
+        logger.warning(f"Unknown AUDIO_ENCODING {encoding}, using wav")
+        return "wav"
+    try:
+        import soundfile  # noqa: F401
+        return encoding
+    except ImportError:
+        logger.warning(f"AUDIO_ENCODING={encoding} but the soundfile package is missing, using wav")
+        return "wav"
+
+
+def encode(samples: np.ndarray, rate: int, encoding: str) -> bytes:
+    """16-bit mono WAV, FLAC or Ogg/Opus of float samples"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+
+    if encoding == "wav":
+        with wave.open(buffer, "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(rate)
+            writer.writeframes(pcm.tobytes())
+    else:
+        import soundfile
+        file_format, subtype, _ = ENCODINGS[encoding]
+        soundfile.write(buffer, pcm, rate, format=file_format, subtype=subtype)
+
+    return buffer.getvalue()
+
+
+def extension(encoding: str) -> str:
+    return ENCODINGS[encoding][2] if encoding in ENCODINGS else encoding
+
+
+
+def prepare_audio(audio_bytes: bytes, max_seconds: float = None) -> tuple:
+    """
+    Turn an uploaded recording into the chunks to transcribe: ([chunk bytes], file extension).
+
+    PCM WAV is downmixed to mono, resampled to 16 kHz and trimmed of leading / trailing
+    silence (AUDIO_PREPROCESSING), split at pauses once longer than AUDIO_CHUNK_SECONDS and
+    encoded as AUDIO_ENCODING. Other formats are sent as they are, in one chunk; the extension
+    is None when the original bytes are sent.
+    """
+    max_seconds = max_seconds or settings.AUDIO_CHUNK_SECONDS
+    decoded = decode_wav(audio_bytes)
+    if decoded is None or (not settings.AUDIO_PREPROCESSING and len(decoded[0]) <= max_seconds * decoded[1]):
+        record_audio_bytes(len(audio_bytes), len(audio_bytes))
+        return [audio_bytes], None
+
+    samples, rate = decoded
+    encoding = "wav"
+    if settings.AUDIO_PREPROCESSING:
+        samples = trim_silence(resample(samples, rate), TARGET_SAMPLE_RATE)
+        rate = TARGET_SAMPLE_RATE
+        encoding = audio_encoding()
+
+    chunks = [encode(chunk, rate, encoding) for chunk in split_on_silence(samples, rate, max_seconds)]
+
+    uploaded = sum(len(chunk) for chunk in chunks)
+    record_audio_bytes(len(audio_bytes), uploaded)
+    logger.info(
+        f"Prepared {len(samples) / rate:.1f}s of audio: {len(chunks)} {encoding} chunk(s), "
+        f"{len(audio_bytes)} -> {uploaded} bytes"
+    )
+    return chunks, extension(encoding)
+
+
+def record_audio_bytes(received: int, uploaded: int) -> None:
+    AUDIO_BYTES.labels("received").inc(received)
+    AUDIO_BYTES.labels("uploaded").inc(uploaded)
+    AUDIO_BYTES_SAVED.observe(max(0, received - uploaded))
@@ -0,0 +1,218 @@
+import copy
+import math
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+WEB_SOURCE = "web_search"
+
+# Structure (keys, numbers, punctuation) is small next to the passages; a flat overhead per item covers it
+ITEM_OVERHEAD_TOKENS = 16
+
+# Per-language payload that the prompt of that language never needs: the Russian texts (Quran
+# translation, the As-Saadi and Abu Adil tafsirs and their sources)
+OTHER_LANGUAGE_FIELDS = {
+    "EN": {"ru_translation", "As_Saadi_Tafseer", "abu_Adil_tafsir", "As-Saadi_tafsir_source", "abu_Adil_tafsir_source"},
+}
+
+
+# Machine translated text costs more tokens than the English it is budgeted from (Cyrillic especially)
+TRANSLATED_TOKEN_RATIO = 1.5
+
+# Tafsir texts the non-English tafseer section renders, one entry each, and the metadata it leaves out of them
+TAFSIR_FIELDS = ("As_Saadi_Tafseer", "abu_Adil_tafsir", "Ibni_kathir_quran_tafsir")
+TAFSEER_HIDDEN_FIELDS = {
+    *TAFSIR_FIELDS, "ayah_translation", "surah_number", "En_tafsir_source", "En_source_url",
+    "abu_Adil_tafsir_source", "Ibni_kathir_tafsir_source", "tafsir_Source", "As-Saadi_tafsir_source",
+}
+
+
+def project_metadata(metadata: dict, language: str) -> dict:
+    """Copy of a document's metadata without the fields the prompt of language never uses"""
+    excluded = OTHER_LANGUAGE_FIELDS.get(language.upper(), ())
+    return {key: value for key, value in metadata.items() if key not in excluded}
+
+
+
+class ContextBudgeter:
+    """
+    Caps the retrieved context handed to the final response prompt at a token budget.
+
+    Items (retrieved documents and web results) are admitted best first - the top item of
+    every source before the rest, so each classified source stays represented. Scores come on
+    different scales (cross-encoder, Qdrant cosine, Tavily), so they are min-max normalised
+    within each source before items of different sources are compared. An item
+    larger than max_item_tokens, or than what is left of the budget, has its longest text
+    fields truncated; once less than min_item_tokens remain, lower scored items are dropped.
+    Token counts use the tiktoken encoding of the LLM, or ~4 characters per token when the
+    encoding cannot be loaded. Only what the prompt of the query language renders is counted -
+    for a non-English query the Russian texts, and the English passages that get machine translated
+    at TRANSLATED_TOKEN_RATIO.
+    """
+
+    def __init__(self, budget: int, max_item_tokens: int, min_item_tokens: int, model: str):
+
+        self.budget = budget
+        self.max_item_tokens = max_item_tokens
+        self.min_item_tokens = min_item_tokens
+        self.encoding = self._load_encoding(model)
+
+
+    def _load_encoding(self, model: str):
+        try:
+            import tiktoken
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                return tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken encoding unavailable ({e}), estimating tokens from characters")
+            return None
+
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return (len(text) + 3) // 4
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+    def _truncate_text(self, text: str, tokens: int) -> str:
+        if tokens <= 0:
+            return ""
+        if self.encoding is None:
+            return text[:tokens * 4] + "…"
+        return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:tokens]) + "…"
+
+
+    def _text_fields(self, doc: dict, source: str, language: str) -> List[Tuple[dict, str, float]]:
+        """
+        (container, key, weight) of every string field of an item that ends up in the prompt of
+        language - weight being the prompt tokens per token of the field. Mirrors the two
+        layouts of LanggraphService._build_context
+        """
+        metadata = doc.get("metadata") if isinstance(doc.get("metadata"), dict) else {}
+        strings = [key for key, value in metadata.items() if isinstance(value, str)]
+        own = [key for key in ("title", "content", "url") if isinstance(doc.get(key), str)]
+
+        if language.upper() == "EN":
+            excluded = OTHER_LANGUAGE_FIELDS["EN"]
+            return [(doc, key, 1.0) for key in own] + [(metadata, key, 1.0) for key in strings if key not in excluded]
+
+        if source == WEB_SOURCE:
+            # Title and URL as they are, the content translated
+            return [(doc, key, TRANSLATED_TOKEN_RATIO if key == "content" else 1.0) for key in own]
+
+        if source == "quran":
+            # RU_Translation line, then the metadata without Tafsir - which repeats ru_translation
+            return [(metadata, key, 2.0 if key == "ru_translation" else 1.0) for key in strings if key != "Tafsir"]
+
+        if source == "tafseer":
+            # One entry per tafsir text, each repeating the remaining metadata
+            tafsirs = [key for key in TAFSIR_FIELDS if key in strings and metadata[key]]
+            shown = [key for key in strings if key not in TAFSEER_HIDDEN_FIELDS] if tafsirs else []
+            return [(metadata, key, 1.0) for key in tafsirs] + [(metadata, key, float(len(tafsirs))) for key in shown]
+
+        # Hadith and general info: the stored RU translation, or the content translated, then the rest of the metadata
+        fields = [(metadata, key, 1.0) for key in strings if key != "ru_translation"]
+        if metadata.get("ru_translation"):
+            fields.append((metadata, "ru_translation", 1.0))
+        elif "content" in own:
+            fields.append((doc, "content", TRANSLATED_TOKEN_RATIO))
+        return fields
+
+
+    def _cost(self, doc: dict, source: str, language: str) -> int:
+        return sum(math.ceil(self.count(container[key]) * weight) for container, key, weight in self._text_fields(doc, source, language)) + ITEM_OVERHEAD_TOKENS
+
+
+    def _fit(self, doc: dict, source: str, language: str, allowed: int) -> int:
+        """
+        Truncate the text fields of doc to fit in allowed tokens and return its new cost. Fields are
+        capped at a common length (water-filling), so the longest are cut first and short ones stay whole
+        """
+        fields = self._text_fields(doc, source, language)
+        lengths = [math.ceil(self.count(container[key]) * weight) for container, key, weight in fields]
+
+        cap = max(lengths, default=0)
+        available = allowed - ITEM_OVERHEAD_TOKENS
+        for i, length in enumerate(sorted(lengths)):
+            share = available // (len(lengths) - i)
+            if length > share:
+                cap = share
+                break
+            available -= length
+
+        for (container, key, weight), length in zip(fields, lengths):
+            if length > cap:
+                container[key] = self._truncate_text(container[key], int(cap / weight) - 1)  # one token for the ellipsis
+        return self._cost(doc, source, language)
+
+
+    def _normalize_scores(self, items: list) -> None:
+        """Set relative_score on each item: its score min-max scaled within its source, 1.0 when all are equal"""
+        by_source = {}
+        for item in items:
+            by_source.setdefault(item["source"], []).append(item)
+
+        for source_items in by_source.values():
+            scores = [item["score"] for item in source_items]
+            low, high = min(scores), max(scores)
+            for item in source_items:
+                item["relative_score"] = (item["score"] - low) / (high - low) if high > low else 1.0
+
+
+    def apply(self, web_results: list, retrieved_documents: Dict[str, list], language: str) -> Tuple[list, Dict[str, list]]:
+        """
+        Budgeted copies of the web results and retrieved documents, in their original order.
+        The inputs are left untouched.
+        """
+        items = []
+        sources = {WEB_SOURCE: web_results, **retrieved_documents}
+        for source, documents in sources.items():
+            for position, doc in enumerate(documents or []):
+                doc = copy.deepcopy(doc)
+                if isinstance(doc.get("metadata"), dict):
+                    doc["metadata"] = project_metadata(doc["metadata"], language)
+                score = doc.get("rerank_score", doc.get("score"))
+                items.append({"source": source, "position": position, "doc": doc, "score": score if score is not None else 0.0})
+        self._normalize_scores(items)
+
+        # Best item of every source first, then the rest - each best first
+        ranked = sorted(items, key=lambda item: (-item["relative_score"], item["position"]))
+        leaders = {}
+        for item in ranked:
+            leaders.setdefault(item["source"], item)
+        leader_ids = {id(item) for item in leaders.values()}
+        order = list(leaders.values()) + [item for item in ranked if id(item) not in leader_ids]
+
+        remaining = self.budget
+        admitted = []
+        spent = {source: 0 for source in sources if sources[source]}
+        truncated = dropped = 0
+
+        for item in order:
+            if remaining < self.min_item_tokens:
+                dropped += 1
+                continue
+            allowed = min(self.max_item_tokens, remaining)
+            original_cost = self._cost(item["doc"], item["source"], language)
+            cost = self._fit(item["doc"], item["source"], language, allowed) if original_cost > allowed else original_cost
+            truncated += int(cost < original_cost)
+            remaining -= cost
+            spent[item["source"]] += cost
+            admitted.append(item)
+
+        admitted.sort(key=lambda item: (item["source"], item["position"]))
+        budgeted_web = [item["doc"] for item in admitted if item["source"] == WEB_SOURCE]
+        budgeted_documents = {
+            source: [item["doc"] for item in admitted if item["source"] == source]
+            for source in retrieved_documents
+        }
+
+        logger.info(
+            f"Context budget: {self.budget - remaining}/{self.budget} tokens, per source {spent}, "
+            f"{len(admitted)} items kept ({truncated} truncated), {dropped} dropped"
+        )
+        return budgeted_web, budgeted_documents
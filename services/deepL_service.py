@@ -1,16 +1,34 @@
+import os
+from typing import List
+
 import deepl
 from core.config import settings
+from core.executor import run_blocking
+from core.call_ledger import track_call
+from core.metrics import TRANSLATION_BATCHES, TRANSLATION_PASSAGES
+from core.local_cache import LocalCache, hash_key
 from services.open_ai_service import openai_service
+from services.language_detector import language_detector
 
 import logging
 logger = logging.getLogger(__name__)
 
 
+# Content addressed passage translations shared by every Deepl_Service instance
+translation_cache = LocalCache(
+    os.path.join(settings.CACHE_DIR, "translations.sqlite3"),
+    max_entries=10_000_000,
+    max_bytes=settings.TRANSLATION_CACHE_MAX_BYTES
+) if settings.TRANSLATION_CACHE_ENABLED else None
+
+
 
 class Deepl_Service():
     
     def __init__(self):
         
+        # One process-wide translator (deepl_service below) - the SDK's own requests session keeps
+        # its connections alive across calls; it has no public hook to share a session
         self.translator = deepl.Translator(auth_key=settings.DEEPL_API_KEY)
         
         
@@ -20,61 +38,150 @@ class Deepl_Service():
         
         try: 
             # First check if already in English
-            is_english = openai_service.is_english_with_llm(query)
-            logger.info(f"is_english_with_llm result: {is_english}")
+            is_english = self._is_english(query)
             
             if is_english:
-                
-                logger.info("English query detected successfully")
-                return {
-                    "status": "success", 
-                    "processed_query": query, 
-                    "detected_language": "EN",
-                    "translation_needed": False
-                }
+                return self._english_result(query)
             
             
             logger.info("Non-English query detected, translating...")
-            translated_query = self.translator.translate_text(query, target_lang="EN-US")
-            detected_lang = translated_query.detected_source_lang
-            logger.info(f"Detected language: {detected_lang}")
-            
-            
-            print(f"Detected language: {detected_lang}")
-                
-                
-            if detected_lang.upper() in ["RU", "UK"]:
-                logger.info(f"Translated from supported language {detected_lang.upper()}")
-                # return {"status": "success", "processed_query": translated_query.text, "detected_language": detected_lang.upper()}
-                return {"status": "success", "processed_query": translated_query.text, "detected_language": detected_lang.upper()}
-        
-            logger.info(f"default processed_query is return inside detect and translate_query")
-            return {
-                "status": "success", 
-                "processed_query": query,
-                "detected_language": detected_lang
-            }
+            translated_query = self._translate(query, target_lang="EN-US")
+            return self._translated_result(query, translated_query)
                 
                 
-        except deepl.exceptions.AuthorizationException:
+        except Exception as e:
+            return self._error_result(e)
+
+
+
+
+    async def adetect_and_translate_query(self, query: str)-> dict:
+        """Async variant of detect_and_translate_query; DeepL runs on the bounded executor."""
+
+        try:
+            is_english = await self._ais_english(query)
+
+            if is_english:
+                return self._english_result(query)
+
+
+            logger.info("Non-English query detected, translating...")
+            translated_query = await run_blocking(self._translate, query, target_lang="EN-US")
+            return self._translated_result(query, translated_query)
+
+
+        except Exception as e:
+            return self._error_result(e)
+
+
+
+
+    def _translate(self, text, target_lang: str):
+        """DeepL translate_text for a string or a list of strings, recorded in the request call ledger"""
+        characters = len(text) if isinstance(text, str) else sum(len(part) for part in text)
+        with track_call("deepl", "translate", characters=characters):
+            return self.translator.translate_text(text, target_lang=target_lang)
+
+
+
+
+    def _local_language_check(self, query: str):
+        """Local detector decision, or None when the input is ambiguous and the LLM should decide"""
+
+        if not settings.LOCAL_LANGUAGE_DETECTION:
+            return None
+
+        detection = language_detector.detect(query)
+        logger.info(
+            f"Local language detection: language={detection.language} confidence={detection.confidence:.2f} "
+            f"path={detection.path} cyrillic_ratio={detection.cyrillic_ratio:.2f}"
+        )
+
+        if language_detector.is_confident(detection):
+            return detection.is_english
+
+        logger.info("Local language detection ambiguous, falling back to is_english_with_llm")
+        return None
+
+
+
+
+    def _is_english(self, query: str) -> bool:
+
+        is_english = self._local_language_check(query)
+        if is_english is None:
+            is_english = openai_service.is_english_with_llm(query)
+            logger.info(f"is_english_with_llm result: {is_english}")
+        return is_english
+
+
+
+
+    async def _ais_english(self, query: str) -> bool:
+
+        is_english = self._local_language_check(query)
+        if is_english is None:
+            is_english = await openai_service.ais_english_with_llm(query)
+            logger.info(f"is_english_with_llm result: {is_english}")
+        return is_english
+
+
+
+
+    def _english_result(self, query: str) -> dict:
+
+        logger.info("English query detected successfully")
+        return {
+            "status": "success", 
+            "processed_query": query, 
+            "detected_language": "EN",
+            "translation_needed": False
+        }
+
+
+
+
+    def _translated_result(self, query: str, translated_query) -> dict:
+
+        detected_lang = translated_query.detected_source_lang
+        logger.info(f"Detected language: {detected_lang}")
+            
+            
+        if detected_lang.upper() in ["RU", "UK"]:
+            logger.info(f"Translated from supported language {detected_lang.upper()}")
+            # return {"status": "success", "processed_query": translated_query.text, "detected_language": detected_lang.upper()}
+            return {"status": "success", "processed_query": translated_query.text, "detected_language": detected_lang.upper()}
+    
+        logger.info(f"default processed_query is return inside detect and translate_query")
+        return {
+            "status": "success", 
+            "processed_query": query,
+            "detected_language": detected_lang
+        }
+
+
+
+
+    def _error_result(self, e: Exception) -> dict:
+
+        if isinstance(e, deepl.exceptions.AuthorizationException):
             return {
                 "status": "error", 
                 "message": "DeepL API authentication failed. Please check your API key."
             }
             
             
-        except deepl.exceptions.QuotaExceededException:
+        if isinstance(e, deepl.exceptions.QuotaExceededException):
             return {
                 "status": "error", 
                 "message": "DeepL API quota exceeded. Please try again later."
             }
             
             
-        except Exception as e:
-            return {
-                "status": "error", 
-                "message": f"Failed to detect and translate input query: {str(e)}"
-            }
+        return {
+            "status": "error", 
+            "message": f"Failed to detect and translate input query: {str(e)}"
+        }
         
         
         
@@ -86,7 +193,7 @@ class Deepl_Service():
        
         if detected_lang.upper() != "EN":
             try:
-                translated = self.translator.translate_text(response, target_lang="RU")
+                translated = self._translate(response, target_lang="RU")
                 logger.info("Translated response to RU successfully")
                 return translated.text
         
@@ -97,6 +204,69 @@ class Deepl_Service():
 
         logger.debug("No translation needed; returning original response.")
         return response
+
+
+
+
+    def translate_passages(self, passages: List[str], detected_lang: str) -> List[str]:
+        """
+        Translate individual passages, aligned 1:1 with the input. Each passage is looked up in
+        the translation cache by (hash of its text, target language); only misses go to DeepL.
+        The cache is read and written once per call.
+        """
+        if detected_lang.upper() == "EN":
+            return list(passages)
+
+        target_lang = "RU"
+        translated = list(passages)
+        keys = [hash_key("deepl", target_lang, passage) for passage in passages]
+
+        wanted = [key for passage, key in zip(passages, keys) if passage.strip()]
+        found = translation_cache.get_many(wanted) if translation_cache else {}
+
+        misses = {}  # passage text -> positions, so duplicates are translated once
+        for i, (passage, key) in enumerate(zip(passages, keys)):
+            if not passage.strip():
+                continue
+            if key in found:
+                translated[i] = found[key]
+            else:
+                misses.setdefault(passage, []).append(i)
+
+        cached = len(passages) - sum(len(v) for v in misses.values())
+        TRANSLATION_PASSAGES.labels("cached").inc(cached)
+        logger.info(f"Translation cache: {cached} hits, {len(misses)} passages to translate")
+
+        if misses:
+            to_translate = list(misses)
+            TRANSLATION_BATCHES.labels(target_lang).inc()
+            try:
+                results = self._translate(to_translate, target_lang=target_lang)
+                if len(results) != len(to_translate):
+                    raise ValueError(f"DeepL returned {len(results)} translations for {len(to_translate)} passages")
+
+                for passage, result in zip(to_translate, results):
+                    for i in misses[passage]:
+                        translated[i] = result.text
+                if translation_cache:
+                    translation_cache.set_many({keys[misses[passage][0]]: result.text for passage, result in zip(to_translate, results)})
+                TRANSLATION_PASSAGES.labels("translated").inc(len(to_translate))
+
+            except Exception as e:
+                # Untranslated passages keep their original text
+                TRANSLATION_PASSAGES.labels("failed").inc(len(to_translate))
+                logger.error("Translation error: %s", e)
+
+        return translated
+
+
+
+
+    async def atranslate_response(self, response: str, detected_lang: str) -> str:
+        """Async variant of translate_response; DeepL runs on the bounded executor."""
+
+        return await run_blocking(self.translate_response, response, detected_lang)
     
 
 
+deepl_service = Deepl_Service()
@@ -0,0 +1,68 @@
+import logging
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from core.call_ledger import track_call
+from core.executor import run_blocking
+from core.local_cache import LocalCache, hash_key, normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings client with a persistent LRU cache of query embeddings,
+    keyed by (model, normalized query text). Document embeddings pass straight through.
+    Calls that reach the API are recorded in the request call ledger; cache may be None.
+    The async path does its SQLite reads and writes on the blocking executor.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: Optional[LocalCache]):
+
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+
+
+    def _key(self, text: str) -> str:
+        return hash_key(self.model, normalize_text(text))
+
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            logger.debug("Query embedding cache hit")
+            return cached
+
+        with track_call("openai", "embed_query", characters=len(text)):
+            embedding = self.embeddings.embed_query(text)
+        if self.cache:
+            self.cache.set(key, embedding)
+        return embedding
+
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        cached = await run_blocking(self.cache.get, key) if self.cache else None
+        if cached is not None:
+            logger.debug("Query embedding cache hit")
+            return cached
+
+        with track_call("openai", "embed_query", characters=len(text)):
+            embedding = await self.embeddings.aembed_query(text)
+        if self.cache:
+            await run_blocking(self.cache.set, key, embedding)
+        return embedding
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with track_call("openai", "embed_documents", characters=sum(len(text) for text in texts)):
+            return self.embeddings.embed_documents(texts)
+
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with track_call("openai", "embed_documents", characters=sum(len(text) for text in texts)):
+            return await self.embeddings.aembed_documents(texts)
@@ -1,14 +1,33 @@
 import os
+import asyncio
+import contextvars
 
-from groq import Groq
+from groq import Groq, AsyncGroq
 from core.config import settings
+from core.executor import run_blocking, transcription_executor
+from core.call_ledger import track_call
+from core.client_registry import client_registry
+from core.local_cache import LocalCache, hash_key
+from core.metrics import TRANSCRIPTIONS
+from core.single_flight import SingleFlight
+from services.audio_processing import prepare_audio
 
 
 
 class GroqService:
     def __init__(self):
 
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        self.client = Groq(api_key=settings.GROQ_API_KEY, http_client=client_registry.http_client())
+        self.async_client = AsyncGroq(api_key=settings.GROQ_API_KEY, http_client=client_registry.async_http_client())
+        client_registry.register(self.client.base_url)
+
+        # Retried uploads of the same clip are answered from here; identical ones in flight share one run
+        self.transcription_cache = LocalCache(
+            os.path.join(settings.CACHE_DIR, "transcriptions.sqlite3"),
+            max_entries=settings.TRANSCRIPTION_CACHE_MAX_ENTRIES,
+            max_bytes=settings.TRANSCRIPTION_CACHE_MAX_BYTES
+        ) if settings.TRANSCRIPTION_CACHE_ENABLED else None
+        self.single_flight = SingleFlight("groq_transcription") if settings.REQUEST_COALESCING else None
 
 
     def transcribe_auto(
@@ -20,23 +39,183 @@ class GroqService:
         Transcribe an audio file (English or Russian) using Open Ai's Whisper model.
         """
         try:
-            print(file_path)
-            with open(file_path, "rb") as f:
-                audio_bytes = f.read()
-            
-            
+            audio_bytes = self._read_file(file_path)
+        except Exception as e:
+            return {"status": "error", "message": f"Error transcribing audio: {e}"}
+
+        return self.transcribe_bytes(audio_bytes, os.path.basename(file_path), model)
+
+
+    async def atranscribe_auto(
+        self,
+        file_path: str,
+        model: str = "whisper-large-v3"
+    ) -> str:
+        """
+        Async variant of transcribe_auto; the file read runs on the bounded executor.
+        """
+        try:
+            audio_bytes = await run_blocking(self._read_file, file_path)
+        except Exception as e:
+            return {"status": "error", "message": f"Error transcribing audio: {e}"}
+
+        return await self.atranscribe_bytes(audio_bytes, os.path.basename(file_path), model)
+
+
+    def transcribe_bytes(
+        self,
+        audio_bytes: bytes,
+        filename: str,
+        model: str = "whisper-large-v3"
+    ) -> dict:
+        """
+        Transcribe an in-memory recording. WAV is pre-processed (mono 16 kHz, silence trimmed,
+        AUDIO_ENCODING); long recordings are split at pauses, the chunks transcribed side by side
+        and the texts joined back in order. Transcripts are cached by (audio bytes, model).
+        """
+        try:
+            key, cached = self._lookup(audio_bytes, model)
+            if cached is not None:
+                return {"status": "success", "message": cached}
+
+            if self.single_flight is None:
+                transcript = self._transcribe_recording(key, audio_bytes, filename, model)
+            else:
+                transcript = self.single_flight.do(key, self._transcribe_recording, key, audio_bytes, filename, model)
+
+            return {"status": "success", "message": transcript}
+
+        except Exception as e:
+            return {"status": "error", "message": f"Error transcribing audio: {e}"}
+
+
+    async def atranscribe_bytes(
+        self,
+        audio_bytes: bytes,
+        filename: str,
+        model: str = "whisper-large-v3"
+    ) -> dict:
+        """
+        Async variant of transcribe_bytes; hashing, the cache I/O and pre-processing run on the
+        bounded executor and at most TRANSCRIPTION_CONCURRENCY chunks are in flight.
+        """
+        try:
+            key, cached = await run_blocking(self._lookup, audio_bytes, model)
+            if cached is not None:
+                return {"status": "success", "message": cached}
+
+            if self.single_flight is None:
+                transcript = await self._atranscribe_recording(key, audio_bytes, filename, model)
+            else:
+                transcript = await self.single_flight.ado(key, self._atranscribe_recording, key, audio_bytes, filename, model)
+
+            return {"status": "success", "message": transcript}
+
+        except Exception as e:
+            return {"status": "error", "message": f"Error transcribing audio: {e}"}
+
+
+    def _transcribe_recording(self, key: str, audio_bytes: bytes, filename: str, model: str) -> str:
+        try:
+            chunks, extension = prepare_audio(audio_bytes)
+            if len(chunks) == 1:
+                texts = [self._transcribe_chunk(chunks[0], self._chunk_name(filename, extension), model)]
+            else:
+                # Each task gets its own copy of the context, so the calls land in the request ledger
+                futures = [
+                    transcription_executor.submit(contextvars.copy_context().run, self._transcribe_chunk, chunk, self._chunk_name(filename, extension, index), model)
+                    for index, chunk in enumerate(chunks)
+                ]
+                texts = [future.result() for future in futures]
+        except Exception:
+            TRANSCRIPTIONS.labels("failed").inc()
+            raise
+
+        return self._store_transcript(key, self._stitch(texts))
+
+
+    async def _atranscribe_recording(self, key: str, audio_bytes: bytes, filename: str, model: str) -> str:
+        try:
+            chunks, extension = await run_blocking(prepare_audio, audio_bytes)
+            if len(chunks) == 1:
+                texts = [await self._atranscribe_chunk(chunks[0], self._chunk_name(filename, extension), model)]
+            else:
+                semaphore = asyncio.Semaphore(settings.TRANSCRIPTION_CONCURRENCY)
+
+                async def transcribe(index: int, chunk: bytes) -> str:
+                    async with semaphore:
+                        return await self._atranscribe_chunk(chunk, self._chunk_name(filename, extension, index), model)
+
+                texts = await asyncio.gather(*(transcribe(index, chunk) for index, chunk in enumerate(chunks)))
+        except Exception:
+            TRANSCRIPTIONS.labels("failed").inc()
+            raise
+
+        return await run_blocking(self._store_transcript, key, self._stitch(texts))
+
+
+    def _cache_key(self, audio_bytes: bytes, model: str) -> str:
+        return hash_key("groq", model, audio_bytes)
+
+
+    def _lookup(self, audio_bytes: bytes, model: str) -> tuple:
+        """(cache key, cached transcript or None) - a sha256 over up to AUDIO_MAX_UPLOAD_BYTES, then SQLite"""
+        key = self._cache_key(audio_bytes, model)
+        return key, self._cached_transcript(key)
+
+
+    def _cached_transcript(self, key: str):
+        cached = self.transcription_cache.get(key) if self.transcription_cache else None
+        if cached is not None:
+            TRANSCRIPTIONS.labels("cached").inc()
+        return cached
+
+
+    def _store_transcript(self, key: str, transcript: str) -> str:
+        TRANSCRIPTIONS.labels("transcribed").inc()
+        if self.transcription_cache:
+            self.transcription_cache.set(key, transcript)
+        return transcript
+
+
+    def _transcribe_chunk(self, audio_bytes: bytes, filename: str, model: str) -> str:
+        with track_call("groq", "transcribe") as call:
             response = self.client.audio.transcriptions.create(
-                file=(os.path.basename(file_path), audio_bytes),
+                file=(filename, audio_bytes),
                 response_format="text",
                 model=model,
                 #language=Language.RU,  # uncomment to force Russian
             )
+            call.characters = len(response)
+        return response
 
 
-            return {"status": "success", "message": response}
+    async def _atranscribe_chunk(self, audio_bytes: bytes, filename: str, model: str) -> str:
+        with track_call("groq", "transcribe") as call:
+            response = await self.async_client.audio.transcriptions.create(
+                file=(filename, audio_bytes),
+                response_format="text",
+                model=model,
+            )
+            call.characters = len(response)
+        return response
 
-        except Exception as e:
-            return {"status": "error", "message": f"Error transcribing audio: {e}"}
+
+    def _chunk_name(self, filename: str, extension, index: int = None) -> str:
+        # Groq picks the decoder from the extension; None means the upload is sent as it came
+        if extension is None:
+            return filename
+        stem = os.path.splitext(filename)[0]
+        return f"{stem}.{extension}" if index is None else f"{stem}_{index}.{extension}"
+
+
+    def _stitch(self, texts: list) -> str:
+        return " ".join(text.strip() for text in texts if text and text.strip())
+
+
+    def _read_file(self, file_path: str) -> bytes:
+        with open(file_path, "rb") as f:
+            return f.read()
 
 
 groq_service = GroqService()
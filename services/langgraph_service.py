@@ -1,20 +1,36 @@
 
+import os
+import time
+import random
+import dataclasses
+import asyncio
+import contextvars
 import logging
 logger = logging.getLogger(__name__)
 
-from tavily import TavilyClient
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
+from langchain_core.runnables import RunnableLambda
 
 from core.config import settings
+from core.executor import run_blocking, blocking_executor, translation_executor
+from core.call_ledger import track_call, detach_ledger
+from core.metrics import timed_node, record_classification, NODE_LATENCY, SHADOW_CLASSIFICATIONS
+from core.local_cache import LocalCache, hash_key, normalize_text
+from core.single_flight import SingleFlight
 from services.qdrant_service import QdrantService
+from services.tavily_client import TavilySearchClient
 from services.open_ai_service import openai_service
 from schemas.data_classes.content_type import ContentType
 from schemas.data_classes.langraph_state import LangraphState
-from services.deepL_service import Deepl_Service
+from services.deepL_service import deepl_service
+from services.semantic_cache import SemanticCache
+from services.query_classifier import QueryClassifier
+from services.context_budget import ContextBudgeter, project_metadata, TAFSIR_FIELDS, TAFSEER_HIDDEN_FIELDS
+from schemas.data_classes.source_prediction import SourcePrediction
+from services.prompt_templates import ENGLISH_FINAL_RESPONSE_PROMPT, RUSSAIN_FINAL_RESPONSE_PROMPT
 
 
-deepl_services = Deepl_Service()
-
 
 class LanggraphService:
     def __init__(
@@ -29,65 +45,296 @@ class LanggraphService:
 
         self.qdrant_service = QdrantService(qdrant_configs, self.embeddings)
         
-        self.tavily_client = TavilyClient(api_key=settings.TAVILY_API_KEY)
+        self.tavily_client = TavilySearchClient(api_key=settings.TAVILY_API_KEY)
+
+        # Local source classifier - changes the graph wiring, so it is set up before the graphs
+        self.query_classifier = None
+        self._background_tasks = set()
+        if settings.LOCAL_QUERY_CLASSIFIER:
+            self.query_classifier = QueryClassifier(
+                LocalCache(
+                    os.path.join(settings.CACHE_DIR, "query_classifications.sqlite3"),
+                    max_entries=settings.QUERY_CLASSIFIER_MAX_EXAMPLES
+                ),
+                model=settings.EMBEDDING_MODEL,
+                k=settings.QUERY_CLASSIFIER_K,
+                min_examples=settings.QUERY_CLASSIFIER_MIN_EXAMPLES
+            )
 
         self.graph = self._create_graph()
+        self.retrieval_graph = self._create_graph(generate=False)
+
+        self.deepl_services = deepl_service
+
+        # Concurrent identical questions share one pipeline run
+        self.single_flight = SingleFlight("langgraph_query") if settings.REQUEST_COALESCING else None
 
-        self.deepl_services = Deepl_Service()
+        self.context_budgeter = None
+        if settings.CONTEXT_TOKEN_BUDGET > 0:
+            self.context_budgeter = ContextBudgeter(
+                budget=settings.CONTEXT_TOKEN_BUDGET,
+                max_item_tokens=settings.CONTEXT_MAX_ITEM_TOKENS,
+                min_item_tokens=settings.CONTEXT_MIN_ITEM_TOKENS,
+                model=settings.LLM_MODEL
+            )
+
+        self.semantic_cache = None
+        if settings.SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticCache(
+                LocalCache(
+                    os.path.join(settings.CACHE_DIR, "semantic_answers.sqlite3"),
+                    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS
+                ),
+                threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                model=settings.LLM_MODEL,
+                # Any edit to the final response prompts invalidates previously cached answers
+                prompt_version=hash_key(ENGLISH_FINAL_RESPONSE_PROMPT, RUSSAIN_FINAL_RESPONSE_PROMPT)[:12]
+            )
         
         # self.is_english_query =
 
 
 
 
-    def _classify_multi_source_query(self, state: LangraphState) -> LangraphState:
+    def _classify_multi_source_query(self, state: LangraphState) -> dict:
         """
-        Advanced LLM-based classification using structured output
+        Source classification - the local classifier on the query embedding when it is
+        confident, otherwise the advanced LLM-based classification using structured output.
+        With the local classifier the node embeds the query itself, so it starts alongside web search.
         """
+        if self.query_classifier is not None:
+            state.query_embedding = self._embed_query(state)["query_embedding"]
+
+        prediction = self._local_prediction(state)
+        if prediction is not None:
+            state = self._apply_local_classification(state, prediction)
+            record_classification("local", state.required_sources)
+            if self._should_shadow():
+                blocking_executor.submit(self._shadow_classification, state.user_query, state.query_embedding, prediction)
+            return self._classification_update(state)
+
         try:
             # Get structured classification from LLM            
             classification_response = openai_service.classify_multi_source_query(state.user_query)
-            if classification_response['status'] == 'error':
-                state.required_sources = [ContentType.GENERAL]
-                state.current_source_index = 0
+            state = self._apply_classification(state, classification_response)
+            self._log_classification(state, classification_response)
+            record_classification("llm" if classification_response['status'] != 'error' else "fallback", state.required_sources)
+            
+        except Exception as e:
+            state = self._classification_fallback(state, e)
+            record_classification("fallback", state.required_sources)
 
+        return self._classification_update(state)
 
-            classification = classification_response['message']
 
-            # Convert string sources to ContentType enum in order
-            required_sources = []
-            for source in classification.required_sources:
-                source_clean = source.lower().strip()
-                if source_clean == "quran":
-                    required_sources.append(ContentType.QURAN)
-                elif source_clean == "hadith":
-                    required_sources.append(ContentType.HADITH)
-                elif source_clean == "tafseer":
-                    required_sources.append(ContentType.TAFSEER)
-                elif source_clean == "general_islamic_info":
-                    required_sources.append(ContentType.GENERAL)
 
 
-            # If no valid sources identified, use general fallback
-            if not required_sources:
-                required_sources.append(ContentType.GENERAL)
+    async def _aclassify_multi_source_query(self, state: LangraphState) -> dict:
+        """
+        Async variant of _classify_multi_source_query
+        """
+        if self.query_classifier is not None:
+            state.query_embedding = (await self._aembed_query(state))["query_embedding"]
+
+        prediction = self._local_prediction(state)
+        if prediction is not None:
+            state = self._apply_local_classification(state, prediction)
+            record_classification("local", state.required_sources)
+            if self._should_shadow():
+                # Off the request path - the response does not wait for the shadow call
+                self._in_background(self._ashadow_classification(state.user_query, state.query_embedding, prediction))
+            return self._classification_update(state)
+
+        try:
+            classification_response = await openai_service.aclassify_multi_source_query(state.user_query)
+            state = self._apply_classification(state, classification_response)
+            self._log_classification_in_background(state, classification_response)
+            record_classification("llm" if classification_response['status'] != 'error' else "fallback", state.required_sources)
 
+        except Exception as e:
+            state = self._classification_fallback(state, e)
+            record_classification("fallback", state.required_sources)
 
-            state.required_sources = required_sources
-            state.current_source_index = 0  # Reset index
+        return self._classification_update(state)
 
 
-            # Log the classification details
-            logging.info("LLM Classification Results:")
-            logging.info(f"  - Required sources (in order): {[s.value for s in required_sources]}")
-            logging.info(f"  - Reasoning: {classification.reasoning}")
-            
+
+
+    def _local_prediction(self, state: LangraphState):
+        """
+        Confident local prediction for the query embedding, or None when the LLM has to decide
+        """
+        if self.query_classifier is None or state.query_embedding is None:
+            return None
+
+        try:
+            prediction = self.query_classifier.predict(state.query_embedding)
         except Exception as e:
-            logging.error(f"Error in LLM classification: {e}")
-            # Fallback to general classification
-            state.required_sources = [ContentType.GENERAL]
-            state.current_source_index = 0
-            logging.info("Fallback: Using general classification due to error")
+            logging.error(f"Local query classification failed: {e}")
+            return None
+
+        if prediction is None:
+            return None
+
+        if prediction.confidence < settings.QUERY_CLASSIFIER_CONFIDENCE:
+            logging.info(f"Local classification not confident ({prediction.confidence:.2f}, similarity={prediction.similarity:.2f}), asking the LLM")
+            return None
+
+        return prediction
+
+
+
+
+    def _apply_local_classification(self, state: LangraphState, prediction: SourcePrediction) -> LangraphState:
+        state.required_sources = [ContentType(source) for source in prediction.required_sources]
+        state.current_source_index = 0
+
+        logging.info("Local Classification Results:")
+        logging.info(f"  - Required sources (in order): {prediction.required_sources}")
+        logging.info(f"  - Confidence: {prediction.confidence:.2f} (nearest similarity {prediction.similarity:.2f})")
+
+        return state
+
+
+
+
+    def _log_classification(self, state: LangraphState, classification_response: dict) -> None:
+        """
+        Keep a successful LLM classification as a training example for the local classifier
+        """
+        if self.query_classifier is None or state.query_embedding is None or classification_response['status'] == 'error':
+            return
+
+        try:
+            self.query_classifier.add_example(state.user_query, state.query_embedding, [s.value for s in state.required_sources])
+        except Exception as e:
+            logging.warning(f"Failed to log query classification: {e}")
+
+
+
+
+    def _log_classification_in_background(self, state: LangraphState, classification_response: dict) -> None:
+        """_log_classification from the event loop - the example is written on the blocking executor"""
+        example = dataclasses.replace(state, required_sources=list(state.required_sources))
+        self._in_background(run_blocking(self._log_classification, example, classification_response))
+
+
+
+
+    def _in_background(self, coroutine) -> None:
+        """Run a coroutine off the request path, keeping a reference until it finishes"""
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+
+
+
+    def _should_shadow(self) -> bool:
+        return random.random() < settings.QUERY_CLASSIFIER_SHADOW_RATE
+
+
+    def _shadow_result(self, user_query: str, query_embedding: list, prediction: SourcePrediction, classification_response: dict) -> None:
+        if classification_response['status'] == 'error':
+            logging.warning(f"Shadow classification failed: {classification_response['message']}")
+            return
+
+        shadow_state = self._apply_classification(LangraphState(user_query=user_query, base_prompt="", query_embedding=query_embedding), classification_response)
+
+        agreed = self.query_classifier.record_shadow(prediction, [s.value for s in shadow_state.required_sources])
+        SHADOW_CLASSIFICATIONS.labels(str(agreed).lower()).inc()
+        self._log_classification(shadow_state, classification_response)
+
+
+    def _shadow_classification(self, user_query: str, query_embedding: list, prediction: SourcePrediction) -> None:
+        """
+        Ask the LLM as well, in the background, to track how often the local classifier agrees
+        """
+        try:
+            classification_response = openai_service.classify_multi_source_query(user_query)
+            self._shadow_result(user_query, query_embedding, prediction, classification_response)
+        except Exception as e:
+            logging.warning(f"Shadow classification failed: {e}")
+
+
+    async def _ashadow_classification(self, user_query: str, query_embedding: list, prediction: SourcePrediction) -> None:
+        # Background work - not part of the request's external-call budget
+        detach_ledger()
+        try:
+            classification_response = await openai_service.aclassify_multi_source_query(user_query)
+            await run_blocking(self._shadow_result, user_query, query_embedding, prediction, classification_response)
+        except Exception as e:
+            logging.warning(f"Shadow classification failed: {e}")
+
+
+
+
+    def _classification_update(self, state: LangraphState) -> dict:
+        """
+        Only the classification fields - web_search runs in the same step and writes its own.
+        The query embedding is included when the node computed it for the local classifier.
+        """
+        update = {
+            "required_sources": state.required_sources,
+            "current_source_index": state.current_source_index
+        }
+        if self.query_classifier is not None:
+            update["query_embedding"] = state.query_embedding
+        return update
+
+
+
+
+    def _apply_classification(self, state: LangraphState, classification_response: dict) -> LangraphState:
+        """
+        Convert the structured LLM classification into ordered ContentType sources on the state
+        """
+        if classification_response['status'] == 'error':
+            return self._classification_fallback(state, classification_response['message'])
+
+
+        classification = classification_response['message']
+
+        # Convert string sources to ContentType enum in order
+        required_sources = []
+        for source in classification.required_sources:
+            source_clean = source.lower().strip()
+            if source_clean == "quran":
+                required_sources.append(ContentType.QURAN)
+            elif source_clean == "hadith":
+                required_sources.append(ContentType.HADITH)
+            elif source_clean == "tafseer":
+                required_sources.append(ContentType.TAFSEER)
+            elif source_clean == "general_islamic_info":
+                required_sources.append(ContentType.GENERAL)
+
+
+        # If no valid sources identified, use general fallback
+        if not required_sources:
+            required_sources.append(ContentType.GENERAL)
+
+
+        state.required_sources = required_sources
+        state.current_source_index = 0  # Reset index
+
+
+        # Log the classification details
+        logging.info("LLM Classification Results:")
+        logging.info(f"  - Required sources (in order): {[s.value for s in required_sources]}")
+        logging.info(f"  - Reasoning: {classification.reasoning}")
+
+        return state
+
+
+
+
+    def _classification_fallback(self, state: LangraphState, e: Exception) -> LangraphState:
+        logging.error(f"Error in LLM classification: {e}")
+        # Fallback to general classification
+        state.required_sources = [ContentType.GENERAL]
+        state.current_source_index = 0
+        logging.info("Fallback: Using general classification due to error")
         
         return state
 
@@ -95,50 +342,124 @@ class LanggraphService:
 
 
 
-    def _web_search_and_store(self, state: LangraphState) -> LangraphState:
+    def _web_search_and_store(self, state: LangraphState) -> dict:
         """
         Perform web search using Tavily and store results in vector database
         """
         try:
             if not self.tavily_client:
                 logging.warning("Tavily client not initialized, skipping web search")
-                return state
+                return {"web_search_results": state.web_search_results}
                 
             # Perform web search
-            search_results = self.tavily_client.search(
-                query=f"{state.user_query} in Islam.",
-                search_depth="advanced",
-                max_results=1,                            #updated
-                include_answer=True,
-                include_raw_content=True,
-                
-            )
-
-            # Process and store search results
-            web_documents = []
-            for result in search_results.get('results', []):
-                doc_content = {
-                    'content': result.get('content', ''),
-                    'url': result.get('url', ''),
-                    'title': result.get('title', '')
-                }
-                web_documents.append(doc_content)
-
+            search_results = self._tavily_search(self._web_search_params(state))
+            self._store_web_results(state, search_results)
             
-            # Store in vector database (you might want to create a separate collection for web results)
-            # Or store in state for later use
+        except Exception as e:
+            logging.error(f"Error in web search: {e}")
             if not hasattr(state, 'web_search_results'):
                 state.web_search_results = []
-            state.web_search_results.extend(web_documents)
-            
-            logging.info(f"Retrieved {len(web_documents)} web search results")
-            
+        
+        # Only the web results - classify_query runs in the same step and writes its own fields
+        return {"web_search_results": state.web_search_results}
+
+
+
+
+    async def _aweb_search_and_store(self, state: LangraphState) -> dict:
+        """
+        Async variant of _web_search_and_store; the sync Tavily search runs on the bounded executor
+        """
+        try:
+            if not self.tavily_client:
+                logging.warning("Tavily client not initialized, skipping web search")
+                return {"web_search_results": state.web_search_results}
+
+            search_results = await run_blocking(self._tavily_search, self._web_search_params(state))
+            self._store_web_results(state, search_results)
+
         except Exception as e:
             logging.error(f"Error in web search: {e}")
             if not hasattr(state, 'web_search_results'):
                 state.web_search_results = []
+
+        return {"web_search_results": state.web_search_results}
+
+
+
+
+    def _embed_query(self, state: LangraphState) -> dict:
+        """
+        Embed the user query once for the whole request; every retrieval branch reuses it
+        """
+        if state.query_embedding is not None:
+            return {"query_embedding": state.query_embedding}
+
+        try:
+            return {"query_embedding": self.embeddings.embed_query(state.user_query)}
+        except Exception as e:
+            # Retrieval embeds lazily again and records the error on the state
+            logging.error(f"Error embedding query: {e}")
+            return {"query_embedding": None}
+
+
+
+
+    async def _aembed_query(self, state: LangraphState) -> dict:
+        """
+        Async variant of _embed_query
+        """
+        if state.query_embedding is not None:
+            return {"query_embedding": state.query_embedding}
+
+        try:
+            return {"query_embedding": await self.embeddings.aembed_query(state.user_query)}
+        except Exception as e:
+            logging.error(f"Error embedding query: {e}")
+            return {"query_embedding": None}
+
+
+
+
+    def _web_search_params(self, state: LangraphState) -> dict:
+        return dict(
+            query=f"{state.user_query} in Islam.",
+            search_depth="advanced",
+            max_results=1,                            #updated
+            include_answer=True,
+            include_raw_content=True,
+        )
+
+
+
+
+    def _tavily_search(self, params: dict) -> dict:
+        with track_call("tavily", "search", characters=len(params.get("query", ""))):
+            return self.tavily_client.search(**params)
+
+
+
+
+    def _store_web_results(self, state: LangraphState, search_results: dict) -> None:
+        # Process and store search results
+        web_documents = []
+        for result in search_results.get('results', []):
+            doc_content = {
+                'content': result.get('content', ''),
+                'url': result.get('url', ''),
+                'title': result.get('title', ''),
+                'score': result.get('score')
+            }
+            web_documents.append(doc_content)
+
         
-        return state
+        # Store in vector database (you might want to create a separate collection for web results)
+        # Or store in state for later use
+        if not hasattr(state, 'web_search_results'):
+            state.web_search_results = []
+        state.web_search_results.extend(web_documents)
+        
+        logging.info(f"Retrieved {len(web_documents)} web search results")
 
 
 
@@ -147,10 +468,11 @@ class LanggraphService:
         """
         Retrieve documents from Quran vector store
         """
-        state = self._retrieve_documents(state, ContentType.QURAN)
-        state.completed_sources.add(ContentType.QURAN)
-        state.current_source_index += 1
-        return state
+        return self._retrieve_source(state, ContentType.QURAN)
+
+
+    async def _aretrieve_from_quran(self, state: LangraphState) -> LangraphState:
+        return await self._aretrieve_source(state, ContentType.QURAN)
 
 
 
@@ -160,10 +482,11 @@ class LanggraphService:
         """
         Retrieve documents from Hadith vector store
         """
-        state = self._retrieve_documents(state, ContentType.HADITH)
-        state.completed_sources.add(ContentType.HADITH)
-        state.current_source_index += 1
-        return state
+        return self._retrieve_source(state, ContentType.HADITH)
+
+
+    async def _aretrieve_from_hadith(self, state: LangraphState) -> LangraphState:
+        return await self._aretrieve_source(state, ContentType.HADITH)
 
 
 
@@ -173,10 +496,11 @@ class LanggraphService:
         """
         Retrieve documents from Tafseer vector store
         """
-        state = self._retrieve_documents(state, ContentType.TAFSEER)
-        state.completed_sources.add(ContentType.TAFSEER)
-        state.current_source_index += 1
-        return state
+        return self._retrieve_source(state, ContentType.TAFSEER)
+
+
+    async def _aretrieve_from_tafseer(self, state: LangraphState) -> LangraphState:
+        return await self._aretrieve_source(state, ContentType.TAFSEER)
 
 
 
@@ -186,12 +510,116 @@ class LanggraphService:
         """
         Retrieve documents from General Islamic Info vector store
         """
-        state = self._retrieve_documents(state, ContentType.GENERAL)
-        state.completed_sources.add(ContentType.GENERAL)
+        return self._retrieve_source(state, ContentType.GENERAL)
+
+
+    async def _aretrieve_from_general(self, state: LangraphState) -> LangraphState:
+        return await self._aretrieve_source(state, ContentType.GENERAL)
+
+
+
+
+
+    def _retrieve_source(self, state: LangraphState, content_type: ContentType) -> LangraphState:
+        """
+        Retrieve one source and advance the sequential routing index
+        """
+        state = self._retrieve_documents(state, content_type)
+        state.completed_sources.add(content_type)
         state.current_source_index += 1
         return state
 
 
+    async def _aretrieve_source(self, state: LangraphState, content_type: ContentType) -> LangraphState:
+        """
+        Async variant of _retrieve_source
+        """
+        state = await self.qdrant_service.aretrieve_documents(state, content_type)
+        state.completed_sources.add(content_type)
+        state.current_source_index += 1
+        return state
+
+
+
+
+
+    def _fan_out_sources(self, state: LangraphState):
+        """
+        Conditional edge for parallel retrieval - one Send per required source so
+        every collection is searched in the same superstep
+        """
+        if not state.required_sources:
+            return "generate_response"
+
+        return [
+            Send("retrieve_source", {"state": self._branch_state(state), "content_type": content_type})
+            for content_type in state.required_sources
+        ]
+
+
+    def _branch_state(self, state: LangraphState) -> LangraphState:
+        """
+        Fresh state for a single retrieval branch, so branches never share mutable containers
+        """
+        return LangraphState(
+            user_query=state.user_query,
+            base_prompt=state.base_prompt,
+            detected_language=state.detected_language,
+            query_embedding=state.query_embedding
+        )
+
+
+    def _retrieve_source_branch(self, branch: dict) -> dict:
+        """
+        Retrieve a single source inside a parallel branch and return only its partial update,
+        which the state reducers merge before generate_response
+        """
+        content_type = branch["content_type"]
+        state = self._retrieve_documents(branch["state"], content_type)
+        return self._branch_update(state, content_type)
+
+
+    async def _aretrieve_source_branch(self, branch: dict) -> dict:
+        """
+        Async variant of _retrieve_source_branch
+        """
+        content_type = branch["content_type"]
+        state = await self.qdrant_service.aretrieve_documents(branch["state"], content_type)
+        return self._branch_update(state, content_type)
+
+
+    def _branch_update(self, state: LangraphState, content_type: ContentType) -> dict:
+        return {
+            "retrieved_documents": state.retrieved_documents,
+            "completed_sources": {content_type},
+            "error_message": state.error_message
+        }
+
+
+
+
+
+    def _retrieve_sources_batch(self, state: LangraphState) -> dict:
+        """
+        Retrieve all required sources through the batched Qdrant path and return the partial update
+        """
+        batch_state = self.qdrant_service.retrieve_documents_batch(self._branch_state(state), state.required_sources)
+        return self._batch_update(batch_state)
+
+
+    async def _aretrieve_sources_batch(self, state: LangraphState) -> dict:
+        batch_state = await self.qdrant_service.aretrieve_documents_batch(self._branch_state(state), state.required_sources)
+        return self._batch_update(batch_state)
+
+
+    def _batch_update(self, state: LangraphState) -> dict:
+        return {
+            "retrieved_documents": state.retrieved_documents,
+            "completed_sources": state.completed_sources,
+            "error_message": state.error_message
+        }
+
+
 
 
 
@@ -212,6 +640,10 @@ class LanggraphService:
         return self.qdrant_service.fallback_retrieval(state)
 
 
+    async def _afallback_retrieval(self, state: LangraphState) -> LangraphState:
+        return await self.qdrant_service.afallback_retrieval(state)
+
+
 
     def _generate_comprehensive_response(self, state: LangraphState) -> LangraphState:
         """
@@ -226,282 +658,353 @@ class LanggraphService:
                 state.final_response = f"I apologize, but I encountered an error: {state.error_message}"
                 return state
 
-            query_lang = state.detected_language
-            logger.info(f"Detected query language inside gen_comprehensive_response function: {query_lang.upper()}")
+            full_context = self._build_context(state)
+
+            # Generate response using the prepared context
+            logger.info("Sending context to OpenAI for response generation")
+            response = openai_service.generate_response(state.user_query, full_context, state.detected_language)
+            state.final_response = response['message']
+            if response['status'] == 'error':
+                state.error_message = response['message']
+            logger.info(f"{state.detected_language.upper()} Response generated successfully")
+
+
+        except Exception as e:
+            state.error_message = state.error_message or str(e)
+            state.final_response = self._error_response(state, e)
+
+        return state
+
+
+
+
+    async def _agenerate_comprehensive_response(self, state: LangraphState) -> LangraphState:
+        """
+        Async variant of _generate_comprehensive_response; context assembly (DeepL) runs on the bounded executor
+        """
+
+        logger.info("Starting _agenerate_comprehensive_response")
+
+        try:
+            if state.error_message and not state.retrieved_documents:
+                logger.warning(f"Encountered error with no documents: {state.error_message}")
+                state.final_response = f"I apologize, but I encountered an error: {state.error_message}"
+                return state
+
+            full_context = await run_blocking(self._build_context, state)
+
+            logger.info("Sending context to OpenAI for response generation")
+            response = await openai_service.agenerate_response(state.user_query, full_context, state.detected_language)
+            state.final_response = response['message']
+            if response['status'] == 'error':
+                state.error_message = response['message']
+            logger.info(f"{state.detected_language.upper()} Response generated successfully")
+
+
+        except Exception as e:
+            state.error_message = state.error_message or str(e)
+            state.final_response = await run_blocking(self._error_response, state, e)
+
+        return state
+
+
 
-            # Prepare comprehensive context from all sources
-            if query_lang.upper() != "EN":
+
+    def _build_context(self, state: LangraphState) -> str:
+        """
+        Assemble the prompt context from web results and retrieved documents,
+        translating hadith/general/web content for non-English queries
+        """
+
+        query_lang = state.detected_language
+        logger.info(f"Detected query language inside gen_comprehensive_response function: {query_lang.upper()}")
+
+        # Trim to the token budget before anything is translated - translated passages are costed at their expected length
+        if self.context_budgeter is not None:
+            web_results, retrieved_documents = self.context_budgeter.apply(state.web_search_results, state.retrieved_documents, query_lang)
+            state = dataclasses.replace(state, web_search_results=web_results, retrieved_documents=retrieved_documents)
+
+        # Prepare comprehensive context from all sources
+        if query_lang.upper() != "EN":
+            
+            translation_batches = []  # Store {content: text, source_info: info} for each batch
+            context_items = []  # Store all context items in order with their type
+            
+            # Handle web search results
+            if hasattr(state, 'web_search_results') and state.web_search_results:
+                logger.info("Adding web search results to translation batch")
                 
-                translation_batches = []  # Store {content: text, source_info: info} for each batch
-                context_items = []  # Store all context items in order with their type
+                # Extract only the content that needs translation
+                web_contents_to_translate = []
+                web_metadata = []
                 
-                # Handle web search results
-                if hasattr(state, 'web_search_results') and state.web_search_results:
-                    logger.info("Adding web search results to translation batch")
-                    
-                    # Extract only the content that needs translation
-                    web_contents_to_translate = []
-                    web_metadata = []
-                    
-                    for i, doc in enumerate(state.web_search_results):
-                        # Only translate the content, keep title and URL separate
-                        if doc.get('content'):
-                            web_contents_to_translate.append(doc['content'])
-                            web_metadata.append({
-                                'index': i,
-                                'title': doc.get('title', ''),
-                                'url': doc.get('url', '')
-                            })
-                    
-                    if web_contents_to_translate:
-                        # Join only content for translation
-                        web_content_batch = "\n\n===CONTENT_SEPARATOR===\n\n".join(web_contents_to_translate)
-                        translation_batches.append({
-                            'content': web_content_batch,
-                            'source_info': {
-                                'type': 'web_search',
-                                'metadata': web_metadata,
-                                'count': len(web_contents_to_translate)
-                            }
+                for i, doc in enumerate(state.web_search_results):
+                    # Only translate the content, keep title and URL separate
+                    if doc.get('content'):
+                        web_contents_to_translate.append(doc['content'])
+                        web_metadata.append({
+                            'index': i,
+                            'title': doc.get('title', ''),
+                            'url': doc.get('url', '')
                         })
-                        context_items.append({'type': 'translate', 'batch_index': len(translation_batches) - 1})
                 
-                # Process retrieved documents by source type
-                for source_type, documents in state.retrieved_documents.items():
-                    logger.debug(f"Processing source_type: {source_type} with {len(documents)} documents")
-                    
-                    if documents:
-                        if source_type == 'quran':
-                            # Quran uses Russian from metadata - no translation needed
-                            quran_source_context = f"\n--- {source_type.upper()} SOURCES ---\n"
-                            
-                            for i, doc in enumerate(documents):
-                                ru_text = doc['metadata'].get('ru_translation', 'No RU translation available')
-                                metadata_copy = doc["metadata"].copy()
-                                metadata_copy.pop("Tafsir", None)  # Remove Tafsir safely
-                                quran_source_context += f"{i}.\nRU_Translation: {ru_text}\nMetadata: {metadata_copy}\n\n"
-                                
-                            context_items.append({'type': 'direct', 'content': quran_source_context})
-
-                        elif source_type == 'tafseer':
-                            # Tafseer uses metadata directly - no translation needed
-                            tafseer_source_context = f"\n--- {source_type.upper()} SOURCES ---\n"
-                            
-                            for i, doc in enumerate(documents):
-                                
-                                metadata = doc.get('metadata', {})
-                                
-                                clean_metadata = {k: v for k, v in metadata.items()
-                                                  if k not in ['As_Saadi_Tafseer', 'abu_Adil_tafsir', 'Ibni_kathir_quran_tafsir', 'ayah_translation', 'surah_number', 'En_tafsir_source', 'En_source_url', 'abu_Adil_tafsir_source', 'Ibni_kathir_tafsir_source', 'tafsir_Source', 'As-Saadi_tafsir_source',   ]
-                                                  }
-
-                                                
-                                tafseer_keys = ['As_Saadi_Tafseer', 'abu_Adil_tafsir', 'Ibni_kathir_quran_tafsir']
-                                
-                                for key in tafseer_keys:
-                                    if key in metadata and metadata[key]:  # Check if value exists and not empty
-                                        
-                                        clean_metadata_copy = clean_metadata.copy() 
-                                        clean_metadata_copy["Tafsir_Source"] = key
-                                        
-                                        tafseer_source_context += f"Tafseer_Content: {metadata[key]}\nMetadata: {clean_metadata_copy}\n\n"
-                                        
-                                            
-                            context_items.append({'type': 'direct', 'content': tafseer_source_context})
-                        
-                        elif source_type == 'hadith':
-                            # Hadith content needs translation - extract only content
-                            hadith_contents_to_translate = []
-                            hadith_metadata = []
-                            
-                            for i, doc in enumerate(documents):
-                                if doc.get('content'):
-                                    hadith_contents_to_translate.append(doc['content'])
-                                    hadith_metadata.append({
-                                        'index': i,
-                                        'metadata': doc.get('metadata', {})
-                                    })
-                            
-                            if hadith_contents_to_translate:
-                                # Join only content for translation
-                                hadith_content_batch = "\n\n===CONTENT_SEPARATOR===\n\n".join(hadith_contents_to_translate)
-                                translation_batches.append({
-                                    'content': hadith_content_batch,
-                                    'source_info': {
-                                        'type': 'hadith',
-                                        'metadata': hadith_metadata,
-                                        'count': len(hadith_contents_to_translate)
-                                    }
-                                })
-                                logger.info("Adding hadith to translation batch")
-                                context_items.append({'type': 'translate', 'batch_index': len(translation_batches) - 1})
+                if web_contents_to_translate:
+                    # Passages are translated (and cached) individually
+                    translation_batches.append({
+                        'contents': web_contents_to_translate,
+                        'source_info': {
+                            'type': 'web_search',
+                            'metadata': web_metadata,
+                            'count': len(web_contents_to_translate)
+                        }
+                    })
+                    context_items.append({'type': 'translate', 'batch_index': len(translation_batches) - 1})
+            
+            # Process retrieved documents by source type
+            for source_type, documents in state.retrieved_documents.items():
+                logger.debug(f"Processing source_type: {source_type} with {len(documents)} documents")
+                
+                if documents:
+                    if source_type == 'quran':
+                        # Quran uses Russian from metadata - no translation needed
+                        quran_source_context = f"\n--- {source_type.upper()} SOURCES ---\n"
                         
-                        elif source_type == 'general_islamic_info':
-                            # General content needs translation - extract only content
-                            general_contents_to_translate = []
-                            general_metadata = []
-                            
-                            for i, doc in enumerate(documents):
-                                if doc.get('content'):
-                                    general_contents_to_translate.append(doc['content'])
-                                    general_metadata.append({
-                                        'index': i,
-                                        'metadata': doc.get('metadata', {})
-                                    })
+                        for i, doc in enumerate(documents):
+                            ru_text = doc['metadata'].get('ru_translation', 'No RU translation available')
+                            metadata_copy = doc["metadata"].copy()
+                            metadata_copy.pop("Tafsir", None)  # Remove Tafsir safely
+                            quran_source_context += f"{i}.\nRU_Translation: {ru_text}\nMetadata: {metadata_copy}\n\n"
                             
-                            if general_contents_to_translate:
-                                # Join only content for translation
-                                general_content_batch = "\n\n===CONTENT_SEPARATOR===\n\n".join(general_contents_to_translate)
-                                translation_batches.append({
-                                    'content': general_content_batch,
-                                    'source_info': {
-                                        'type': 'general_islamic_info',
-                                        'metadata': general_metadata,
-                                        'count': len(general_contents_to_translate)
-                                    }
-                                })
-                                logger.info("Adding general Islamic info to translation batch")
-                                context_items.append({'type': 'translate', 'batch_index': len(translation_batches) - 1})
+                        context_items.append({'type': 'direct', 'content': quran_source_context})
 
-                # Perform batch translation with improved strategy
-                translated_batches = []
-                if translation_batches:
-                    logger.info(f"Translating {len(translation_batches)} batches...")
-                    
-                    for batch_idx, batch in enumerate(translation_batches):
-                        try:
-                            logger.info(f"Translating batch {batch_idx + 1}/{len(translation_batches)} for {batch['source_info']['type']}")
-                            logger.debug(f"Original content to translate: {batch['content'][:200]}...")
-                            
-                            # Translate only the content
-                            translated_content = self.deepl_services.translate_response(batch['content'], query_lang)
-                            
-                            logger.info(f"Batch {batch_idx + 1} translation completed successfully!")
-                            logger.debug(f"Translated content: {translated_content[:200]}...")
-                            
-                            # Split translated content back
-                            translated_parts = translated_content.split("\n\n===CONTENT_SEPARATOR===\n\n")
-                            
-                            # Validate translation
-                            expected_parts = batch['source_info']['count']
-                            if len(translated_parts) != expected_parts:
-                                logger.warning(f"Expected {expected_parts} parts, got {len(translated_parts)} for batch {batch_idx}")
-                                # If split failed, treat as single content
-                                translated_parts = [translated_content]
-                            
-                            translated_batches.append({
-                                'translated_parts': translated_parts,
-                                'source_info': batch['source_info']
-                            })
-                            
-                        except Exception as e:
-                            logger.error(f"Translation failed for batch {batch_idx}: {str(e)}")
-                            # Use original content if translation fails
-                            original_parts = batch['content'].split("\n\n===CONTENT_SEPARATOR===\n\n")
-                            translated_batches.append({
-                                'translated_parts': original_parts,
-                                'source_info': batch['source_info']
-                            })
-                
-                # Reconstruct context with translated content
-                final_context_sections = []
-                translation_batch_index = 0
-                
-                for item in context_items:
-                    if item['type'] == 'direct':
-                        # Add direct content (no translation needed)
-                        final_context_sections.append(item['content'])
+                    elif source_type == 'tafseer':
+                        # Tafseer uses metadata directly - no translation needed
+                        tafseer_source_context = f"\n--- {source_type.upper()} SOURCES ---\n"
                         
-                    elif item['type'] == 'translate':
-                        # Add translated content
-                        batch_idx = item['batch_index']
-                        if batch_idx < len(translated_batches):
-                            translated_batch = translated_batches[batch_idx]
-                            source_info = translated_batch['source_info']
-                            translated_parts = translated_batch['translated_parts']
-                            
-                            # Reconstruct the section with translated content
-                            if source_info['type'] == 'web_search':
-                                section_content = f"\n--- WEB SEARCH RESULTS ---\n"
-                                for i, (translated_part, meta) in enumerate(zip(translated_parts, source_info['metadata'])):
-                                    section_content += f"{meta['index']}.\nTitle: {meta['title']}\nContent: {translated_part}\nURL: {meta['url']}\n\n"
+                        for i, doc in enumerate(documents):
                             
-                            elif source_info['type'] == 'hadith':
-                                section_content = f"\n--- HADITH SOURCES ---\n"
-                                for i, (translated_part, meta) in enumerate(zip(translated_parts, source_info['metadata'])):
-                                    section_content += f"\n{meta['index']}: Hadith_content: {translated_part}\nMetadata: {meta['metadata']}\n\n"
+                            metadata = doc.get('metadata', {})
                             
-                            elif source_info['type'] == 'general_islamic_info':
-                                section_content = f"\n--- GENERAL_ISLAMIC_INFO SOURCES ---\n"
-                                for i, (translated_part, meta) in enumerate(zip(translated_parts, source_info['metadata'])):
-                                    section_content += f"\n{meta['index']}: General_content: {translated_part}\nMetadata: {meta['metadata']}\n\n"
+                            clean_metadata = {k: v for k, v in metadata.items() if k not in TAFSEER_HIDDEN_FIELDS}
                             
-                            final_context_sections.append(section_content)
-                            logger.debug(f"Added translated {source_info['type']} section")
-                        else:
-                            logger.warning(f"Missing translation for batch index {batch_idx}")
-
-                full_context = "\n\n\n".join(final_context_sections)
-                logger.info("Final context compiled successfully for non-English query")
-                print(f"\n---------------------Russian_final_context-----------------------\n{full_context}")
-                
-                # Generate response using the prepared context
-                logger.info("Sending Russian context to OpenAI for response generation")
-                response = openai_service.generate_response(state.user_query, full_context, state.detected_language)
-                state.final_response = response['message']
-                logger.info("Russian Response generated successfully")
-                
-                
-                
-
-                            # ------ if EN Qury detected
-            else:
-                logger.info("Query is in English. Assembling context without translation.")
-                context_sections = []
-                
-                # Add web search results if available
-                if hasattr(state, 'web_search_results') and state.web_search_results:
-                    web_context = "\n--- WEB SEARCH RESULTS ---\n"
+                            for key in TAFSIR_FIELDS:
+                                if key in metadata and metadata[key]:  # Check if value exists and not empty
+                                    
+                                    clean_metadata_copy = clean_metadata.copy() 
+                                    clean_metadata_copy["Tafsir_Source"] = key
+                                    
+                                    tafseer_source_context += f"Tafseer_Content: {metadata[key]}\nMetadata: {clean_metadata_copy}\n\n"
+                                    
+                                        
+                        context_items.append({'type': 'direct', 'content': tafseer_source_context})
                     
-                    for i, doc in enumerate(state.web_search_results):
-                        web_context += f"{i}.\nTitle: {doc['title']}\nContent: {doc['content']}\nURL: {doc['url']}\n\n"
+                    elif source_type == 'hadith':
+                        # Hadith content needs translation - extract only content
+                        hadith_contents_to_translate = []
+                        hadith_metadata = []
                         
-                    context_sections.append(web_context)
-                
-                # Add retrieved documents
-                for source_type, documents in state.retrieved_documents.items():
-                    if documents:
-                        source_context = f"\n--- {source_type.upper()} SOURCES ---\n"
+                        hadith_pretranslated = []
                         
                         for i, doc in enumerate(documents):
-                            source_context += f"{i}.\nContent: {doc['content']}\nMetadata: {doc['metadata']}\n\n"
+                            if doc.get('content'):
+                                # Offline job (scripts/pretranslate_payloads.py) stores RU text in metadata like Quran
+                                metadata = dict(doc.get('metadata', {}))
+                                hadith_pretranslated.append(metadata.pop('ru_translation', None))
+                                hadith_contents_to_translate.append(doc['content'])
+                                hadith_metadata.append({
+                                    'index': i,
+                                    'metadata': metadata
+                                })
+                        
+                        if hadith_contents_to_translate:
+                            # Passages are translated (and cached) individually
+                            translation_batches.append({
+                                'contents': hadith_contents_to_translate,
+                                'pretranslated': hadith_pretranslated,
+                                'source_info': {
+                                    'type': 'hadith',
+                                    'metadata': hadith_metadata,
+                                    'count': len(hadith_contents_to_translate)
+                                }
+                            })
+                            logger.info("Adding hadith to translation batch")
+                            context_items.append({'type': 'translate', 'batch_index': len(translation_batches) - 1})
+                    
+                    elif source_type == 'general_islamic_info':
+                        # General content needs translation - extract only content
+                        general_contents_to_translate = []
+                        general_metadata = []
+                        
+                        general_pretranslated = []
+                        
+                        for i, doc in enumerate(documents):
+                            if doc.get('content'):
+                                # Offline job (scripts/pretranslate_payloads.py) stores RU text in metadata like Quran
+                                metadata = dict(doc.get('metadata', {}))
+                                general_pretranslated.append(metadata.pop('ru_translation', None))
+                                general_contents_to_translate.append(doc['content'])
+                                general_metadata.append({
+                                    'index': i,
+                                    'metadata': metadata
+                                })
+                        
+                        if general_contents_to_translate:
+                            # Passages are translated (and cached) individually
+                            translation_batches.append({
+                                'contents': general_contents_to_translate,
+                                'pretranslated': general_pretranslated,
+                                'source_info': {
+                                    'type': 'general_islamic_info',
+                                    'metadata': general_metadata,
+                                    'count': len(general_contents_to_translate)
+                                }
+                            })
+                            logger.info("Adding general Islamic info to translation batch")
+                            context_items.append({'type': 'translate', 'batch_index': len(translation_batches) - 1})
+
+            # Translate the web/hadith/general batches concurrently; each result stays aligned
+            # with its batch, and each passage with its document
+            translated_batches = []
+            if translation_batches:
+                logger.info(f"Translating {len(translation_batches)} batches concurrently...")
+                # One context copy per batch keeps the request call ledger visible in the worker threads
+                contexts = [contextvars.copy_context() for _ in translation_batches]
+                translated_batches = list(translation_executor.map(
+                    lambda context, batch: context.run(self._translate_batch_safe, batch, query_lang),
+                    contexts,
+                    translation_batches
+                ))
+            
+            # Reconstruct context with translated content
+            final_context_sections = []
+            
+            for item in context_items:
+                if item['type'] == 'direct':
+                    # Add direct content (no translation needed)
+                    final_context_sections.append(item['content'])
+                    
+                elif item['type'] == 'translate':
+                    # Add translated content
+                    batch_idx = item['batch_index']
+                    if batch_idx < len(translated_batches):
+                        translated_batch = translated_batches[batch_idx]
+                        source_info = translated_batch['source_info']
+                        translated_parts = translated_batch['translated_parts']
+                        
+                        # Reconstruct the section with translated content
+                        if source_info['type'] == 'web_search':
+                            section_content = f"\n--- WEB SEARCH RESULTS ---\n"
+                            for i, (translated_part, meta) in enumerate(zip(translated_parts, source_info['metadata'])):
+                                section_content += f"{meta['index']}.\nTitle: {meta['title']}\nContent: {translated_part}\nURL: {meta['url']}\n\n"
+                        
+                        elif source_info['type'] == 'hadith':
+                            section_content = f"\n--- HADITH SOURCES ---\n"
+                            for i, (translated_part, meta) in enumerate(zip(translated_parts, source_info['metadata'])):
+                                section_content += f"\n{meta['index']}: Hadith_content: {translated_part}\nMetadata: {meta['metadata']}\n\n"
                         
-                        context_sections.append(source_context)
+                        elif source_info['type'] == 'general_islamic_info':
+                            section_content = f"\n--- GENERAL_ISLAMIC_INFO SOURCES ---\n"
+                            for i, (translated_part, meta) in enumerate(zip(translated_parts, source_info['metadata'])):
+                                section_content += f"\n{meta['index']}: General_content: {translated_part}\nMetadata: {meta['metadata']}\n\n"
+                        
+                        final_context_sections.append(section_content)
+                        logger.debug(f"Added translated {source_info['type']} section")
+                    else:
+                        logger.warning(f"Missing translation for batch index {batch_idx}")
+
+            full_context = "\n\n\n".join(final_context_sections)
+            logger.info("Final context compiled successfully for non-English query")
+            logger.debug(f"Russian final context:\n{full_context}")
+            return full_context
+
+        # ------ if EN Qury detected
+        else:
+            logger.info("Query is in English. Assembling context without translation.")
+            context_sections = []
+            
+            # Add web search results if available
+            if hasattr(state, 'web_search_results') and state.web_search_results:
+                web_context = "\n--- WEB SEARCH RESULTS ---\n"
                 
-                full_context = "\n".join(context_sections)
-                logger.info("English context compiled successfully")
+                for i, doc in enumerate(state.web_search_results):
+                    web_context += f"{i}.\nTitle: {doc['title']}\nContent: {doc['content']}\nURL: {doc['url']}\n\n"
+                    
+                context_sections.append(web_context)
+            
+            # Add retrieved documents
+            for source_type, documents in state.retrieved_documents.items():
+                if documents:
+                    source_context = f"\n--- {source_type.upper()} SOURCES ---\n"
+                    
+                    for i, doc in enumerate(documents):
+                        # Only the fields the English prompt uses, with or without the token budget
+                        source_context += f"{i}.\nContent: {doc['content']}\nMetadata: {project_metadata(doc['metadata'], 'EN')}\n\n"
+                    
+                    context_sections.append(source_context)
+            
+            full_context = "\n".join(context_sections)
+            logger.info("English context compiled successfully")
+            return full_context
 
-            # Generate response using the prepared context
-            logger.info("Sending context to OpenAI for response generation")
-            response = openai_service.generate_response(state.user_query, full_context, state.detected_language)
-            state.final_response = response['message']
-            logger.info("English Response generated successfully")
 
 
+
+    def _translate_batch_safe(self, batch: dict, query_lang: str) -> dict:
+        """
+        Translate one batch, falling back to the original passages if anything goes wrong
+        """
+        try:
+            logger.info(f"Translating batch for {batch['source_info']['type']}")
+            translated_parts = self._translate_batch(batch, query_lang)
+            logger.info(f"Batch for {batch['source_info']['type']} translation completed successfully!")
+
         except Exception as e:
-            logger.error(f"Error in _generate_comprehensive_response: {str(e)}")
-            error_msg = f"I apologize, but I encountered an error while generating the response: {str(e)}"
-            
-            # Translate error message for non-English queries
-            if hasattr(state, 'detected_language') and state.detected_language.upper() != "EN":
-                try:
-                    error_msg = self.deepl_services.translate_response(error_msg, state.detected_language)
-                except Exception as translation_error:
-                    logger.error(f"Failed to translate error message: {translation_error}")
-            
-            state.final_response = error_msg
+            logger.error(f"Translation failed for batch {batch['source_info']['type']}: {str(e)}")
+            # Use original content if translation fails
+            translated_parts = batch['contents']
 
-        return state
+        return {
+            'translated_parts': translated_parts,
+            'source_info': batch['source_info']
+        }
+
+
+
+
+    def _translate_batch(self, batch: dict, query_lang: str) -> list:
+        """
+        Translated passages of one batch, aligned with batch['contents']. Passages that already
+        carry a pre-translated payload are used as-is; only the rest go through DeepL.
+        """
+        translated_parts = list(batch.get('pretranslated') or [None] * len(batch['contents']))
+        missing = [i for i, part in enumerate(translated_parts) if not part]
+
+        if missing:
+            translations = self.deepl_services.translate_passages([batch['contents'][i] for i in missing], query_lang)
+            for i, translation in zip(missing, translations):
+                translated_parts[i] = translation
+
+        logger.info(f"{batch['source_info']['type']}: {len(translated_parts) - len(missing)} pre-translated, {len(missing)} translated live")
+        return translated_parts
+
+
+
+
+    def _error_response(self, state: LangraphState, e: Exception) -> str:
+        """
+        Build the user facing error message, translated for non-English queries
+        """
+        logger.error(f"Error in _generate_comprehensive_response: {str(e)}")
+        error_msg = f"I apologize, but I encountered an error while generating the response: {str(e)}"
+        
+        # Translate error message for non-English queries
+        if hasattr(state, 'detected_language') and state.detected_language.upper() != "EN":
+            try:
+                error_msg = self.deepl_services.translate_response(error_msg, state.detected_language)
+            except Exception as translation_error:
+                logger.error(f"Failed to translate error message: {translation_error}")
+        
+        return error_msg
                     
   
 
@@ -556,32 +1059,115 @@ class LanggraphService:
 
 
 
-    def _create_graph(self) -> StateGraph:
+    def _node(self, name, func, afunc) -> RunnableLambda:
+        """Graph node with a sync and an async implementation, both timed into chatbot_graph_node_seconds"""
+        return RunnableLambda(timed_node(name, func), afunc=timed_node(name, afunc))
+
+
+
+
+
+    def _create_graph(self, generate: bool = True) -> StateGraph:
         """
-        Create the enhanced LangGraph workflow with proper sequential retrieval
+        Create the enhanced LangGraph workflow, with parallel fan-out or sequential retrieval.
+        With generate=False the graph stops once retrieval is done (used for streaming).
         """
         # Create the state graph
         workflow = StateGraph(LangraphState)
 
-        # Add nodes
-        workflow.add_node("web_search", self._web_search_and_store)
-        workflow.add_node("classify_query", self._classify_multi_source_query)
+        # Add nodes - each node carries a sync and an async implementation so the
+        # same compiled graph serves both graph.invoke and graph.ainvoke
+        workflow.add_node("web_search", self._node("web_search", self._web_search_and_store, self._aweb_search_and_store))
+        workflow.add_node("classify_query", self._node("classify_query", self._classify_multi_source_query, self._aclassify_multi_source_query))
+        if self.query_classifier is None:
+            workflow.add_node("embed_query", self._node("embed_query", self._embed_query, self._aembed_query))
         workflow.add_node("route_to_source", self._route_to_next_source)  
-        workflow.add_node("retrieve_quran", self._retrieve_from_quran)
-        workflow.add_node("retrieve_hadith", self._retrieve_from_hadith)
-        workflow.add_node("retrieve_tafseer", self._retrieve_from_tafseer)
-        workflow.add_node("retrieve_general", self._retrieve_from_general)
-        workflow.add_node("fallback_retrieval", self._fallback_retrieval)
-        workflow.add_node("generate_response", self._generate_comprehensive_response)
+        if generate:
+            workflow.add_node("generate_response", self._node("generate_response", self._generate_comprehensive_response, self._agenerate_comprehensive_response))
+
+        # Where retrieval hands over to
+        after_retrieval = "generate_response" if generate else END
+
+        # Web search, classification and the query embedding only read user_query - start them at once
+        workflow.add_edge(START, "web_search")
+        workflow.add_edge(START, "classify_query")
+
+        if self.query_classifier is not None:
+            # classify_query embeds the query for the local classifier - no separate embed step,
+            # so an LLM fallback is not held back behind web search
+            workflow.add_edge(["web_search", "classify_query"], "route_to_source")
+        else:
+            workflow.add_edge(START, "embed_query")
+
+            # Join - routing waits for all three to finish
+            workflow.add_edge(["web_search", "classify_query", "embed_query"], "route_to_source")
+
+        if settings.PARALLEL_RETRIEVAL and settings.QDRANT_BATCH_SEARCH:
+            self._add_batched_retrieval(workflow, after_retrieval)
+        elif settings.PARALLEL_RETRIEVAL:
+            self._add_parallel_retrieval(workflow, after_retrieval)
+        else:
+            self._add_sequential_retrieval(workflow, after_retrieval)
+
+        # End after response generation
+        if generate:
+            workflow.add_edge("generate_response", END)
+
+        # Compile the graph without checkpointer
+        return workflow.compile()
+
+
+
+
+
+    def _add_parallel_retrieval(self, workflow: StateGraph, after_retrieval: str) -> None:
+        """
+        Fan out from routing to every required source at once; the branches are
+        merged by the state reducers so retrieval costs the slowest source, not the sum
+        """
+        workflow.add_node("retrieve_source", self._node(lambda branch: f"retrieve_{branch['content_type'].name.lower()}", self._retrieve_source_branch, self._aretrieve_source_branch))
 
-        # Set entry point
-        workflow.set_entry_point("web_search")
+        workflow.add_conditional_edges(
+            "route_to_source",
+            self._fan_out_sources,
+            {"retrieve_source": "retrieve_source", "generate_response": after_retrieval}
+        )
+
+        # Join - generate_response runs once, after every branch has finished
+        workflow.add_edge("retrieve_source", after_retrieval)
+
+
+
+
+
+    def _add_batched_retrieval(self, workflow: StateGraph, after_retrieval: str) -> None:
+        """
+        Retrieve every required source in one node - one batched Qdrant query per collection,
+        sent concurrently, and a single rerank over all candidates
+        """
+        workflow.add_node("retrieve_sources", self._node("retrieve_sources", self._retrieve_sources_batch, self._aretrieve_sources_batch))
+
+        workflow.add_conditional_edges(
+            "route_to_source",
+            lambda state: "retrieve_sources" if state.required_sources else "generate_response",
+            {"retrieve_sources": "retrieve_sources", "generate_response": after_retrieval}
+        )
+
+        workflow.add_edge("retrieve_sources", after_retrieval)
 
-        # Route from web search to classification
-        workflow.add_edge("web_search", "classify_query")
 
-        # Route from classification to routing logic
-        workflow.add_edge("classify_query", "route_to_source")
+
+
+
+    def _add_sequential_retrieval(self, workflow: StateGraph, after_retrieval: str) -> None:
+        """
+        Visit the required sources one after another through route_to_source
+        """
+        workflow.add_node("retrieve_quran", self._node("retrieve_quran", self._retrieve_from_quran, self._aretrieve_from_quran))
+        workflow.add_node("retrieve_hadith", self._node("retrieve_hadith", self._retrieve_from_hadith, self._aretrieve_from_hadith))
+        workflow.add_node("retrieve_tafseer", self._node("retrieve_tafseer", self._retrieve_from_tafseer, self._aretrieve_from_tafseer))
+        workflow.add_node("retrieve_general", self._node("retrieve_general", self._retrieve_from_general, self._aretrieve_from_general))
+        workflow.add_node("fallback_retrieval", self._node("fallback_retrieval", self._fallback_retrieval, self._afallback_retrieval))
 
         # Route from routing node to appropriate source
         workflow.add_conditional_edges(
@@ -593,55 +1179,23 @@ class LanggraphService:
                 "retrieve_tafseer": "retrieve_tafseer",
                 "retrieve_general": "retrieve_general",
                 "fallback_retrieval": "fallback_retrieval",
-                "generate_response": "generate_response"
+                "generate_response": after_retrieval
             }
         )
 
         # After each retrieval, route to next source or generate response
-        workflow.add_conditional_edges(
-            "retrieve_quran",
-            self._should_continue_retrieval,
-            {
-                "continue_retrieval": "route_to_source",
-                "generate_response": "generate_response"
-            }
-        )
-
-        workflow.add_conditional_edges(
-            "retrieve_hadith",
-            self._should_continue_retrieval,
-            {
-                "continue_retrieval": "route_to_source",
-                "generate_response": "generate_response"
-            }
-        )
-
-        workflow.add_conditional_edges(
-            "retrieve_tafseer",
-            self._should_continue_retrieval,
-            {
-                "continue_retrieval": "route_to_source",
-                "generate_response": "generate_response"
-            }
-        )
-        
-        workflow.add_conditional_edges(
-            "retrieve_general",
-            self._should_continue_retrieval,
-            {
-                "continue_retrieval": "route_to_source",
-                "generate_response": "generate_response"
-            }
-        )
+        for node in ["retrieve_quran", "retrieve_hadith", "retrieve_tafseer", "retrieve_general"]:
+            workflow.add_conditional_edges(
+                node,
+                self._should_continue_retrieval,
+                {
+                    "continue_retrieval": "route_to_source",
+                    "generate_response": after_retrieval
+                }
+            )
 
         # Fallback goes directly to response
-        workflow.add_edge("fallback_retrieval", "generate_response")
-
-        # End after response generation
-        workflow.add_edge("generate_response", END)
-
-        # Compile the graph without checkpointer
-        return workflow.compile()
+        workflow.add_edge("fallback_retrieval", after_retrieval)
 
 
 
@@ -658,24 +1212,194 @@ class LanggraphService:
         Returns:
             Generated response from the system
         """
+        if self.single_flight is None:
+            return self._run_query(user_query, lang_detected, base_prompt)
+        return self.single_flight.do(self._flight_key(user_query, lang_detected, base_prompt), self._run_query, user_query, lang_detected, base_prompt)
+
+
+
+
+    async def aquery(self, user_query: str, lang_detected: str, base_prompt: str = "") -> str:
+        """
+        Async variant of query, running the graph with graph.ainvoke so the event loop stays free
+        """
+        if self.single_flight is None:
+            return await self._arun_query(user_query, lang_detected, base_prompt)
+        return await self.single_flight.ado(self._flight_key(user_query, lang_detected, base_prompt), self._arun_query, user_query, lang_detected, base_prompt)
+
+
+
+
+    def _flight_key(self, user_query: str, lang_detected: str, base_prompt: str) -> str:
+        return hash_key(normalize_text(user_query), lang_detected.upper(), base_prompt)
+
+
+
+
+    def _run_query(self, user_query: str, lang_detected: str, base_prompt: str = "") -> str:
         try:
-            # Create initial state
-            initial_state = LangraphState(
-                user_query=user_query,
-                base_prompt=base_prompt or "Please provide a comprehensive Islamic answer to the following question:",
-                required_sources=[],
-                completed_sources=set(),
-                retrieved_documents={},
-                final_response="",
-                current_source_index=0,
-                detected_language=lang_detected  # <-- passed
-            )
-            logging.info(f"Langraph initial_state.detected_language: {initial_state.detected_language}")
+            initial_state = self._initial_state(user_query, lang_detected, base_prompt)
+
+            cached_response = self._semantic_cache_lookup(initial_state)
+            if cached_response is not None:
+                return cached_response
             
             # Run the graph without configuration (no checkpointer)
             final_state = self.graph.invoke(initial_state)
+
+            self._store_in_semantic_cache(initial_state, final_state)
             
             return final_state['final_response']
         except Exception as e:
-            print("Error while Querying: ", e)
+            logger.error(f"Error while Querying: {e}")
+            return str(e)
+
+
+
+
+    async def _arun_query(self, user_query: str, lang_detected: str, base_prompt: str = "") -> str:
+        try:
+            initial_state = self._initial_state(user_query, lang_detected, base_prompt)
+
+            cached_response = await self._asemantic_cache_lookup(initial_state)
+            if cached_response is not None:
+                return cached_response
+
+            final_state = await self.graph.ainvoke(initial_state)
+
+            self._in_background(run_blocking(self._store_in_semantic_cache, initial_state, final_state))
+
+            return final_state['final_response']
+        except Exception as e:
+            logger.error(f"Error while Querying: {e}")
             return str(e)
+
+
+
+
+    async def astream_query(self, user_query: str, lang_detected: str, base_prompt: str = ""):
+        """
+        Streaming variant of aquery. Yields (event, payload) pairs: progress events while the
+        retrieval graph runs, a sources event once retrieval is done, then the LLM tokens
+        and finally done with the full response - or error.
+        """
+        try:
+            initial_state = self._initial_state(user_query, lang_detected, base_prompt)
+
+            cached_response = await self._asemantic_cache_lookup(initial_state)
+            if cached_response is not None:
+                yield "done", {"status": "success", "message": cached_response, "cached": True}
+                return
+
+            final_values = None
+            async for mode, chunk in self.retrieval_graph.astream(initial_state, stream_mode=["updates", "values"]):
+                if mode == "values":
+                    final_values = chunk
+                    continue
+
+                for node, update in chunk.items():
+                    progress = {"stage": node}
+                    if isinstance(update, dict) and update.get("retrieved_documents"):
+                        progress["sources"] = {source: len(docs) for source, docs in update["retrieved_documents"].items()}
+                    yield "progress", {"status": "success", "message": progress}
+
+            state = LangraphState(**final_values)
+            yield "sources", {
+                "status": "success",
+                "message": {
+                    "sources": {source: len(docs) for source, docs in state.retrieved_documents.items()},
+                    "web_results": len(state.web_search_results)
+                }
+            }
+
+            if state.error_message and not state.retrieved_documents:
+                yield "error", {"status": "error", "message": f"I apologize, but I encountered an error: {state.error_message}"}
+                return
+
+            # Generation runs outside the graph here, timed as the generate_response node it replaces
+            started = time.perf_counter()
+            full_context = await run_blocking(self._build_context, state)
+
+            tokens = []
+            async for token in openai_service.astream_response(state.user_query, full_context, state.detected_language):
+                tokens.append(token)
+                yield "token", {"status": "success", "message": token}
+
+            state.final_response = "".join(tokens)
+            NODE_LATENCY.labels("generate_response").observe(time.perf_counter() - started)
+            self._in_background(run_blocking(self._store_in_semantic_cache, initial_state, {"final_response": state.final_response}))
+            yield "done", {"status": "success", "message": state.final_response}
+
+        except Exception as e:
+            logger.error(f"Error while streaming query: {e}")
+            yield "error", {"status": "error", "message": f"Error processing query: {str(e)}"}
+
+
+
+
+    def _semantic_cache_lookup(self, initial_state: LangraphState):
+        """
+        Embed the query up front (the graph reuses it) and look for a cached answer
+        """
+        if not self.semantic_cache:
+            return None
+
+        try:
+            initial_state.query_embedding = self.embeddings.embed_query(initial_state.user_query)
+            return self.semantic_cache.lookup(initial_state.query_embedding, initial_state.detected_language)
+        except Exception as e:
+            logging.error(f"Semantic cache lookup failed: {e}")
+            return None
+
+
+
+
+    async def _asemantic_cache_lookup(self, initial_state: LangraphState):
+        """
+        Async variant of _semantic_cache_lookup
+        """
+        if not self.semantic_cache:
+            return None
+
+        try:
+            initial_state.query_embedding = await self.embeddings.aembed_query(initial_state.user_query)
+            return await run_blocking(self.semantic_cache.lookup, initial_state.query_embedding, initial_state.detected_language)
+        except Exception as e:
+            logging.error(f"Semantic cache lookup failed: {e}")
+            return None
+
+
+
+
+    def _store_in_semantic_cache(self, initial_state: LangraphState, final_state: dict) -> None:
+        """
+        Cache the answer only when the whole pipeline succeeded
+        """
+        if not self.semantic_cache or initial_state.query_embedding is None:
+            return
+
+        if final_state.get('error_message') or not final_state.get('final_response'):
+            return
+
+        try:
+            self.semantic_cache.store(initial_state.query_embedding, initial_state.detected_language, final_state['final_response'])
+        except Exception as e:
+            logging.error(f"Semantic cache store failed: {e}")
+
+
+
+
+    def _initial_state(self, user_query: str, lang_detected: str, base_prompt: str = "") -> LangraphState:
+        # Create initial state
+        initial_state = LangraphState(
+            user_query=user_query,
+            base_prompt=base_prompt or "Please provide a comprehensive Islamic answer to the following question:",
+            required_sources=[],
+            completed_sources=set(),
+            retrieved_documents={},
+            final_response="",
+            current_source_index=0,
+            detected_language=lang_detected  # <-- passed
+        )
+        logging.info(f"Langraph initial_state.detected_language: {initial_state.detected_language}")
+        return initial_state
@@ -0,0 +1,83 @@
+import math
+import logging
+from collections import Counter
+
+from core.config import settings
+from schemas.data_classes.language_detection import LanguageDetection
+
+logger = logging.getLogger(__name__)
+
+
+# Seed text the character trigram profiles are built from - typical questions in each language
+ENGLISH_SEED_TEXT = """What does Islam say about patience and prayer? The Prophet said that the best of you are those who learn the Quran and teach it. How should a Muslim perform the five daily prayers, and what is the meaning of this verse? Tell me about the life of the companions and the history of the early caliphs. Which hadith explains the importance of charity, fasting in Ramadan and the pilgrimage to Mecca? Is it permissible to eat this food, and what do the scholars of the four schools of law say about it? Please explain the story of the prophets, the rights of parents, kindness to neighbours, and how to seek forgiveness from Allah. Can you give me the tafsir of the first chapter of the book with references from the authentic collections? I want to know why we give zakat, when the night of power falls, and where the verse about justice was revealed. There is no compulsion in religion. Whoever believes in Allah and the Last Day should speak good or remain silent. They were asked what they should spend, and he told them to give from what is good."""
+RUSSIAN_SEED_TEXT = """Что говорит ислам о терпении и молитве? Пророк сказал, что лучшие из вас те, кто изучает Коран и обучает ему других. Как мусульманину совершать пять ежедневных молитв, и каково значение этого аята? Расскажите мне о жизни сподвижников и истории первых халифов. Какой хадис объясняет важность милостыни, поста в месяц Рамадан и паломничества в Мекку? Разрешено ли есть эту пищу, и что говорят об этом учёные четырёх мазхабов? Пожалуйста, объясните историю пророков, права родителей, доброту к соседям и как просить прощения у Аллаха. Можете ли вы дать толкование первой суры книги со ссылками на достоверные сборники? Я хочу знать, почему мы выплачиваем закят, когда наступает ночь предопределения и где был ниспослан аят о справедливости. Нет принуждения в религии. Кто верует в Аллаха и в Последний день, пусть говорит благое или молчит. Их спросили, что им следует расходовать, и он велел им давать из того, что хорошо. Объясните, пожалуйста, этот вопрос."""
+UKRAINIAN_SEED_TEXT = """Що говорить іслам про терпіння і молитву? Пророк сказав, що найкращі з вас ті, хто вивчає Коран і навчає йому інших. Як мусульманину здійснювати п'ять щоденних молитов, і яке значення цього аяту? Розкажіть мені про життя сподвижників та історію перших халіфів. Який хадис пояснює важливість милостині, посту в місяць Рамадан і паломництва до Мекки? Чи дозволено їсти цю їжу, і що кажуть про це вчені чотирьох мазхабів? Будь ласка, поясніть історію пророків, права батьків, доброту до сусідів і як просити прощення в Аллаха. Чи можете ви дати тлумачення першої сури книги з посиланнями на достовірні збірки? Я хочу знати, чому ми сплачуємо закят, коли настає ніч приречення і де був ниспосланий аят про справедливість. Немає примусу в релігії. Хто вірує в Аллаха і в Останній день, нехай говорить добре або мовчить. Їх запитали, що їм слід витрачати, і він звелів їм давати з того, що є добрим. Поясніть, будь ласка, це питання."""
+
+
+
+class LanguageDetector:
+    """
+    In-process EN/RU/UK detector.
+
+    The Cyrillic/Latin letter ratio settles the script; a character trigram model then
+    scores the text against seed profiles (EN coverage for Latin text, RU vs UK likelihood
+    for Cyrillic text). Decisions below confidence_threshold are reported as ambiguous so
+    the caller can fall back to the LLM.
+    """
+
+    def __init__(self, confidence_threshold: float = 0.8):
+
+        self.confidence_threshold = confidence_threshold
+        self.profiles = {
+            "EN": self._trigram_counts(ENGLISH_SEED_TEXT),
+            "RU": self._trigram_counts(RUSSIAN_SEED_TEXT),
+            "UK": self._trigram_counts(UKRAINIAN_SEED_TEXT),
+        }
+        self.totals = {lang: sum(counts.values()) for lang, counts in self.profiles.items()}
+        self.vocabulary = len(set().union(*self.profiles.values()))
+
+
+    def _trigram_counts(self, text: str) -> Counter:
+        counts = Counter()
+        for word in "".join(ch if ch.isalpha() or ch == "'" else " " for ch in text.lower()).split():
+            padded = f" {word} "
+            counts.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        return counts
+
+
+    def _log_likelihood(self, trigrams: Counter, lang: str) -> float:
+        profile, total = self.profiles[lang], self.totals[lang]
+        return sum(n * math.log((profile[t] + 1) / (total + self.vocabulary)) for t, n in trigrams.items())
+
+
+    def detect(self, text: str) -> LanguageDetection:
+        latin = sum(1 for ch in text if ch.isalpha() and ch.isascii())
+        cyrillic = sum(1 for ch in text if "\u0400" <= ch <= "\u04ff")
+
+        if latin + cyrillic == 0:
+            return LanguageDetection("UNKNOWN", 0.0, "no_letters")
+
+        cyrillic_ratio = cyrillic / (latin + cyrillic)
+        trigrams = self._trigram_counts(text)
+
+        if cyrillic_ratio >= 0.5:
+            # RU vs UK - softmax over the two trigram log-likelihoods
+            ru, uk = self._log_likelihood(trigrams, "RU"), self._log_likelihood(trigrams, "UK")
+            p_ru = 1 / (1 + math.exp(max(min(uk - ru, 50), -50)))
+            language, lang_confidence = ("RU", p_ru) if p_ru >= 0.5 else ("UK", 1 - p_ru)
+            # Not being English only depends on the script; RU/UK is informational
+            return LanguageDetection(language, cyrillic_ratio, f"cyrillic_script+trigram({lang_confidence:.2f})", cyrillic_ratio)
+
+        # Latin script - how much of the text looks like English
+        total = sum(trigrams.values())
+        coverage = sum(n for t, n in trigrams.items() if t in self.profiles["EN"]) / total if total else 0.0
+        confidence = (1 - cyrillic_ratio) * coverage
+
+        return LanguageDetection("EN", confidence, "latin_script+trigram", cyrillic_ratio)
+
+
+    def is_confident(self, detection: LanguageDetection) -> bool:
+        return detection.confidence >= self.confidence_threshold
+
+
+language_detector = LanguageDetector(settings.LANGUAGE_DETECTION_CONFIDENCE)
@@ -1,14 +1,22 @@
+import os
 import json
+import logging
 from typing import Any
 
-from openai import OpenAI  # Updated import for v1.x
+from openai import OpenAI, AsyncOpenAI  # Updated import for v1.x
 from pydantic import BaseModel
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.schema import HumanMessage, SystemMessage
 
 from core.config import settings
+from core.local_cache import LocalCache
+from core.call_ledger import track_call
+from core.client_registry import client_registry
+from services.embedding_cache import CachedEmbeddings
 from schemas.structured_outputs.query_classification import QueryClassificationSchema
 
+logger = logging.getLogger(__name__)
+
 
 from services.prompt_templates import (
     QUERY_CLASSIFICATION_PROMPT, ENGLISH_FINAL_RESPONSE_PROMPT, RUSSAIN_FINAL_RESPONSE_PROMPT
@@ -20,9 +28,23 @@ class OpenAIService:
 
     def __init__(self, openai_model: str, openai_api_key: str, embedding_model: str):
     
-        self.client = OpenAI(api_key=openai_api_key)
-        self.llm = ChatOpenAI(model=openai_model, api_key=openai_api_key)
-        self.embeddings = OpenAIEmbeddings(model=embedding_model, openai_api_key=openai_api_key)
+        # All OpenAI clients share the registry's connection pools
+        http_client = client_registry.http_client()
+        http_async_client = client_registry.async_http_client()
+
+        self.client = OpenAI(api_key=openai_api_key, http_client=http_client)
+        self.async_client = AsyncOpenAI(api_key=openai_api_key, http_client=http_async_client)
+        self.llm = ChatOpenAI(model=openai_model, api_key=openai_api_key, http_client=http_client, http_async_client=http_async_client)
+        self.embeddings = OpenAIEmbeddings(model=embedding_model, openai_api_key=openai_api_key, http_client=http_client, http_async_client=http_async_client)
+        client_registry.register(self.client.base_url)
+        self.embedding_cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.embedding_cache = LocalCache(
+                os.path.join(settings.CACHE_DIR, "embeddings.sqlite3"),
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES
+            )
+        # Always wrapped - the wrapper also records embedding calls in the request call ledger
+        self.embeddings = CachedEmbeddings(self.embeddings, embedding_model, self.embedding_cache)
         self.openai_model = openai_model 
 
 
@@ -31,7 +53,15 @@ class OpenAIService:
     def classify_multi_source_query(self, query):
         
         """Classify a query to determine which resources are needed."""
-        return self._process_request(QUERY_CLASSIFICATION_PROMPT, query, QueryClassificationSchema)
+        return self._process_request(QUERY_CLASSIFICATION_PROMPT, query, QueryClassificationSchema, operation="classify")
+
+
+
+
+    async def aclassify_multi_source_query(self, query):
+        
+        """Async variant of classify_multi_source_query."""
+        return await self._aprocess_request(QUERY_CLASSIFICATION_PROMPT, query, QueryClassificationSchema, operation="classify")
 
 
 
@@ -40,24 +70,51 @@ class OpenAIService:
         
         """Generate a comprehensive/final response to a query."""
         
+        return self._process_request(self._final_response_prompt(context, detect_lang), query, None, operation="generate_response")
+
+
+
+
+    async def agenerate_response(self, query, context, detect_lang: str):
+        
+        """Async variant of generate_response."""
+        
+        return await self._aprocess_request(self._final_response_prompt(context, detect_lang), query, None, operation="generate_response")
+
+
+
+
+    async def astream_response(self, query, context, detect_lang: str):
+        
+        """Stream the final response token by token with ChatOpenAI.astream."""
+        
+        messages = [
+            SystemMessage(content=self._final_response_prompt(context, detect_lang)),
+            HumanMessage(content=query)
+        ]
+
+        with track_call("openai", "generate_response", characters=sum(len(message.content) for message in messages)) as call:
+            async for chunk in self.llm.astream(messages):
+                if chunk.content:
+                    call.tokens += 1  # streamed chunks carry about one token each
+                    yield chunk.content
+
+
+
+
+    def _final_response_prompt(self, context, detect_lang: str) -> str:
+        """Pick the final response prompt for the detected language and fill in the context."""
+
         if detect_lang == 'RU':
-            
-            prompt = self._replacer(RUSSAIN_FINAL_RESPONSE_PROMPT, context=context)
-            
-            return self._process_request(prompt, query, None)
+            return self._replacer(RUSSAIN_FINAL_RESPONSE_PROMPT, context=context)
 
-            
-            
-        else:
-            prompt = self._replacer(ENGLISH_FINAL_RESPONSE_PROMPT , context=context)
-            return self._process_request(prompt, query, None)
+        return self._replacer(ENGLISH_FINAL_RESPONSE_PROMPT , context=context)
 
 
 
 
     def _replacer(self, prompt: str, **kwargs: Any) -> str:
         """Replaces placeholders in a prompt with actual serialized values."""
-        print("Hi")
 
         for key, value in kwargs.items():
             placeholder = f"{{{key}}}"
@@ -89,38 +146,74 @@ class OpenAIService:
      
         try:
             # Updated to use v1.x API
-            response = self.client.chat.completions.create(
-                model=self.openai_model,
-               messages=[
-                        {
-                            "role": "system", 
-                            "content": "You are detecting the PRIMARY language of text. If the text uses English sentence structure, grammar, and common English words (like 'what', 'is', 'the', 'how', etc.), classify it as English even if it contains foreign words or names. Reply only 'yes' for English or 'no' for non-English."
-                        },
-                        {"role": "user", "content": query}
-                    ],
-                temperature=0    
-            )
-
-            # Updated response access pattern
-            reply = response.choices[0].message.content.strip().lower()
-
-            if reply == "yes":
-                return True
-            elif reply == "no":
-                return False
-            else:
-                print(f"Unexpected response from LLM: {reply}")
-                return False
+            with track_call("openai", "is_english", characters=len(query)) as call:
+                response = self.client.chat.completions.create(
+                    model=self.openai_model,
+                    messages=self._language_detection_messages(query),
+                    temperature=0    
+                )
+                call.tokens = response.usage.total_tokens if response.usage else 0
+
+            return self._parse_language_reply(response)
             
             
         except Exception as e:
-            print(f"LLM detection failed: {e}")
+            logger.warning(f"LLM detection failed: {e}")
+            return False
+
+
+
+
+    async def ais_english_with_llm(self, query: str) -> bool:
+        """Async variant of is_english_with_llm."""
+
+        try:
+            with track_call("openai", "is_english", characters=len(query)) as call:
+                response = await self.async_client.chat.completions.create(
+                    model=self.openai_model,
+                    messages=self._language_detection_messages(query),
+                    temperature=0
+                )
+                call.tokens = response.usage.total_tokens if response.usage else 0
+
+            return self._parse_language_reply(response)
+
+
+        except Exception as e:
+            logger.warning(f"LLM detection failed: {e}")
+            return False
+
+
+
+
+    def _language_detection_messages(self, query: str) -> list:
+        return [
+            {
+                "role": "system", 
+                "content": "You are detecting the PRIMARY language of text. If the text uses English sentence structure, grammar, and common English words (like 'what', 'is', 'the', 'how', etc.), classify it as English even if it contains foreign words or names. Reply only 'yes' for English or 'no' for non-English."
+            },
+            {"role": "user", "content": query}
+        ]
+
+
+
+
+    def _parse_language_reply(self, response) -> bool:
+        # Updated response access pattern
+        reply = response.choices[0].message.content.strip().lower()
+
+        if reply == "yes":
+            return True
+        elif reply == "no":
+            return False
+        else:
+            logger.warning(f"Unexpected response from LLM: {reply}")
             return False
 
     
     
     def _process_request(
-        self, prompt: str, text: str, schema=None
+        self, prompt: str, text: str, schema=None, operation: str = "chat"
     ):
         """Generic method to handle requests to OpenAI"""
 
@@ -133,12 +226,38 @@ class OpenAIService:
 
             # Initialize llm_instance with structured output if schema is provided else use simple llm to invoke.
             llm_instance = self.llm.with_structured_output(schema) if schema else self.llm  
-            response = llm_instance.invoke(messages)
+            with track_call("openai", operation, characters=len(prompt) + len(text)) as call:
+                response = llm_instance.invoke(messages)
+                call.tokens = self._total_tokens(response)
+
 
+            logger.debug(response)
 
-            print(response)
+
+            return {"status": "success", "message": response.content if not schema else response}
+
+        except Exception as e:
+            return {"status": "error", "message": f"Error processing request: {e}"}
 
 
+
+
+    async def _aprocess_request(
+        self, prompt: str, text: str, schema=None, operation: str = "chat"
+    ):
+        """Async variant of _process_request, awaiting the model with ainvoke"""
+
+        try:
+            messages = [
+                SystemMessage(content=prompt),
+                HumanMessage(content=text)
+            ]
+
+            llm_instance = self.llm.with_structured_output(schema) if schema else self.llm
+            with track_call("openai", operation, characters=len(prompt) + len(text)) as call:
+                response = await llm_instance.ainvoke(messages)
+                call.tokens = self._total_tokens(response)
+
             return {"status": "success", "message": response.content if not schema else response}
 
         except Exception as e:
@@ -146,6 +265,13 @@ class OpenAIService:
 
 
 
+    def _total_tokens(self, response) -> int:
+        # Plain chat responses carry usage metadata; structured outputs come back as the parsed schema only
+        usage = getattr(response, "usage_metadata", None) or {}
+        return usage.get("total_tokens", 0)
+
+
+
 openai_service = OpenAIService(settings.LLM_MODEL, settings.OPENAI_API_KEY, settings.EMBEDDING_MODEL)
 
 
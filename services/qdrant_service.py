@@ -1,32 +1,128 @@
-
-
+import os
+import asyncio
 import logging
-from sentence_transformers import CrossEncoder
+import threading
+import contextvars
+from functools import partial
 
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient, models
 
+from core.config import settings
+from core.executor import run_blocking, blocking_executor
+from core.call_ledger import track_call
+from core.client_registry import client_registry, LoopLocal
+from core.metrics import time_upstream
+from core.local_cache import LocalCache, hash_key, normalize_text
+from services.reranker_service import build_reranker
+from services.sparse_index import BM25Index, reciprocal_rank_fusion
 from schemas.data_classes.langraph_state import LangraphState
 from schemas.data_classes.content_type import ContentType
 
 
 class QdrantService:
-    def __init__(self, qdrant_configs, embeddings, reranker_model_name="cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    def __init__(self, qdrant_configs, embeddings, reranker=None):
 
         self.qdrant_clients = {}
+        self.async_qdrant_clients = {}
         self.collection_configs = {}
+        self.endpoints = {}
         self.embeddings = embeddings
         
-        # Initialize reranker model
-        self.reranker = CrossEncoder(reranker_model_name)
+        # Reranker model (torch or ONNX backend, see RERANKER_BACKEND) - loaded on first use or by warm_up
+        self._reranker = reranker
+        self._reranker_lock = threading.Lock()
+
+        # Rerank scores per (query, point id, reranker model) so popular questions skip the cross-encoder
+        self.rerank_cache = None
+        if settings.RERANK_CACHE_ENABLED:
+            self.rerank_cache = LocalCache(
+                os.path.join(settings.CACHE_DIR, "rerank_scores.sqlite3"),
+                max_entries=settings.RERANK_CACHE_MAX_ENTRIES
+            )
         
-        # Create separate Qdrant clients for each content type
+        # One pair of Qdrant clients per cluster, shared by every content type configured against it
+        shared_clients = {}
         for content_type, config in qdrant_configs.items():
-            self.qdrant_clients[content_type] = QdrantClient(
-                url=config["url"], 
-                api_key=config["api_key"]
-            )
+            endpoint = (config["url"], config["api_key"])
+            if endpoint not in shared_clients:
+                shared_clients[endpoint] = (
+                    QdrantClient(
+                        url=config["url"], 
+                        api_key=config["api_key"],
+                        prefer_grpc=settings.QDRANT_PREFER_GRPC,
+                        limits=client_registry.limits(),
+                        http2=client_registry.http2()
+                    ),
+                    # Async connections are bound to their event loop - one client per loop
+                    LoopLocal(partial(
+                        AsyncQdrantClient,
+                        url=config["url"],
+                        api_key=config["api_key"],
+                        prefer_grpc=settings.QDRANT_PREFER_GRPC,
+                        limits=client_registry.limits(),
+                        http2=client_registry.http2()
+                    ))
+                )
+            self.qdrant_clients[content_type], self.async_qdrant_clients[content_type] = shared_clients[endpoint]
+            self.endpoints[content_type] = endpoint
             self.collection_configs[content_type] = config["collection"]
 
+        # Local BM25 indexes for the hybrid (sparse + dense) sources, built by scripts.build_sparse_index
+        self.sparse_indexes = {}
+        if settings.HYBRID_RETRIEVAL:
+            for content_type in settings.HYBRID_SOURCES:
+                path = os.path.join(settings.CACHE_DIR, "sparse", f"{content_type}.npz")
+                if os.path.exists(path):
+                    self.sparse_indexes[content_type] = BM25Index.load(path)
+                else:
+                    logging.warning(f"No BM25 index for {content_type} at {path}, using dense retrieval only")
+
+        logging.info(f"Qdrant: {len(shared_clients)} client(s) for {len(qdrant_configs)} collections (prefer_grpc={settings.QDRANT_PREFER_GRPC})")
+
+
+    @property
+    def reranker(self):
+        """The cross-encoder, loaded on first use - importing torch and loading the model take seconds"""
+        if self._reranker is None:
+            with self._reranker_lock:
+                if self._reranker is None:
+                    self._reranker = build_reranker()
+        return self._reranker
+
+
+    @property
+    def reranker_loaded(self) -> bool:
+        return self._reranker is not None
+
+
+    def warm_up(self) -> None:
+        """Load the reranker and run one prediction, so the first request pays for neither, and pre-connect the sync clients"""
+        self.reranker.predict([("warm up", "warm up")])
+        for content_type in self._endpoint_representatives():
+            try:
+                self.qdrant_clients[content_type].collection_exists(self.collection_configs[content_type])
+            except Exception as e:
+                logging.warning(f"Qdrant pre-connect for {content_type} failed: {e}")
+
+
+    async def apreconnect(self) -> None:
+        """Open a connection from each async client; runs on the event loop that serves requests"""
+        async def preconnect(content_type: str):
+            try:
+                await self.async_qdrant_clients[content_type].collection_exists(self.collection_configs[content_type])
+            except Exception as e:
+                logging.warning(f"Qdrant async pre-connect for {content_type} failed: {e}")
+
+        await asyncio.gather(*(preconnect(content_type) for content_type in self._endpoint_representatives()))
+
+
+    def _endpoint_representatives(self) -> list:
+        """One content type per distinct Qdrant endpoint"""
+        representatives = {}
+        for content_type, endpoint in self.endpoints.items():
+            representatives.setdefault(endpoint, content_type)
+        return list(representatives.values())
+
 
     def _get_content_type_limit(self, content_type: ContentType) -> int:
         """Get retrieval limit based on content type"""
@@ -39,6 +135,82 @@ class QdrantService:
         return limits.get(content_type, 8)  # Default fallback
 
 
+    def _dense_limit(self, content_type: ContentType) -> int:
+        """Dense candidates to fetch - hybrid sources get their extra recall from the BM25 hits instead"""
+        limit = self._get_content_type_limit(content_type)
+        if content_type.value in self.sparse_indexes:
+            return limit
+        return limit * 2  # Retrieve more documents for reranking
+
+
+    def _hybrid_fusion(self, content_type: ContentType, query: str, documents: list) -> tuple:
+        """
+        Fuse the dense documents with BM25 hits by reciprocal rank fusion. Returns the fused
+        (point id, rrf score) candidates and the ids whose payloads still have to be fetched
+        """
+        limit = self._get_content_type_limit(content_type)
+        sparse_hits = self.sparse_indexes[content_type.value].search(query, limit)
+
+        fused = reciprocal_rank_fusion(
+            [[doc['id'] for doc in documents], [point_id for point_id, _ in sparse_hits]],
+            k=settings.HYBRID_RRF_K
+        )[:max(limit, round(limit * settings.HYBRID_CANDIDATE_FACTOR))]
+
+        dense_ids = {doc['id'] for doc in documents}
+        missing = [point_id for point_id, _ in fused if point_id not in dense_ids]
+        return fused, missing
+
+
+    def _hybrid_documents(self, content_type: ContentType, documents: list, fused: list, fetched_points) -> list:
+        by_id = {doc['id']: doc for doc in documents}
+        for doc in self._format_results(fetched_points, content_type.value):
+            by_id[doc['id']] = doc
+
+        hybrid_documents = []
+        for point_id, rrf_score in fused:
+            if point_id in by_id:
+                by_id[point_id]['rrf_score'] = rrf_score
+                hybrid_documents.append(by_id[point_id])
+
+        logging.info(f"Hybrid retrieval for {content_type.value}: {len(hybrid_documents)} fused candidates, {len(fetched_points)} from BM25 only")
+        return hybrid_documents
+
+
+    def _hybrid_candidates(self, content_type: ContentType, query: str, documents: list) -> list:
+        """Dense documents fused with the BM25 hits for hybrid sources; other sources pass through"""
+        if content_type.value not in self.sparse_indexes:
+            return documents
+
+        fused, missing = self._hybrid_fusion(content_type, query, documents)
+        fetched_points = []
+        if missing:
+            with track_call("qdrant", "retrieve"):
+                fetched_points = self.qdrant_clients[content_type.value].retrieve(
+                    collection_name=self.collection_configs[content_type.value],
+                    ids=missing,
+                    with_payload=True,
+                    with_vectors=False
+                )
+        return self._hybrid_documents(content_type, documents, fused, fetched_points)
+
+
+    async def _ahybrid_candidates(self, content_type: ContentType, query: str, documents: list) -> list:
+        if content_type.value not in self.sparse_indexes:
+            return documents
+
+        fused, missing = self._hybrid_fusion(content_type, query, documents)
+        fetched_points = []
+        if missing:
+            with track_call("qdrant", "retrieve"):
+                fetched_points = await self.async_qdrant_clients[content_type.value].retrieve(
+                    collection_name=self.collection_configs[content_type.value],
+                    ids=missing,
+                    with_payload=True,
+                    with_vectors=False
+                )
+        return self._hybrid_documents(content_type, documents, fused, fetched_points)
+
+
     def _rerank_documents(self, query: str, documents: list, top_k: int = None) -> list:
         """
         Rerank documents using cross-encoder model
@@ -46,11 +218,8 @@ class QdrantService:
         if not documents:
             return documents
             
-        # Prepare query-document pairs for reranking
-        query_doc_pairs = [(query, doc['content']) for doc in documents]
-        
-        # Get relevance scores from cross-encoder
-        relevance_scores = self.reranker.predict(query_doc_pairs)
+        # Get relevance scores from cross-encoder (cached per query and document)
+        relevance_scores = self._rerank_scores(query, documents)
         
         # Add rerank scores to documents
         for i, doc in enumerate(documents):
@@ -66,6 +235,75 @@ class QdrantService:
         return reranked_docs
 
 
+    def _rerank_cache_key(self, query_hash: str, doc: dict) -> str:
+        # Point ids are only unique within a collection; fall back to the content for points without one
+        document_key = doc.get('id') if doc.get('id') is not None else hash_key(doc['content'])
+        reranker_model = f"{getattr(self.reranker, 'backend', '')}:{getattr(self.reranker, 'model_name', '')}"
+        return hash_key(query_hash, doc['source'], document_key, reranker_model)
+
+
+    def _rerank_scores(self, query: str, documents: list) -> list:
+        """Cross-encoder scores for documents, predicting only the pairs missing from the rerank cache"""
+        if self.rerank_cache is None:
+            with time_upstream("reranker", "predict"):
+                return self.reranker.predict([(query, doc['content']) for doc in documents])
+
+        query_hash = hash_key(normalize_text(query))
+        keys = [self._rerank_cache_key(query_hash, doc) for doc in documents]
+        scores = self.rerank_cache.get_many(keys)
+
+        missing = [i for i, key in enumerate(keys) if key not in scores]
+        if missing:
+            with time_upstream("reranker", "predict"):
+                predicted = self.reranker.predict([(query, documents[i]['content']) for i in missing])
+            new_scores = {keys[i]: float(score) for i, score in zip(missing, predicted)}
+            self.rerank_cache.set_many(new_scores)
+            scores.update(new_scores)
+
+        stats = self.rerank_cache.stats()
+        logging.info(
+            f"Rerank cache: {len(documents) - len(missing)}/{len(documents)} pairs cached, "
+            f"hit_rate={stats['hit_rate']:.2%}"
+        )
+        return [scores[key] for key in keys]
+
+
+    def _format_results(self, search_results, content_type_value: str, content_key: str = 'page_content') -> list:
+        """Convert Qdrant points into the document dicts stored on the state"""
+        documents = []
+        for result in search_results:
+            doc = {
+                'id': result.id,
+                'content': result.payload.get(content_key, ''),
+                'metadata': result.payload.get('metadata', {}),
+                'score': getattr(result, 'score', None),  # None for points found by BM25 only
+                'source': content_type_value
+            }
+            documents.append(doc)
+        return documents
+
+
+    def _store_documents(self, state: LangraphState, content_type_value: str, documents: list) -> None:
+        """Append documents for a source type on the state"""
+        if content_type_value not in state.retrieved_documents:
+            state.retrieved_documents[content_type_value] = []
+        
+        state.retrieved_documents[content_type_value].extend(documents)
+
+
+    def _query_embedding(self, state: LangraphState) -> list:
+        """Embed the query once per request and keep it on the state for the other collections"""
+        if state.query_embedding is None:
+            state.query_embedding = self.embeddings.embed_query(state.user_query)
+        return state.query_embedding
+
+
+    async def _aquery_embedding(self, state: LangraphState) -> list:
+        if state.query_embedding is None:
+            state.query_embedding = await self.embeddings.aembed_query(state.user_query)
+        return state.query_embedding
+
+
     def retrieve_documents(self, state: LangraphState, content_type: ContentType) -> LangraphState:
         """
         Generic document retrieval function with enhanced context awareness and reranking
@@ -80,42 +318,33 @@ class QdrantService:
             qdrant_client = self.qdrant_clients[content_type_value]
             collection_name = self.collection_configs[content_type_value]
             
-            # Generate query embedding
-            query_embedding = self.embeddings.embed_query(state.user_query)
+            # Generate query embedding (reused if already computed for this request)
+            query_embedding = self._query_embedding(state)
             
             limit = self._get_content_type_limit(content_type)
             # Search in Qdrant - retrieve more documents for reranking
-            search_results = qdrant_client.search(
-                collection_name=collection_name,
-                query_vector=query_embedding,
-                limit=limit * 2,  # Retrieve more documents for reranking
-                with_payload=True,
-                with_vectors=False
-            )
+            with track_call("qdrant", "search"):
+                search_results = qdrant_client.search(
+                    collection_name=collection_name,
+                    query_vector=query_embedding,
+                    limit=self._dense_limit(content_type),
+                    with_payload=True,
+                    with_vectors=False
+                )
             
             # print("\n\n\n\n\n", search_results, "\n\n\n\n")
             
-            # Format retrieved documents
-            documents = []
-            for result in search_results:
-                doc = {
-                    'content': result.payload.get('page_content', ''),
-                    'metadata': result.payload.get('metadata', {}),
-                    'score': result.score,
-                    'source': content_type_value
-                }
-                documents.append(doc)
+            # Format retrieved documents, fused with BM25 hits for hybrid sources
+            documents = self._format_results(search_results, content_type_value)
+            documents = self._hybrid_candidates(content_type, state.user_query, documents)
             
             # Rerank documents using cross-encoder
             reranked_documents = self._rerank_documents(state.user_query, documents, top_k=limit)
 
-            print("\n\n\nReranked Documents: ", reranked_documents, "\n\n\n")
+            logging.debug(f"Reranked Documents: {reranked_documents}")
 
             # Store documents by source type
-            if content_type_value not in state.retrieved_documents:
-                state.retrieved_documents[content_type_value] = []
-            
-            state.retrieved_documents[content_type_value].extend(reranked_documents)
+            self._store_documents(state, content_type_value, reranked_documents)
 
             logging.info(f"Retrieved and reranked {len(reranked_documents)} documents from {content_type_value}")
 
@@ -127,41 +356,241 @@ class QdrantService:
         return state
 
 
+    async def aretrieve_documents(self, state: LangraphState, content_type: ContentType) -> LangraphState:
+        """
+        Async variant of retrieve_documents using AsyncQdrantClient; reranking runs on the bounded executor
+        """
+        try:
+            content_type_value = content_type.value
+            if content_type_value not in self.async_qdrant_clients:
+                logging.warning(f"No Qdrant client configured for {content_type_value}")
+                return state
+
+            qdrant_client = self.async_qdrant_clients[content_type_value]
+            collection_name = self.collection_configs[content_type_value]
+
+            query_embedding = await self._aquery_embedding(state)
+
+            limit = self._get_content_type_limit(content_type)
+            with track_call("qdrant", "search"):
+                search_results = await qdrant_client.search(
+                    collection_name=collection_name,
+                    query_vector=query_embedding,
+                    limit=self._dense_limit(content_type),
+                    with_payload=True,
+                    with_vectors=False
+                )
+
+            documents = self._format_results(search_results, content_type_value)
+            documents = await self._ahybrid_candidates(content_type, state.user_query, documents)
+
+            # Cross-encoder inference is CPU bound, keep it off the event loop
+            reranked_documents = await run_blocking(self._rerank_documents, state.user_query, documents, top_k=limit)
+
+            self._store_documents(state, content_type_value, reranked_documents)
+
+            logging.info(f"Retrieved and reranked {len(reranked_documents)} documents from {content_type_value}")
+
+        except Exception as e:
+            logging.error(f"Error retrieving documents from {content_type_value}: {e}")
+            if not state.error_message:
+                state.error_message = f"Error retrieving documents from {content_type_value}: {str(e)}"
+
+        return state
+
+
+    def _batch_groups(self, content_types) -> dict:
+        """
+        Group content types by (cluster, collection). Qdrant batches queries per collection,
+        so each group is a single query_batch_points call
+        """
+        groups = {}
+        for content_type in content_types:
+            content_type_value = content_type.value
+            if content_type_value not in self.qdrant_clients:
+                logging.warning(f"No Qdrant client configured for {content_type_value}")
+                continue
+            key = (self.endpoints[content_type_value], self.collection_configs[content_type_value])
+            groups.setdefault(key, []).append(content_type)
+        return groups
+
+
+    def _batch_requests(self, query_embedding: list, content_types: list) -> list:
+        return [
+            models.QueryRequest(
+                query=query_embedding,
+                limit=self._dense_limit(content_type),
+                with_payload=True,
+                with_vector=False
+            )
+            for content_type in content_types
+        ]
+
+
+    def _query_batch(self, content_type_value: str, collection_name: str, requests: list) -> list:
+        with track_call("qdrant", "query_batch"):
+            return self.qdrant_clients[content_type_value].query_batch_points(
+                collection_name=collection_name,
+                requests=requests
+            )
+
+
+    async def _aquery_batch(self, content_type_value: str, collection_name: str, requests: list) -> list:
+        with track_call("qdrant", "query_batch"):
+            return await self.async_qdrant_clients[content_type_value].query_batch_points(
+                collection_name=collection_name,
+                requests=requests
+            )
+
+
+    def _rerank_batch(self, query: str, documents_by_type: dict) -> dict:
+        """
+        Rerank the candidates of every content type with a single cross-encoder call,
+        then keep the top documents per content type
+        """
+        all_documents = [doc for documents in documents_by_type.values() for doc in documents]
+        if not all_documents:
+            return documents_by_type
+
+        for doc, score in zip(all_documents, self._rerank_scores(query, all_documents)):
+            doc['rerank_score'] = float(score)
+
+        return {
+            content_type: sorted(documents, key=lambda x: x['rerank_score'], reverse=True)[:self._get_content_type_limit(content_type)]
+            for content_type, documents in documents_by_type.items()
+        }
+
+
+    def _store_batch(self, state: LangraphState, reranked: dict) -> None:
+        for content_type, documents in reranked.items():
+            self._store_documents(state, content_type.value, documents)
+            state.completed_sources.add(content_type)
+            logging.info(f"Retrieved and reranked {len(documents)} documents from {content_type.value}")
+
+
+    def _batch_error(self, state: LangraphState, group: list, e: Exception) -> None:
+        sources = ", ".join(content_type.value for content_type in group)
+        logging.error(f"Error retrieving documents from {sources}: {e}")
+        if not state.error_message:
+            state.error_message = f"Error retrieving documents from {sources}: {str(e)}"
+
+
+    def retrieve_documents_batch(self, state: LangraphState, content_types) -> LangraphState:
+        """
+        Retrieve several content types with one batched query per collection, demultiplex the
+        responses back per content type and rerank all candidates together
+        """
+        query_embedding = self._query_embedding(state)
+        groups = list(self._batch_groups(content_types).items())
+
+        # The per-collection batches go out side by side on the bounded executor, each with a
+        # copy of the context so the calls land in the request ledger
+        futures = [
+            blocking_executor.submit(contextvars.copy_context().run, self._query_batch, group[0].value, collection_name, self._batch_requests(query_embedding, group))
+            for (_, collection_name), group in groups
+        ]
+
+        documents_by_type = {}
+        for (_, group), future in zip(groups, futures):
+            try:
+                group_responses = future.result()
+            except Exception as e:
+                self._batch_error(state, group, e)
+                continue
+            for content_type, response in zip(group, group_responses):
+                documents_by_type[content_type] = self._format_results(response.points, content_type.value)
+
+        for content_type, documents in documents_by_type.items():
+            try:
+                documents_by_type[content_type] = self._hybrid_candidates(content_type, state.user_query, documents)
+            except Exception as e:
+                # Keep the dense candidates if the sparse side fails
+                logging.warning(f"Hybrid retrieval failed for {content_type.value}: {e}")
+
+        try:
+            self._store_batch(state, self._rerank_batch(state.user_query, documents_by_type))
+        except Exception as e:
+            self._batch_error(state, list(documents_by_type), e)
+
+        return state
+
+
+    async def aretrieve_documents_batch(self, state: LangraphState, content_types) -> LangraphState:
+        """
+        Async variant of retrieve_documents_batch - the per-collection batches are sent concurrently
+        over the shared clients and reranking runs on the bounded executor
+        """
+        query_embedding = await self._aquery_embedding(state)
+        groups = list(self._batch_groups(content_types).items())
+
+        responses = await asyncio.gather(
+            *[
+                self._aquery_batch(group[0].value, collection_name, self._batch_requests(query_embedding, group))
+                for (_, collection_name), group in groups
+            ],
+            return_exceptions=True
+        )
+
+        documents_by_type = {}
+        for (_, group), group_responses in zip(groups, responses):
+            if isinstance(group_responses, Exception):
+                self._batch_error(state, group, group_responses)
+                continue
+            for content_type, response in zip(group, group_responses):
+                documents_by_type[content_type] = self._format_results(response.points, content_type.value)
+
+        # Payloads of BM25-only hits are fetched concurrently as well
+        hybrid_results = await asyncio.gather(
+            *[
+                self._ahybrid_candidates(content_type, state.user_query, documents)
+                for content_type, documents in documents_by_type.items()
+            ],
+            return_exceptions=True
+        )
+        for content_type, result in zip(list(documents_by_type), hybrid_results):
+            if isinstance(result, Exception):
+                # Keep the dense candidates if the sparse side fails
+                logging.warning(f"Hybrid retrieval failed for {content_type.value}: {result}")
+                continue
+            documents_by_type[content_type] = result
+
+        try:
+            # Cross-encoder inference is CPU bound, keep it off the event loop
+            reranked = await run_blocking(self._rerank_batch, state.user_query, documents_by_type)
+            self._store_batch(state, reranked)
+        except Exception as e:
+            self._batch_error(state, list(documents_by_type), e)
+
+        return state
+
+
     def fallback_retrieval(self, state: LangraphState) -> LangraphState:
         """
         Fallback node that searches across all collections when GENERAL is specified
         """
         try:
+            query_embedding = self._query_embedding(state)
+
             # Search in all collections if no specific sources were identified
             for content_type_value, qdrant_client in self.qdrant_clients.items():
                 try:
                     collection_name = self.collection_configs[content_type_value]
-                    query_embedding = self.embeddings.embed_query(state.user_query)
                     
-                    search_results = qdrant_client.search(
-                        collection_name=collection_name,
-                        query_vector=query_embedding,
-                        limit=6,  # Retrieve more for reranking
-                        with_payload=True,
-                        with_vectors=False
-                    )
+                    with track_call("qdrant", "search"):
+                        search_results = qdrant_client.search(
+                            collection_name=collection_name,
+                            query_vector=query_embedding,
+                            limit=6,  # Retrieve more for reranking
+                            with_payload=True,
+                            with_vectors=False
+                        )
                     
-                    documents = []
-                    for result in search_results:
-                        doc = {
-                            'content': result.payload.get('content', ''),
-                            'metadata': result.payload.get('metadata', {}),
-                            'score': result.score,
-                            'source': content_type_value
-                        }
-                        documents.append(doc)
+                    documents = self._format_results(search_results, content_type_value, content_key='content')
                     
                     # Rerank documents for this source
                     reranked_documents = self._rerank_documents(state.user_query, documents, top_k=3)
                     
-                    if content_type_value not in state.retrieved_documents:
-                        state.retrieved_documents[content_type_value] = []
-                    state.retrieved_documents[content_type_value].extend(reranked_documents)
+                    self._store_documents(state, content_type_value, reranked_documents)
                         
                 except Exception as e:
                     logging.warning(f"Error searching in {content_type_value}: {e}")
@@ -175,4 +604,44 @@ class QdrantService:
             logging.error(f"Error in fallback retrieval: {e}")
             state.error_message = f"Fallback retrieval failed: {str(e)}"
         
-        return state
\ No newline at end of file
+        return state
+
+
+    async def afallback_retrieval(self, state: LangraphState) -> LangraphState:
+        """
+        Async variant of fallback_retrieval
+        """
+        try:
+            query_embedding = await self._aquery_embedding(state)
+
+            for content_type_value, qdrant_client in self.async_qdrant_clients.items():
+                try:
+                    collection_name = self.collection_configs[content_type_value]
+
+                    with track_call("qdrant", "search"):
+                        search_results = await qdrant_client.search(
+                            collection_name=collection_name,
+                            query_vector=query_embedding,
+                            limit=6,  # Retrieve more for reranking
+                            with_payload=True,
+                            with_vectors=False
+                        )
+
+                    documents = self._format_results(search_results, content_type_value, content_key='content')
+
+                    reranked_documents = await run_blocking(self._rerank_documents, state.user_query, documents, top_k=3)
+
+                    self._store_documents(state, content_type_value, reranked_documents)
+
+                except Exception as e:
+                    logging.warning(f"Error searching in {content_type_value}: {e}")
+                    continue
+
+            state.completed_sources.update([ContentType.QURAN, ContentType.HADITH, ContentType.TAFSEER])
+            logging.info(f"Fallback retrieved documents from {len(state.retrieved_documents)} sources")
+
+        except Exception as e:
+            logging.error(f"Error in fallback retrieval: {e}")
+            state.error_message = f"Fallback retrieval failed: {str(e)}"
+
+        return state
@@ -0,0 +1,140 @@
+import logging
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from core.local_cache import LocalCache, hash_key, normalize_text
+from core.vector_index import VectorIndex
+from schemas.data_classes.content_type import ContentType
+from schemas.data_classes.source_prediction import SourcePrediction
+
+logger = logging.getLogger(__name__)
+
+
+LABELS = [content_type.value for content_type in ContentType]
+
+
+
+class QueryClassifier:
+    """
+    kNN multi-label source classifier over the query embedding.
+
+    Every LLM classification is logged with its query embedding; a new query takes the
+    similarity-weighted vote of its k nearest logged queries for each ContentType. The
+    prediction is only trusted once enough examples are logged and every label vote is
+    decisive - otherwise the caller falls back to the LLM. Shadow LLM calls on a sample of
+    confident predictions keep track of the agreement rate.
+    """
+
+    def __init__(self, cache: LocalCache, model: str, k: int = 10, min_examples: int = 200, min_similarity: float = 0.5):
+
+        self.cache = cache
+        self.model = model
+        self.k = k
+        self.min_examples = min_examples
+        self.min_similarity = min_similarity
+
+        self.shadow_total = 0
+        self.shadow_agreed = 0
+        self._lock = threading.Lock()
+        self._index = VectorIndex(extra_width=len(LABELS))   # query embeddings, label vectors as extras
+
+        # Examples the store evicts leave the in-memory matrix right away
+        self.cache.on_evict = self._unindex_many
+        self._load()
+
+
+    def _normalize(self, embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+    def _label_vector(self, sources: List[str]) -> np.ndarray:
+        return np.array([1.0 if label in sources else 0.0 for label in LABELS], dtype=np.float32)
+
+
+    def _load(self) -> None:
+        """Build the in-memory example matrix from the persistent log"""
+        for key, entry in self.cache.items():
+            if entry["model"] != self.model:
+                continue
+            with self._lock:
+                self._index.add(key, self._normalize(entry["embedding"]), self._label_vector(entry["sources"]))
+
+        logger.info(f"Query classifier loaded {len(self._index)} logged classifications")
+
+
+    def _unindex_many(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._index.remove(key)
+
+
+    def add_example(self, query: str, embedding, sources: List[str]) -> None:
+        """Log an LLM classification as a training example"""
+        key = hash_key(self.model, normalize_text(query))
+        vector = self._normalize(embedding)
+        label_vector = self._label_vector(sources)
+
+        # Indexed first, so the eviction callback of the set below always finds what it removes
+        with self._lock:
+            self._index.add(key, vector, label_vector)
+        self.cache.set(key, {"query": query, "embedding": vector.tolist(), "sources": sources, "model": self.model})
+
+
+    def predict(self, embedding) -> Optional[SourcePrediction]:
+        """Nearest-neighbour vote per source, or None while too few examples are logged"""
+        query = self._normalize(embedding)
+        with self._lock:
+            if len(self._index) < self.min_examples:
+                return None
+
+            # Under the lock - removals move rows between the vector and label matrices
+            similarities = self._index.vectors() @ query
+            k = min(self.k, len(similarities))
+            nearest = np.argpartition(similarities, -k)[-k:]
+            neighbour_labels = self._index.extras()[nearest]
+
+        weights = np.clip(similarities[nearest], 0.0, None)
+        if not weights.sum():
+            return SourcePrediction([], 0.0, float(similarities[nearest].max()))
+
+        scores = weights @ neighbour_labels / weights.sum()
+        label_scores = {label: float(score) for label, score in zip(LABELS, scores)}
+        required_sources = [label for label in sorted(LABELS, key=lambda l: -label_scores[l]) if label_scores[label] >= 0.5]
+
+        similarity = float(similarities[nearest].max())
+        confidence = float(np.min(np.maximum(scores, 1 - scores)))
+        if similarity < self.min_similarity or not required_sources:
+            confidence = 0.0
+
+        return SourcePrediction(required_sources, confidence, similarity, label_scores)
+
+
+    def record_shadow(self, prediction: SourcePrediction, llm_sources: List[str]) -> bool:
+        """Compare a trusted local prediction with the LLM's answer for the same query; True when they agree"""
+        agreed = set(prediction.required_sources) == set(llm_sources)
+        with self._lock:
+            self.shadow_total += 1
+            self.shadow_agreed += int(agreed)
+
+        log = logger.info if agreed else logger.warning
+        log(
+            f"Query classifier shadow {'agreement' if agreed else 'disagreement'}: local={prediction.required_sources} "
+            f"llm={llm_sources} (agreement_rate={self.agreement_rate():.2%} over {self.shadow_total})"
+        )
+        return agreed
+
+
+    def agreement_rate(self) -> float:
+        return self.shadow_agreed / self.shadow_total if self.shadow_total else 0.0
+
+
+    def stats(self) -> dict:
+        return {
+            "examples": len(self._index),
+            "shadow_total": self.shadow_total,
+            "shadow_agreement_rate": self.agreement_rate()
+        }
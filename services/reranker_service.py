@@ -0,0 +1,170 @@
+import os
+import logging
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+
+class TorchReranker:
+    """Cross-encoder reranker on the sentence-transformers PyTorch (fp32) path"""
+
+    backend = "torch"
+
+    def __init__(self, model_name: str, threads: int = 0, max_length: int = 512):
+        import torch
+        from sentence_transformers import CrossEncoder
+
+        if threads:
+            # Process wide setting - torch has no per-model thread pool
+            torch.set_num_threads(threads)
+
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, max_length=max_length)
+
+
+    def predict(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        return [float(score) for score in self.model.predict(list(pairs))]
+
+
+
+class OnnxReranker:
+    """
+    Cross-encoder reranker on ONNX Runtime, by default with dynamic int8 quantized weights.
+    The model is exported (and quantized) into onnx_dir on first use.
+    """
+
+    backend = "onnx"
+
+    def __init__(self, model_name: str, onnx_dir: str, threads: int = 0, max_length: int = 512, quantize: bool = True, batch_size: int = 32):
+        import onnxruntime
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+        model_dir = os.path.join(onnx_dir, model_name.replace("/", "__"))
+        model_path = os.path.join(model_dir, "model_int8.onnx" if quantize else "model.onnx")
+        if not os.path.exists(model_path):
+            export_onnx_reranker(model_name, model_dir, quantize=quantize)
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        # Match CrossEncoder's default activation so scores are interchangeable between backends
+        config = AutoConfig.from_pretrained(model_dir)
+        activation = getattr(config, "sbert_ce_default_activation_function", None) \
+            or (getattr(config, "sentence_transformers", None) or {}).get("activation_fn")
+        self.apply_sigmoid = config.num_labels == 1 and not (activation and activation.endswith("Identity"))
+
+        logger.info(f"Loaded ONNX reranker {model_path} (threads={threads or 'default'}, sigmoid={self.apply_sigmoid})")
+
+
+    def predict(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        scores = []
+        pairs = list(pairs)
+
+        for start in range(0, len(pairs), self.batch_size):
+            batch = pairs[start:start + self.batch_size]
+            encoded = self.tokenizer(
+                [query for query, _ in batch],
+                [document for _, document in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            logits = self.session.run(None, feed)[0][:, 0]
+
+            if self.apply_sigmoid:
+                logits = 1 / (1 + np.exp(-logits))
+            scores.extend(float(score) for score in logits)
+
+        return scores
+
+
+
+def export_onnx_reranker(model_name: str, output_dir: str, quantize: bool = True) -> str:
+    """Export a Hugging Face cross-encoder to ONNX and optionally int8 quantize it; returns the model path"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["what is patience"], ["Patience is half of faith."], return_tensors="pt")
+    input_names = list(sample.keys())
+
+    class _LogitsOnly(torch.nn.Module):
+        # Positional ONNX inputs mapped back to the keyword arguments the model expects
+        def __init__(self, wrapped):
+            super().__init__()
+            self.wrapped = wrapped
+
+        def forward(self, *tensors):
+            return self.wrapped(**dict(zip(input_names, tensors))).logits
+
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model),
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False
+        )
+
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+    logger.info(f"Exported {model_name} to {fp32_path}")
+
+    if not quantize:
+        return fp32_path
+
+    int8_path = os.path.join(output_dir, "model_int8.onnx")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    logger.info(f"Quantized {model_name} to {int8_path}")
+    return int8_path
+
+
+
+def build_reranker(backend: str = None, model_name: str = None, threads: int = None):
+    """Reranker for the configured backend ("torch" or "onnx")"""
+    backend = (backend or settings.RERANKER_BACKEND).lower()
+    model_name = model_name or settings.RERANKER_MODEL
+    threads = settings.RERANKER_THREADS if threads is None else threads
+
+    if backend == "onnx":
+        return OnnxReranker(
+            model_name,
+            settings.RERANKER_ONNX_DIR,
+            threads=threads,
+            max_length=settings.RERANKER_MAX_LENGTH,
+            quantize=settings.RERANKER_ONNX_QUANTIZE
+        )
+
+    if backend == "torch":
+        return TorchReranker(model_name, threads=threads, max_length=settings.RERANKER_MAX_LENGTH)
+
+    raise ValueError(f"Unknown reranker backend: {backend}")
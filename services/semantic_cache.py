@@ -0,0 +1,130 @@
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.local_cache import LocalCache, hash_key
+from core.vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+
+class SemanticCache:
+    """
+    Answer cache matched by query embedding similarity.
+
+    Entries are partitioned by (detected language, LLM model, prompt version) and a stored
+    final response is returned when the cosine similarity of the incoming query embedding
+    to a cached one reaches the threshold. Persistence, TTL and LRU eviction come from
+    the underlying LocalCache; the embeddings are mirrored in memory for the similarity scan.
+    """
+
+    def __init__(self, cache: LocalCache, threshold: float, model: str, prompt_version: str):
+
+        self.cache = cache
+        self.threshold = threshold
+        self.model = model
+        self.prompt_version = prompt_version
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._indexes: Dict[tuple, VectorIndex] = {}
+        self._partitions: Dict[str, tuple] = {}   # key -> partition, to unindex evicted keys
+
+        # Keys the store evicts (LRU or TTL) leave the in-memory mirror right away
+        self.cache.on_evict = self._unindex_many
+        self._load()
+
+
+    def _partition(self, language: str) -> tuple:
+        return ((language or "EN").upper(), self.model, self.prompt_version)
+
+
+    def _normalize(self, embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+    def _load(self) -> None:
+        """Build the in-memory index from the persistent store"""
+        for key, entry in self.cache.items():
+            partition = (entry["language"], entry["model"], entry["prompt_version"])
+            self._index(key, partition, self._normalize(entry["embedding"]))
+
+        logger.info(f"Semantic cache loaded {len(self._partitions)} entries")
+
+
+    def _index(self, key: str, partition: tuple, vector: np.ndarray) -> None:
+        with self._lock:
+            self._indexes.setdefault(partition, VectorIndex()).add(key, vector)
+            self._partitions[key] = partition
+
+
+    def _unindex_many(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                partition = self._partitions.pop(key, None)
+                if partition is not None:
+                    self._indexes[partition].remove(key)
+
+
+    def lookup(self, embedding, language: str) -> Optional[str]:
+        """Return the cached final response of the most similar query, or None on a miss"""
+        partition = self._partition(language)
+        query = self._normalize(embedding)
+
+        best_key, similarity = None, 0.0
+        with self._lock:
+            index = self._indexes.get(partition)
+            # Scanned under the lock - removals move rows, so the row -> key mapping must not change mid-scan
+            if index is not None and len(index):
+                similarities = index.vectors() @ query
+                best = int(np.argmax(similarities))
+                best_key, similarity = index.keys[best], float(similarities[best])
+
+        if best_key is not None and similarity >= self.threshold:
+            entry = self.cache.get(best_key)
+            if entry is not None:
+                self.hits += 1
+                logger.info(f"Semantic cache hit (similarity={similarity:.4f}, hit_rate={self.hit_rate():.2%})")
+                return entry["response"]
+
+        self.misses += 1
+        logger.info(f"Semantic cache miss (hit_rate={self.hit_rate():.2%})")
+        return None
+
+
+    def store(self, embedding, language: str, response: str) -> None:
+        """Cache a generated final response under its query embedding"""
+        partition = self._partition(language)
+        vector = self._normalize(embedding)
+        key = hash_key(*partition, vector.tobytes())
+
+        # Indexed first, so the eviction callback of the set below always finds what it removes
+        self._index(key, partition, vector)
+        self.cache.set(key, {
+            "embedding": vector.tolist(),
+            "language": partition[0],
+            "model": self.model,
+            "prompt_version": self.prompt_version,
+            "response": response
+        })
+
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "threshold": self.threshold,
+            **{f"store_{k}": v for k, v in self.cache.stats().items() if k in ("entries", "bytes")}
+        }
@@ -0,0 +1,145 @@
+import re
+import json
+import logging
+import unicodedata
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens with diacritics folded, so transliterations such as
+    "Bukhārī" and "Bukhari" produce the same term
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    # Queries and documents are folded alike, so й -> и and ё -> е are harmless
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return TOKEN_PATTERN.findall(folded)
+
+
+def reciprocal_rank_fusion(rankings: Iterable[list], k: int = 60) -> List[Tuple[object, float]]:
+    """Fuse ranked id lists into [(id, score)] by reciprocal rank fusion, best first"""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index over Qdrant point payloads.
+
+    Postings are kept in CSR form (per-term offsets into flat document/term-frequency
+    arrays) so the index loads from a single .npz file and scoring is vectorised.
+    The index is a snapshot - rebuild it with scripts.build_sparse_index after upserts.
+    """
+
+    def __init__(self, ids: list, terms: List[str], offsets: np.ndarray, postings: np.ndarray, frequencies: np.ndarray, doc_lengths: np.ndarray, k1: float = 1.5, b: float = 0.75):
+
+        self.ids = ids
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+
+        document_count = len(ids)
+        document_frequency = np.diff(offsets)
+        self.idf = np.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average_length = float(doc_lengths.mean()) if document_count else 1.0
+        self.length_norm = (k1 * (1 - b + b * doc_lengths / (average_length or 1.0))).astype(np.float32)
+
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[object, str]], **kwargs) -> "BM25Index":
+        """Index (point id, text) pairs"""
+        ids = []
+        doc_lengths = []
+        term_postings = {}
+
+        for doc_index, (point_id, text) in enumerate(documents):
+            counts = Counter(tokenize(text))
+            ids.append(point_id)
+            doc_lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                term_postings.setdefault(term, []).append((doc_index, count))
+
+        terms = sorted(term_postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        postings, frequencies = [], []
+        for i, term in enumerate(terms):
+            entries = term_postings[term]
+            offsets[i + 1] = offsets[i] + len(entries)
+            postings.extend(doc_index for doc_index, _ in entries)
+            frequencies.extend(count for _, count in entries)
+
+        return cls(
+            ids,
+            terms,
+            offsets,
+            np.asarray(postings, dtype=np.int32),
+            np.asarray(frequencies, dtype=np.float32),
+            np.asarray(doc_lengths, dtype=np.float32),
+            **kwargs
+        )
+
+
+    def search(self, query: str, limit: int) -> List[Tuple[object, float]]:
+        """Top (point id, BM25 score) pairs for the query"""
+        term_indexes = {self.vocabulary[term] for term in tokenize(query) if term in self.vocabulary}
+        if not term_indexes or limit <= 0:
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term_index in term_indexes:
+            start, end = self.offsets[term_index], self.offsets[term_index + 1]
+            docs = self.postings[start:end]
+            tf = self.frequencies[start:end]
+            scores[docs] += self.idf[term_index] * tf * (self.k1 + 1) / (tf + self.length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(scores[matched], -limit)[-limit:]]
+        ranked = matched[np.argsort(scores[matched])[::-1]]
+        return [(self.ids[i], float(scores[i])) for i in ranked]
+
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            offsets=self.offsets,
+            postings=self.postings,
+            frequencies=self.frequencies,
+            doc_lengths=self.doc_lengths,
+            meta=np.array(json.dumps({"ids": self.ids, "terms": self.terms, "k1": self.k1, "b": self.b}, ensure_ascii=False))
+        )
+
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            index = cls(
+                meta["ids"],
+                meta["terms"],
+                data["offsets"],
+                data["postings"],
+                data["frequencies"],
+                data["doc_lengths"],
+                k1=meta["k1"],
+                b=meta["b"]
+            )
+        logger.info(f"Loaded BM25 index {path} ({len(index.ids)} documents, {len(index.terms)} terms)")
+        return index
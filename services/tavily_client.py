@@ -0,0 +1,26 @@
+from core.client_registry import client_registry
+
+
+# Tavily's documented REST API (https://docs.tavily.com/documentation/api-reference/endpoint/search).
+# The tavily-python SDK opens a new connection per call through requests.post and has no way
+# to inject a session, so searches are sent from the shared httpx pool instead.
+TAVILY_API_URL = "https://api.tavily.com"
+
+
+
+class TavilySearchClient:
+    """Minimal Tavily search client on the registry's pooled keep-alive httpx client"""
+
+    def __init__(self, api_key: str, base_url: str = TAVILY_API_URL):
+
+        self.base_url = base_url
+        self.headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+        self.client = client_registry.http_client()
+        client_registry.register(base_url)
+
+
+    def search(self, query: str, timeout: float = 60, **kwargs) -> dict:
+        payload = {"query": query, **{key: value for key, value in kwargs.items() if value is not None}}
+        response = self.client.post(f"{self.base_url}/search", json=payload, headers=self.headers, timeout=min(timeout, 120))
+        response.raise_for_status()
+        return response.json()
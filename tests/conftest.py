@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+
+# core.config validates the API keys and Qdrant endpoints at import time; the units under test
+# never call out, so placeholders are enough
+for name in (
+    "DEEPL_API_KEY", "GROQ_API_KEY", "TAVILY_API_KEY", "OPENAI_API_KEY", "GEMINI_API_KEY",
+    "QURAN_QDRANT_API_KEY", "HADITH_QDRANT_API_KEY", "TAFSEER_QDRANT_API_KEY", "GENERAL_ISLAMIC_INFO_KEY",
+):
+    os.environ.setdefault(name, "test")
+
+for name in ("QURAN_QDRANT_URL", "HADITH_QDRANT_URL", "TAFSEER_QDRANT_URL", "GENERAL_ISLAMIC_INFO_URL"):
+    os.environ.setdefault(name, "http://localhost:6333")
+
+# Module-level caches (translations, embeddings) open their SQLite files on import
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="cache-tests-"))
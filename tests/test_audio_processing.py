@@ -0,0 +1,108 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from core.config import settings
+from services import audio_processing
+from services.audio_processing import decode_wav, prepare_audio, split_on_silence, split_points, trim_silence, WINDOW_SECONDS
+
+
+
+RATE = 16000
+
+
+def tone(seconds: float, rate: int = RATE, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def silence(seconds: float, rate: int = RATE) -> np.ndarray:
+    return np.zeros(int(seconds * rate), dtype=np.float32)
+
+
+def wav_bytes(samples: np.ndarray, rate: int = RATE, channels: int = 1) -> bytes:
+    pcm = (np.repeat(samples[:, None], channels, axis=1) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def audio_settings(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_PREPROCESSING", True)
+    monkeypatch.setattr(settings, "AUDIO_SILENCE_THRESHOLD_DB", -40.0)
+    monkeypatch.setattr(settings, "AUDIO_TRIM_PADDING_MS", 200)
+    monkeypatch.setattr(settings, "AUDIO_ENCODING", "wav")
+
+
+
+def test_decode_wav_downmixes_and_rejects_other_formats():
+    samples, rate = decode_wav(wav_bytes(tone(0.1), rate=44100, channels=2))
+
+    assert rate == 44100
+    assert samples.ndim == 1 and np.abs(samples).max() == pytest.approx(0.5, abs=1e-3)
+    assert decode_wav(b"OggS not a wav") is None
+
+
+def test_trim_silence_keeps_padding_around_speech():
+    samples = np.concatenate([silence(1.0), tone(1.0), silence(1.0)])
+
+    trimmed = trim_silence(samples, RATE)
+
+    assert len(trimmed) / RATE == pytest.approx(1.4, abs=2 * WINDOW_SECONDS)
+    assert len(trim_silence(silence(1.0), RATE)) == RATE   # nothing voiced: kept whole
+
+
+def test_split_points_prefer_the_latest_pause():
+    levels = np.zeros(10)
+    levels[[6, 8]] = -60
+
+    assert split_points(levels, max_windows=10, threshold_db=-40) == []
+    assert split_points(np.concatenate([levels, np.zeros(5)]), max_windows=10, threshold_db=-40) == [8]
+
+
+def test_split_points_fall_back_to_the_quietest_window():
+    levels = np.full(25, -10.0)
+    levels[7] = -30
+
+    cuts = split_points(levels, max_windows=10, threshold_db=-40)
+
+    assert cuts[0] == 7
+    assert all(b - a <= 10 for a, b in zip([0] + cuts, cuts + [25]))
+
+
+def test_split_on_silence_cuts_at_pauses_and_keeps_every_sample():
+    samples = np.concatenate([tone(4.0), silence(0.5), tone(4.0), silence(0.5), tone(4.0)])
+
+    chunks = split_on_silence(samples, RATE, max_seconds=6)
+
+    assert len(chunks) == 3
+    assert all(len(chunk) <= 6 * RATE for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == len(samples)
+
+
+def test_prepare_audio_resamples_trims_and_splits():
+    samples = np.concatenate([silence(1.0, 48000), tone(3.0, 48000), silence(0.5, 48000), tone(3.0, 48000), silence(1.0, 48000)])
+
+    chunks, extension = prepare_audio(wav_bytes(samples, rate=48000, channels=2), max_seconds=4)
+
+    assert extension == "wav"
+    assert len(chunks) == 2
+    decoded = [decode_wav(chunk) for chunk in chunks]
+    assert {rate for _, rate in decoded} == {RATE}
+    assert sum(len(s) for s, _ in decoded) / RATE == pytest.approx(6.9, abs=0.1)
+
+
+def test_prepare_audio_passes_other_formats_through():
+    assert prepare_audio(b"ID3 mp3 bytes") == ([b"ID3 mp3 bytes"], None)
+
+
+def test_unavailable_encoding_falls_back_to_wav(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_ENCODING", "mp3")
+    assert audio_processing.audio_encoding() == "wav"
@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import application
+from core.config import settings
+from core.call_ledger import start_ledger
+from services import deepL_service
+
+
+
+class FakeTranslator:
+    """DeepL translate_text: a list for a list of texts, one result for a string"""
+
+    def translate_text(self, text, target_lang):
+        if isinstance(text, str):
+            return SimpleNamespace(text=f"{target_lang}:{text}", detected_source_lang="UK")
+        return [SimpleNamespace(text=f"{target_lang}:{part}", detected_source_lang="EN") for part in text]
+
+
+@pytest.fixture
+def deepl(monkeypatch):
+    monkeypatch.setattr(deepL_service, "translation_cache", None)
+    monkeypatch.setattr(deepL_service.deepl_service, "translator", FakeTranslator())
+    monkeypatch.setattr(settings, "LOCAL_LANGUAGE_DETECTION", True)
+    monkeypatch.setattr(settings, "CALL_BUDGET_STRICT", True)
+    return deepL_service.deepl_service
+
+
+
+def test_voice_query_outside_en_ru_fits_the_deepl_budget(deepl, monkeypatch):
+    async def run_graph(processed_query, detected_lang):
+        # The RU context path translates the web, hadith and general passages as three batches
+        for passages in (["web result"], ["hadith text"], ["general text"]):
+            await asyncio.to_thread(deepl.translate_passages, passages, detected_lang)
+        return "answer"
+
+    monkeypatch.setattr(application, "run_langgraph_query", run_graph)
+
+    async def main():
+        ledger = start_ledger("/audio_query")
+        transcription = {"status": "success", "message": "Що говорить Коран про терпіння?"}
+        return await application.answer_transcription(transcription, ledger), ledger
+
+    response, ledger = asyncio.run(main())
+
+    assert response == {"status": "success", "message": "RU:answer"}
+    assert ledger.counts()["deepl"] == 5
+    assert ledger.violations(settings.CALL_BUDGETS) == []
@@ -0,0 +1,141 @@
+import copy
+
+import pytest
+
+from services.context_budget import ContextBudgeter, ITEM_OVERHEAD_TOKENS, TRANSLATED_TOKEN_RATIO, project_metadata
+
+
+
+@pytest.fixture
+def budgeter():
+    budgeter = ContextBudgeter(budget=200, max_item_tokens=80, min_item_tokens=20, model="gpt-4o")
+    budgeter.encoding = None    # ~4 characters per token, no tiktoken download
+    return budgeter
+
+
+def doc(content: str, score: float, **metadata) -> dict:
+    return {"content": content, "score": score, "metadata": metadata}
+
+
+def cost(budgeter, docs, source: str, language: str) -> int:
+    return sum(budgeter._cost(d, source, language) for d in docs)
+
+
+
+def test_everything_fits_unchanged(budgeter):
+    documents = {"quran": [doc("a" * 40, 0.9), doc("b" * 40, 0.8)]}
+    web = [{"title": "t", "content": "c" * 40, "url": "u", "score": 0.5}]
+
+    budgeted_web, budgeted_documents = budgeter.apply(web, documents, "RU")
+
+    assert budgeted_web == web
+    assert budgeted_documents == documents
+
+
+def test_inputs_are_left_untouched(budgeter):
+    documents = {"hadith": [doc("x" * 2000, 0.9, ru_translation="y" * 500)]}
+    original = copy.deepcopy(documents)
+
+    budgeter.apply([], documents, "EN")
+
+    assert documents == original
+
+
+def test_total_and_per_item_caps_hold(budgeter):
+    documents = {"hadith": [doc("x" * 1000, 1.0 - i / 10) for i in range(6)]}
+
+    _, budgeted = budgeter.apply([], documents, "RU")
+
+    assert cost(budgeter, budgeted["hadith"], "hadith", "RU") <= budgeter.budget
+    assert all(budgeter._cost(d, "hadith", "RU") <= budgeter.max_item_tokens for d in budgeted["hadith"])
+    assert all(d["content"].endswith("…") for d in budgeted["hadith"])
+    # Best scored first: the dropped documents are the lowest scored ones
+    assert [d["score"] for d in budgeted["hadith"]] == [1.0, 0.9, 0.8]
+
+
+def test_every_source_keeps_its_best_item(budgeter):
+    budgeter.budget = 3 * 80
+    documents = {
+        "quran": [doc("q" * 400, 0.99 - i / 100) for i in range(5)],
+        "hadith": [doc("h" * 400, 0.1)],
+    }
+    web = [{"title": "t", "content": "w" * 400, "score": 0.2}]
+
+    budgeted_web, budgeted = budgeter.apply(web, documents, "EN")
+
+    assert len(budgeted["hadith"]) == 1
+    assert len(budgeted_web) == 1
+    assert len(budgeted["quran"]) == 1
+
+
+def test_scores_are_compared_within_their_source(budgeter):
+    # Cross-encoder logits and cosine similarities: raw values would always favour quran
+    budgeter.budget = 4 * 40
+    budgeter.max_item_tokens = 40
+    documents = {
+        "quran": [doc("q" * 400, score) for score in (9.0, 8.0, 1.0)],
+        "hadith": [doc("h" * 400, score) for score in (0.9, 0.8, 0.1)],
+    }
+
+    _, budgeted = budgeter.apply([], documents, "EN")
+
+    assert [d["score"] for d in budgeted["quran"]] == [9.0, 8.0]
+    assert [d["score"] for d in budgeted["hadith"]] == [0.9, 0.8]
+
+
+def test_rerank_score_takes_precedence(budgeter):
+    items = [{"source": "s", "score": 0.0}, {"source": "s", "score": 2.0}, {"source": "t", "score": 5.0}]
+    budgeter._normalize_scores(items)
+    assert [item["relative_score"] for item in items] == [0.0, 1.0, 1.0]
+
+    documents = {"quran": [{"content": "a", "score": 0.1, "rerank_score": 3.0, "metadata": {}}]}
+    _, budgeted = budgeter.apply([], documents, "RU")
+    assert budgeted["quran"][0]["rerank_score"] == 3.0
+
+
+def test_english_context_drops_russian_payload(budgeter):
+    metadata = {"surah_number": 1, "ru_translation": "…", "As_Saadi_Tafseer": "…", "Ibni_kathir_quran_tafsir": "tafsir", "Tafsir": "kept"}
+    _, budgeted = budgeter.apply([], {"tafseer": [doc("c", 1.0, **metadata)]}, "EN")
+
+    assert budgeted["tafseer"][0]["metadata"] == {"surah_number": 1, "Ibni_kathir_quran_tafsir": "tafsir", "Tafsir": "kept"}
+    assert project_metadata(metadata, "RU") == metadata
+
+
+def test_cost_counts_overhead_and_metadata_text(budgeter):
+    assert budgeter._cost(doc("a" * 40, 1.0, note="b" * 8, number=3), "hadith", "EN") == 10 + 2 + ITEM_OVERHEAD_TOKENS
+
+
+def test_russian_cost_counts_only_what_the_russian_layout_renders(budgeter):
+    quran = doc("e" * 400, 1.0, ru_translation="r" * 40, Tafsir="t" * 4000, surah="s" * 8)
+    tafseer = doc("e" * 400, 1.0, As_Saadi_Tafseer="a" * 40, abu_Adil_tafsir="b" * 40, surah_number="1" * 40, source="s" * 8)
+    pretranslated = doc("e" * 400, 1.0, ru_translation="r" * 40)
+    translated = doc("e" * 400, 1.0)
+
+    # RU_Translation line plus the metadata, which repeats it; no Tafsir, no English content
+    assert budgeter._cost(quran, "quran", "RU") == 2 * 10 + 2 + ITEM_OVERHEAD_TOKENS
+    # Each tafsir text once, the shown metadata once per tafsir
+    assert budgeter._cost(tafseer, "tafseer", "RU") == 10 + 10 + 2 * 2 + ITEM_OVERHEAD_TOKENS
+    assert budgeter._cost(pretranslated, "hadith", "RU") == 10 + ITEM_OVERHEAD_TOKENS
+    assert budgeter._cost(translated, "hadith", "RU") == 100 * TRANSLATED_TOKEN_RATIO + ITEM_OVERHEAD_TOKENS
+    assert budgeter._cost(quran, "quran", "EN") == 100 + 1000 + 2 + ITEM_OVERHEAD_TOKENS
+
+
+def test_russian_query_keeps_documents_whose_rendered_text_fits(budgeter):
+    # Long Tafsir and English content the Russian prompt never shows must not crowd documents out
+    budgeter.budget, budgeter.max_item_tokens = 6000, 1500
+    documents = {
+        "quran": [doc("e" * 2000, 1.0 - i / 10, ru_translation="r" * 800, Tafsir="t" * 20000) for i in range(5)],
+        "hadith": [doc("e" * 2000, 1.0 - i / 10, ru_translation="r" * 1200) for i in range(6)],
+    }
+
+    _, budgeted = budgeter.apply([], documents, "RU")
+
+    assert budgeted == documents
+    assert cost(budgeter, budgeted["quran"], "quran", "RU") + cost(budgeter, budgeted["hadith"], "hadith", "RU") <= 6000
+
+
+def test_russian_truncation_bounds_the_translated_length(budgeter):
+    _, budgeted = budgeter.apply([], {"general_islamic_info": [doc("e" * 4000, 1.0)]}, "RU")
+
+    assert budgeter._cost(budgeted["general_islamic_info"][0], "general_islamic_info", "RU") <= budgeter.max_item_tokens
+    assert len(budgeted["general_islamic_info"][0]["content"]) < 4 * budgeter.max_item_tokens / TRANSLATED_TOKEN_RATIO
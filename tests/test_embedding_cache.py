@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+from core.local_cache import LocalCache
+from services.embedding_cache import CachedEmbeddings
+
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [float(len(text)), 1.0]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class ThreadRecordingCache(LocalCache):
+    """Records the threads the SQLite calls run on"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value):
+        self.threads.add(threading.get_ident())
+        super().set(key, value)
+
+
+
+def test_repeated_queries_are_served_from_the_cache(tmp_path):
+    upstream = FakeEmbeddings()
+    embeddings = CachedEmbeddings(upstream, "model", LocalCache(str(tmp_path / "embeddings.sqlite3")))
+
+    assert embeddings.embed_query("What is  Patience?") == [18.0, 1.0]
+    assert embeddings.embed_query("what is patience?") == [18.0, 1.0]
+    assert upstream.calls == 1
+
+
+def test_async_path_keeps_sqlite_off_the_event_loop(tmp_path):
+    upstream = FakeEmbeddings()
+    cache = ThreadRecordingCache(str(tmp_path / "embeddings.sqlite3"))
+    embeddings = CachedEmbeddings(upstream, "model", cache)
+
+    async def main():
+        first = await embeddings.aembed_query("patience")
+        second = await embeddings.aembed_query("patience")
+        return first, second, threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(main())
+
+    assert first == second and upstream.calls == 1
+    assert cache.threads and loop_thread not in cache.threads
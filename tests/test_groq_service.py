@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.local_cache import LocalCache
+from services.groq_service import GroqService
+
+
+
+class ThreadRecordingCache(LocalCache):
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value):
+        self.threads.add(threading.get_ident())
+        super().set(key, value)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    service = GroqService()
+    service.transcription_cache = ThreadRecordingCache(str(tmp_path / "transcriptions.sqlite3"))
+    service.hash_threads = set()
+    service.uploads = []
+
+    cache_key = service._cache_key
+
+    def recording_cache_key(audio_bytes, model):
+        service.hash_threads.add(threading.get_ident())
+        return cache_key(audio_bytes, model)
+
+    async def transcribe_chunk(audio_bytes, filename, model):
+        service.uploads.append(filename)
+        return " salam "
+
+    monkeypatch.setattr(service, "_cache_key", recording_cache_key)
+    monkeypatch.setattr(service, "_atranscribe_chunk", transcribe_chunk)
+    return service
+
+
+
+def test_async_transcription_hashes_and_caches_off_the_event_loop(service):
+    async def main():
+        first = await service.atranscribe_bytes(b"not a wav", "voice.ogg")
+        second = await service.atranscribe_bytes(b"not a wav", "voice.ogg")
+        return first, second, threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(main())
+
+    assert first == second == {"status": "success", "message": "salam"}
+    assert service.uploads == ["voice.ogg"]
+    assert service.hash_threads and loop_thread not in service.hash_threads
+    assert service.transcription_cache.threads and loop_thread not in service.transcription_cache.threads
@@ -0,0 +1,43 @@
+import pytest
+
+from services.language_detector import LanguageDetector
+
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return LanguageDetector(confidence_threshold=0.8)
+
+
+
+@pytest.mark.parametrize("text, language", [
+    ("What does the Quran say about patience?", "EN"),
+    ("Что говорит Коран о терпении?", "RU"),
+    ("Що говорить Коран про терпіння?", "UK"),
+])
+def test_detects_the_language(detector, text, language):
+    detection = detector.detect(text)
+
+    assert detection.language == language
+    assert detector.is_confident(detection)
+
+
+def test_latin_script_is_reported_as_english(detector):
+    # Transliterated names lower the confidence (the LLM settles those), never the script decision
+    detection = detector.detect("Who was Umar ibn al-Khattab and what did he do in Medina?")
+
+    assert detection.is_english
+    assert detection.cyrillic_ratio == 0.0
+
+
+def test_text_without_letters_is_unknown(detector):
+    detection = detector.detect("2:255 ?!")
+
+    assert detection.language == "UNKNOWN"
+    assert not detector.is_confident(detection)
+
+
+def test_non_english_latin_text_is_not_confident(detector):
+    detection = detector.detect("Qu'est-ce que le Coran dit sur la patience et la prière?")
+
+    assert not detector.is_confident(detection)
@@ -0,0 +1,144 @@
+import pytest
+
+from core import local_cache
+from core.local_cache import LocalCache, hash_key, normalize_text
+
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(local_cache, "time", clock)
+    return clock
+
+
+def make_cache(tmp_path, **kwargs) -> LocalCache:
+    evicted = []
+    cache = LocalCache(str(tmp_path / "cache.sqlite3"), on_evict=evicted.extend, **kwargs)
+    return cache, evicted
+
+
+
+def test_keys_are_stable_and_text_is_normalised():
+    assert hash_key("a", 1, b"x") == hash_key("a", 1, b"x")
+    assert hash_key("ab", "c") != hash_key("a", "bc")
+    assert normalize_text("  What IS\tpatience? ") == "what is patience?"
+
+
+def test_get_set_and_stats(tmp_path, clock):
+    cache, _ = make_cache(tmp_path)
+
+    assert cache.get("missing") is None
+    cache.set("key", {"answer": [1, 2]})
+
+    assert cache.get("key") == {"answer": [1, 2]}
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 1, 0.5)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache, evicted = make_cache(tmp_path, max_entries=2)
+
+    cache.set("a", 1)
+    clock.now += 1
+    cache.set("b", 2)
+    clock.now += 1
+    cache.get("a")              # a is now more recent than b
+    clock.now += 1
+    cache.set("c", 3)
+
+    assert evicted == ["b"]
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache, evicted = make_cache(tmp_path, ttl_seconds=10)
+
+    cache.set("a", 1)
+    clock.now += 5
+    assert cache.get("a") == 1
+
+    clock.now += 6              # reads do not extend the lifetime
+    assert cache.get("a") is None
+    assert evicted == ["a"]
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entries_are_swept_on_write(tmp_path, clock):
+    cache, evicted = make_cache(tmp_path, ttl_seconds=10)
+
+    cache.set_many({"a": 1, "b": 2})
+    clock.now += 11
+    cache.set("c", 3)
+
+    assert sorted(evicted) == ["a", "b"]
+    assert dict(cache.items()) == {"c": 3}
+
+
+def test_byte_bound_evicts_oldest_until_it_fits(tmp_path, clock):
+    cache, evicted = make_cache(tmp_path, max_bytes=25)
+
+    for key in ("a", "b", "c"):
+        cache.set(key, "x" * 8)   # 10 bytes of JSON each
+        clock.now += 1
+
+    assert evicted == ["a"]
+    assert cache.stats()["bytes"] == 20
+
+
+def test_get_many_skips_expired_and_counts_lookups(tmp_path, clock):
+    cache, _ = make_cache(tmp_path, ttl_seconds=10)
+
+    cache.set("old", 1)
+    clock.now += 11
+    cache.set_many({"new": 2})
+
+    assert cache.get_many(["old", "new", "new", "missing"]) == {"new": 2}
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_failing_eviction_callback_does_not_break_writes(tmp_path, clock):
+    def fail(keys):
+        raise RuntimeError("boom")
+
+    cache = LocalCache(str(tmp_path / "cache.sqlite3"), max_entries=1, on_evict=fail)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.get("b") == 2
+
+
+def test_counters_follow_replacements_and_deletes(tmp_path, clock):
+    cache, _ = make_cache(tmp_path, max_entries=3)
+
+    cache.set("a", "x" * 8)
+    cache.set("a", "x" * 18)                      # replaced, not added
+    cache.set_many({"a": "x", "b": "y" * 8})
+    cache.delete("b")
+    cache.delete("missing")
+
+    assert (cache.stats()["entries"], cache.stats()["bytes"]) == (1, 3)
+
+
+def test_counters_are_loaded_when_the_cache_reopens(tmp_path, clock):
+    cache, _ = make_cache(tmp_path)
+    cache.set("a", "x" * 8)
+    clock.now += 1
+    cache.set("b", "y" * 8)
+    clock.now += 1
+
+    reopened, evicted = make_cache(tmp_path, max_bytes=15)
+    assert (reopened.stats()["entries"], reopened.stats()["bytes"]) == (2, 20)
+
+    reopened.set("c", "z")                      # 3 bytes: the oldest entry goes to respect max_bytes
+    assert evicted == ["a"]
+    assert reopened.stats()["bytes"] == 13
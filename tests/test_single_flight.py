@@ -0,0 +1,83 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.single_flight import SingleFlight
+
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+    release = threading.Event()
+
+    def work(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(flight.do, "key", work, 21) for _ in range(4)]
+        deadline = time.time() + 5
+        while len(flight._calls) == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)          # let the followers join the leader
+        release.set()
+        results = [future.result(5) for future in futures]
+
+    assert results == [42] * 4
+    assert calls == [21]
+    assert flight._calls == {}
+
+
+def test_exception_reaches_every_caller_and_is_not_kept():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise ValueError("upstream down")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+    assert [flight.do(key, str.upper, key) for key in ("a", "b")] == ["A", "B"]
+
+
+def test_async_calls_share_one_task():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value + 1
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", work, 1) for _ in range(5)))
+
+    assert asyncio.run(main()) == [2] * 5
+    assert calls == [1]
+    assert flight._tasks == {}
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.ado("key", work))
+        second = asyncio.ensure_future(flight.ado("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(main()) == ("done", True)
@@ -0,0 +1,37 @@
+from services.sparse_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+
+def test_tokenize_folds_case_and_diacritics():
+    assert tokenize("Ṣaḥīḥ al-Bukhārī!") == ["sahih", "al", "bukhari"]
+    assert tokenize("Ёлка") == tokenize("елка")
+
+
+def test_rrf_rewards_agreement_between_rankings():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "d"]], k=60)
+
+    assert [item for item, _ in fused] == ["b", "c", "a", "d"]
+    assert fused[0][1] == 1 / 62 + 1 / 61
+
+
+def test_rrf_of_a_single_ranking_keeps_its_order():
+    assert [item for item, _ in reciprocal_rank_fusion([[3, 1, 2]])] == [3, 1, 2]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_bm25_ranks_frequent_matches_in_short_documents_first(tmp_path):
+    index = BM25Index.build([
+        (1, "the virtue of patience in hardship and prayer"),
+        (2, "patience, patience"),
+        (3, "fasting in Ramadan"),
+        (4, "prayer at night"),
+    ])
+
+    results = index.search("Patience", limit=10)
+    assert [point_id for point_id, _ in results] == [2, 1]
+    assert index.search("zakat", limit=10) == []
+    assert len(index.search("patience prayer fasting", limit=2)) == 2
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    assert BM25Index.load(path).search("Patience", limit=10) == results
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core.local_cache import LocalCache
+from services import deepL_service
+
+
+
+class CountingCache(LocalCache):
+    def __init__(self, path):
+        super().__init__(path)
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append("get")
+        return super().get(key)
+
+    def set(self, key, value):
+        self.calls.append("set")
+        super().set(key, value)
+
+    def get_many(self, keys):
+        self.calls.append("get_many")
+        return super().get_many(keys)
+
+    def set_many(self, values):
+        self.calls.append("set_many")
+        super().set_many(values)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    cache = CountingCache(str(tmp_path / "translations.sqlite3"))
+    monkeypatch.setattr(deepL_service, "translation_cache", cache)
+
+    service = deepL_service.Deepl_Service()
+    service.requests = []
+
+    def translate(texts, target_lang):
+        service.requests.append(list(texts))
+        return [SimpleNamespace(text=f"ru:{text}") for text in texts]
+
+    monkeypatch.setattr(service, "_translate", translate)
+    return service, cache
+
+
+
+def test_a_batch_reads_and_writes_the_cache_once(service):
+    service, cache = service
+
+    first = service.translate_passages(["a", "b", "a", " "], "RU")
+    second = service.translate_passages(["b", "c"], "RU")
+
+    assert first == ["ru:a", "ru:b", "ru:a", " "]
+    assert second == ["ru:b", "ru:c"]
+    assert service.requests == [["a", "b"], ["c"]]
+    assert cache.calls == ["get_many", "set_many", "get_many", "set_many"]
+
+
+def test_english_passages_are_returned_as_they_are(service):
+    service, cache = service
+
+    assert service.translate_passages(["a"], "EN") == ["a"]
+    assert service.requests == [] and cache.calls == []
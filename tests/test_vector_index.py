@@ -0,0 +1,38 @@
+import numpy as np
+
+from core.vector_index import VectorIndex
+
+
+
+def test_rows_grow_past_the_initial_capacity():
+    index = VectorIndex(extra_width=1, initial_capacity=2)
+    for i in range(5):
+        index.add(f"k{i}", np.full(3, i, dtype=np.float32), np.array([i * 10]))
+
+    assert len(index) == 5
+    assert index.vectors()[:, 0].tolist() == [0, 1, 2, 3, 4]
+    assert index.extras()[:, 0].tolist() == [0, 10, 20, 30, 40]
+
+
+def test_remove_moves_the_last_row_into_the_gap():
+    index = VectorIndex()
+    for i in range(3):
+        index.add(f"k{i}", np.full(2, i, dtype=np.float32))
+
+    assert index.remove("k0")
+    assert not index.remove("k0")
+    assert index.keys == ["k2", "k1"]
+    assert index.vectors()[:, 0].tolist() == [2, 1]
+    assert "k0" not in index and "k2" in index
+
+
+def test_add_overwrites_an_existing_key():
+    index = VectorIndex(extra_width=2)
+    index.add("k", np.ones(2, dtype=np.float32))
+    index.add("k", np.zeros(2, dtype=np.float32))
+
+    assert len(index) == 1
+    assert index.vectors().tolist() == [[0, 0]]
+    assert index.set_extra("k", np.array([1, 2]))
+    assert not index.set_extra("missing", np.array([1, 2]))
+    assert index.extras().tolist() == [[1, 2]]